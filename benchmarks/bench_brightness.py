@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Press dim.sh in bursts against the brightness daemon, with a stub ddcutil.
+
+The stub takes --delay seconds per call, like a real DDC/CI write, and
+logs the level it was given. --presses steps are sent --gap seconds apart.
+dim.sh ran ddcutil once per press, one after the other; the daemon must
+make fewer calls than presses, end on the level of the last press and
+save that level when it is stopped, else the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, '..', 'scripts')
+sys.path.insert(0, SCRIPTS)
+
+import niri_brightness
+
+STUB = '''#!/bin/sh
+sleep {delay}
+echo "$(date +%s.%N) $3" >> "{log}"
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--presses', type=int, default=12)
+    parser.add_argument('--gap', type=float, default=0.05)
+    parser.add_argument('--delay', type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, 'ddcutil.log')
+        stub = os.path.join(tmp, 'ddcutil')
+        with open(stub, 'w') as f:
+            f.write(STUB.format(delay=args.delay, log=log))
+        os.chmod(stub, 0o755)
+        path = os.path.join(tmp, 'brightness.sock')
+        env = dict(os.environ, PATH=f"{tmp}:{os.environ['PATH']}", NIRI_BRIGHTNESS_SOCKET=path,
+                   XDG_STATE_HOME=os.path.join(tmp, 'state'), HOME=tmp)
+        daemon = subprocess.Popen([sys.executable, os.path.join(SCRIPTS, 'niri_brightness.py'), 'daemon'],
+                                  env=env)
+        try:
+            while niri_brightness.send({'command': 'get'}, path) is None:
+                time.sleep(0.01)
+            replies = []
+            start = time.monotonic()
+            for _ in range(args.presses):
+                sent = time.monotonic()
+                reply = niri_brightness.send({'command': 'step'}, path)
+                replies.append(time.monotonic() - sent)
+                last_press = time.time()
+                time.sleep(args.gap)
+            target = reply['level']
+            # Wait until the writer reached the target, or long enough for a
+            # call per press to have ended
+            deadline = time.monotonic() + args.delay * (args.presses + 3)
+            calls = []
+            while time.monotonic() < deadline:
+                time.sleep(args.delay * 3)
+                if os.path.exists(log):
+                    with open(log) as f:
+                        calls = [line.split() for line in f]
+                if calls and int(calls[-1][1]) == target:
+                    break
+            elapsed = time.monotonic() - start
+        finally:
+            daemon.send_signal(signal.SIGTERM)
+            daemon.wait()
+
+        with open(os.path.join(tmp, 'state', 'niri-dotfiles', 'brightness.json')) as f:
+            saved = json.load(f)
+    if not calls:
+        sys.exit("ddcutil was never called")
+    final = int(calls[-1][1])
+    settled = float(calls[-1][0]) - last_press
+    print(f"{args.presses} presses over {elapsed:.2f} s: {len(calls)} ddcutil calls (dim.sh: {args.presses}), "
+          f"ended at {final}")
+    print(f"reply {sum(replies) / len(replies) * 1000:.2f} ms per press; monitor at the target "
+          f"{settled:.2f} s after the last press")
+    if final != target:
+        sys.exit(f"the monitor ended at {final}, the last press asked for {target}")
+    if len(calls) >= args.presses:
+        sys.exit(f"{len(calls)} ddcutil calls for {args.presses} presses")
+    if saved['level'] != target:
+        sys.exit(f"saved level {saved['level']}, expected {target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Time loading lxqt-niri.kdl and its includes, with and without the parse cache.
+
+    no cache   parse every file, what each tool did on its own
+    cold       parse every file and fill an empty cache
+    warm       nothing changed: one stat and one cache read per file
+    touched    every mtime changed, same content: read and hash, no parse
+    edited     one file really changed: only that one is parsed
+
+The repository's config is copied to a temporary directory; --copies
+adds that many more copies of the src/ files to the include list, to see
+how a larger configuration behaves.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_config
+
+CONFIG = os.path.join(HERE, '..', 'config')
+
+
+def best_ms(function, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--copies', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = os.path.join(tmp, 'config')
+        cache_dir = os.path.join(tmp, 'cache')
+        shutil.copytree(CONFIG, config_dir)
+        main_path = os.path.join(config_dir, 'lxqt-niri.kdl')
+        src = os.path.join(config_dir, 'src')
+        files = sorted(name for name in os.listdir(src) if name.endswith('.kdl'))
+        with open(main_path, 'a', encoding='utf-8') as f:
+            for n in range(args.copies):
+                os.makedirs(os.path.join(src, str(n)))
+                for name in files:
+                    shutil.copy(os.path.join(src, name), os.path.join(src, str(n), name))
+                    f.write(f'include "src/{n}/{name}"\n')
+        paths = list(niri_config.load(main_path, None).files)
+
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            niri_config.load(main_path, cache_dir)
+
+        def touched():
+            for path in paths:
+                os.utime(path)
+            niri_config.load(main_path, cache_dir)
+
+        def edited():
+            with open(paths[-1], 'a', encoding='utf-8') as f:
+                f.write('\n')
+            niri_config.load(main_path, cache_dir)
+
+        results = [
+            ('no cache', best_ms(lambda: niri_config.load(main_path, None), args.runs)),
+            ('cold', best_ms(cold, args.runs)),
+            ('warm', best_ms(lambda: niri_config.load(main_path, cache_dir), args.runs)),
+            ('touched', best_ms(touched, args.runs)),
+            ('edited', best_ms(edited, args.runs)),
+        ]
+        config = niri_config.load(main_path, cache_dir)
+        assert all(config_file.cached for config_file in config.files.values())
+
+    print(f"{len(paths)} files")
+    for name, ms in results:
+        print(f"{name:>10}: {ms:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Replay recorded niri events to several consumers, against a fake niri.
+
+    direct   every consumer opens its own event stream, as the helpers
+             used to with `niri msg event-stream`
+    hub      one niri_events.EventHub reads the stream and fans it out
+
+Each mode runs --subscribers consumers of every event plus one that only
+wants WindowUrgencyChanged, like focus-urgent. With --slow, one more
+consumer sleeps on every event; in hub mode it loses events to its
+bounded queue while the others keep up.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_events
+import niri_fake
+import niri_ipc
+
+EVENTS = os.path.join(HERE, 'events.jsonl')
+# Sent after the replay; the hub forwards event types it does not know
+DONE = {'BenchmarkDone': {}}
+
+
+class Consumer(threading.Thread):
+    """Count events until DONE arrives"""
+
+    def __init__(self, stream, delay=0.0):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.delay = delay
+        self.received = 0
+        self.finished = None
+
+    def run(self):
+        for event in self.stream:
+            if event == DONE:
+                break
+            self.received += 1
+            if self.delay:
+                time.sleep(self.delay)
+        self.finished = time.perf_counter()
+
+
+def direct_stream(path, types):
+    with niri_ipc.Client(path) as niri:
+        for event in niri.event_stream():
+            if not types or next(iter(event)) in types:
+                yield event
+
+
+def run(mode, events, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'niri.sock')
+        hub_path = os.path.join(tmp, 'events.sock')
+        fake = niri_fake.FakeNiri(path)
+        fake.start()
+        hub = None
+        if mode == 'hub':
+            hub = niri_events.EventHub(queue_size=args.queue_size)
+            threading.Thread(target=asyncio.run, args=(hub.serve(hub_path, path),), daemon=True).start()
+            while not os.path.exists(hub_path):
+                time.sleep(0.001)
+
+        def stream(types):
+            types = types + ['BenchmarkDone'] if types else []
+            if mode == 'hub':
+                return niri_events.subscribe(types, hub_path)
+            return direct_stream(path, types)
+
+        urgent = [event for event in events if 'WindowUrgencyChanged' in event]
+        consumers = [Consumer(stream([])) for _ in range(args.subscribers)]
+        consumers.append(Consumer(stream(['WindowUrgencyChanged'])))
+        if args.slow:
+            consumers.append(Consumer(stream([]), delay=0.001))
+        for consumer in consumers:
+            consumer.start()
+        # Every consumer has to be connected before the replay starts
+        if hub is not None:
+            while len(fake.streams) < 1 or len(hub.subscribers) < len(consumers):
+                time.sleep(0.001)
+        else:
+            while len(fake.streams) < len(consumers):
+                time.sleep(0.001)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for event in events:
+                fake.emit(event)
+        fake.emit(DONE)
+        for consumer in consumers:
+            consumer.join()
+        fake.stop()
+
+    total = len(events) * args.rounds
+    for n, consumer in enumerate(consumers):
+        wanted = len(urgent) * args.rounds if n == args.subscribers else total
+        name = 'slow' if consumer.delay else 'urgent only' if n == args.subscribers else f'all #{n + 1}'
+        seconds = consumer.finished - start
+        print(f"{mode:>6} {name:>12}: {consumer.received:7d}/{wanted:<7d} events "
+              f"in {seconds * 1000:8.1f} ms, {total / seconds:10.0f} events/s replayed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=200, help="times to replay the recording")
+    parser.add_argument('--subscribers', type=int, default=3)
+    parser.add_argument('--queue-size', type=int, default=niri_events.QUEUE_SIZE)
+    parser.add_argument('--slow', action='store_true', help="add a consumer that sleeps 1 ms per event")
+    args = parser.parse_args()
+
+    with open(EVENTS, 'rb') as f:
+        events = [json.loads(line) for line in f]
+    for mode in ('direct', 'hub'):
+        run(mode, events, args)
+
+
+if __name__ == '__main__':
+    main()
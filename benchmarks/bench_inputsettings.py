@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Benchmark niri-inputsettings: load and save on growing input.kdl files, tabs and window.
+
+Runs in this process under the offscreen Qt platform:
+
+    load_settings/N     SettingsWindow.load_settings with every tab built, N lines
+    apply_settings/N    SettingsWindow.apply_settings after one change, N lines
+    tab/CLASS           building one tab class and binding it to the repo's input.kdl
+    window              SettingsWindow construction (the first tab is built)
+
+The files are the repository's input.kdl followed by generated tablet
+blocks and comments up to N lines. Before timing, every widget of a
+setting missing from input.kdl is edited and the edit undone: the widget
+must show niri's default again, else the exit status is 1. Every result is the median of --runs
+runs in milliseconds, with the best run next to it; --json writes them
+to a file. Each median is compared with --thresholds (default
+inputsettings_thresholds.json next to this script) and the exit status
+is 1 when any is over its limit, so a slower parser or startup shows up.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import niri_input_gui
+
+INPUT_KDL = os.path.join(HERE, '..', 'config', 'src', 'input.kdl')
+THRESHOLDS = os.path.join(HERE, 'inputsettings_thresholds.json')
+SIZES = (40, 1000, 10000, 100000)
+
+FILLER = '''
+// Tablet {n}
+tablet {{
+    map-to-output "eDP-{n}"
+    calibration-matrix 1.0 0.0 0.0 0.0 1.0 0.0
+    // left-handed
+}}
+'''
+
+
+def generate(lines):
+    """The repository's input.kdl, grown to about lines lines"""
+    with open(INPUT_KDL, encoding='utf-8') as f:
+        parts = [f.read()]
+    count = parts[0].count('\n')
+    n = 0
+    while count < lines:
+        parts.append(FILLER.format(n=n))
+        count += FILLER.count('\n')
+        n += 1
+    return ''.join(parts)
+
+
+def check_undo(window):
+    """Edit and undo the widgets of unset settings; return the keys whose widget kept the edit"""
+    gui = niri_input_gui
+    failed = []
+    for attribute, _tab_class, _title in window.TABS:
+        tab = getattr(window, attribute)
+        for key, name in tab.WIDGETS.items():
+            if isinstance(name, dict) or window.model.current.get(key) is not None:
+                continue
+            widget = getattr(tab, name)
+            default = gui.niri_input.SETTINGS[key][2]
+            # Away from the default, as the user would, so the edit goes
+            # through the widget's signal
+            if isinstance(widget, gui.QComboBox):
+                widget.setCurrentIndex(next(index for index in range(widget.count())
+                                            if widget.itemText(index) != default))
+                shown = widget.currentText
+            elif isinstance(widget, gui.QLineEdit):
+                widget.setText(f'{default}x')
+                widget.textEdited.emit(widget.text())
+                shown = widget.text
+            else:
+                step = widget.singleStep() if default < widget.maximum() else -widget.singleStep()
+                widget.setValue(default + step)
+                shown = widget.value
+            if window.model.current.get(key) is None:
+                failed.append(f"{key} (the edit did not reach the model)")
+                continue
+            window.undo()
+            if shown() != default:
+                failed.append(f"{key} (shows {shown()!r} after undo)")
+    return failed
+
+
+def measure(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(times), 3), 'best_ms': round(min(times), 3), 'runs': runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES), help="input.kdl sizes in lines")
+    parser.add_argument('--json', metavar='FILE', help="write the results to FILE")
+    parser.add_argument('--thresholds', default=THRESHOLDS, metavar='FILE',
+                        help="JSON of name -> highest median ms (default: %(default)s)")
+    args = parser.parse_args()
+
+    app = niri_input_gui.QApplication(sys.argv[:1])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        niri_input_gui.CONFIG_PATH = os.path.join(tmp, 'input.kdl')
+        # Every setting but the flags unset
+        with open(niri_input_gui.CONFIG_PATH, 'w', encoding='utf-8') as out:
+            out.write('input {\n}\n')
+        # Quiet the "Settings applied" lines
+        with contextlib.redirect_stdout(io.StringIO()):
+            window = niri_input_gui.SettingsWindow()
+            for index in range(window.tabs.count()):
+                window.build_tab(index)
+            undo_failed = check_undo(window)
+            window.deleteLater()
+            with open(INPUT_KDL, encoding='utf-8') as f, open(niri_input_gui.CONFIG_PATH, 'w') as out:
+                out.write(f.read())
+
+            config = niri_input_gui.niri_kdl.load(niri_input_gui.CONFIG_PATH)
+            for _attribute, tab_class, _title in niri_input_gui.SettingsWindow.TABS:
+                def build(tab_class=tab_class):
+                    tab = tab_class()
+                    tab.bind(niri_input_gui.niri_input.SettingsModel(
+                        niri_input_gui.niri_input.Settings.from_config(config)))
+                    tab.deleteLater()
+                results[f'tab/{tab_class.__name__}'] = measure(build, args.runs)
+            results['window'] = measure(lambda: niri_input_gui.SettingsWindow().deleteLater(), args.runs)
+            app.processEvents()
+
+            for lines in args.sizes:
+                with open(niri_input_gui.CONFIG_PATH, 'w', encoding='utf-8') as f:
+                    f.write(generate(lines))
+                window = niri_input_gui.SettingsWindow()
+                for index in range(window.tabs.count()):
+                    window.build_tab(index)
+                runs = args.runs if lines < 100000 else max(1, args.runs // 3)
+                results[f'load_settings/{lines}'] = measure(window.load_settings, runs)
+
+                def apply():
+                    # A real change, so every run writes the file
+                    checkbox = window.touchpad_tab.tap_checkbox
+                    checkbox.setChecked(not checkbox.isChecked())
+                    window.apply_settings()
+                results[f'apply_settings/{lines}'] = measure(apply, runs)
+                window.deleteLater()
+                app.processEvents()
+
+    try:
+        with open(args.thresholds, encoding='utf-8') as f:
+            thresholds = json.load(f)
+    except FileNotFoundError:
+        thresholds = {}
+    failed = []
+    for name, result in results.items():
+        limit = thresholds.get(name)
+        if limit is not None:
+            result['threshold_ms'] = limit
+            if result['median_ms'] > limit:
+                failed.append(name)
+        mark = '  OVER' if name in failed else ''
+        print(f"{name:>24}: {result['median_ms']:9.2f} ms (best {result['best_ms']:.2f})"
+              f"{'' if limit is None else f', limit {limit}'}{mark}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+            f.write('\n')
+    if undo_failed:
+        print(f"undo left the widget wrong: {', '.join(undo_failed)}", file=sys.stderr)
+    if failed:
+        print(f"over the threshold: {', '.join(failed)}", file=sys.stderr)
+    if failed or undo_failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
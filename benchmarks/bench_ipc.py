@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Compare ways of asking niri for the focused window, against a fake niri.
+
+    subprocess   one process per query, like `niri msg -j focused-window`
+                 (the real niri binary when it is on PATH, otherwise a
+                 Python one-shot client, which is slower to start)
+    one-shot     niri_ipc.request(), a new connection per query
+    client       niri_ipc.Client.request(), one query at a time
+    pipeline     niri_ipc.Client.pipeline() with every query in flight
+    hub          niri_ipc.Client to niri_events' daemon, answered from memory
+
+The fake answers one request per connection like niri does; pass
+--keep-alive to let the client reuse its connection instead.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_events
+import niri_fake
+import niri_ipc
+
+WINDOW = {'id': 42, 'title': 'Terminal', 'app_id': 'qterminal', 'pid': 1234,
+          'workspace_id': 1, 'is_focused': True, 'is_floating': False, 'is_urgent': False}
+
+
+def per_query_us(function, count):
+    start = time.perf_counter()
+    function(count)
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--spawns', type=int, default=50)
+    parser.add_argument('--keep-alive', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'niri.sock')
+        with niri_fake.FakeNiri(path, {'FocusedWindow': WINDOW}, keep_alive=args.keep_alive) as fake:
+            env = dict(os.environ, NIRI_SOCKET=path)
+            if shutil.which('niri'):
+                command = ['niri', 'msg', '-j', 'focused-window']
+            else:
+                command = [sys.executable, os.path.join(HERE, '..', 'scripts', 'niri_ipc.py'), 'focused-window']
+
+            def spawn(count):
+                for _ in range(count):
+                    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+
+            def one_shot(count):
+                for _ in range(count):
+                    niri_ipc.request('FocusedWindow', path=path)
+
+            client = niri_ipc.Client(path)
+
+            def persistent(count):
+                for _ in range(count):
+                    client.focused_window()
+
+            def pipelined(count):
+                for start in range(0, count, 100):
+                    client.pipeline(['FocusedWindow'] * min(100, count - start))
+
+            results = [
+                (f"subprocess ({command[0] if command[0] == 'niri' else 'python'})",
+                 per_query_us(spawn, args.spawns)),
+                ('one-shot', per_query_us(one_shot, args.queries)),
+                ('client', per_query_us(persistent, args.queries)),
+                ('pipeline', per_query_us(pipelined, args.queries)),
+            ]
+            client.close()
+
+            hub_path = os.path.join(tmp, 'events.sock')
+            hub = niri_events.EventHub()
+            threading.Thread(target=asyncio.run, args=(hub.serve(hub_path, path),), daemon=True).start()
+            while not fake.streams:
+                time.sleep(0.001)
+            fake.emit({'WorkspacesChanged': {'workspaces': []}})
+            fake.emit({'WindowsChanged': {'windows': [WINDOW]}})
+            while not hub.state.ready:
+                time.sleep(0.001)
+            hub_client = niri_ipc.Client(hub_path)
+
+            def from_hub(count):
+                for _ in range(count):
+                    hub_client.focused_window()
+
+            results.append(('hub', per_query_us(from_hub, args.queries)))
+            hub_client.close()
+
+    for name, us in results:
+        print(f"{name:>20}: {us:10.1f} us/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Replay recorded events through the keyboard layout indicator and count its output.
+
+events.jsonl is replayed --rounds times, each round starting with the
+KeyboardLayoutsChanged the event daemon replays to a new subscriber. The
+old kbd-plugin printed a line for every layout event; niri_kbd.Indicator
+must print exactly one per real change of layout, which is counted here
+independently from the indices in the stream.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_kbd
+
+EVENTS = os.path.join(HERE, 'events.jsonl')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--events', default=EVENTS, help="JSON lines of niri events")
+    args = parser.parse_args()
+
+    with open(args.events, encoding='utf-8') as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    replay = [event for event in recorded if 'KeyboardLayoutsChanged' in event][:1]
+    events = (replay + recorded) * args.rounds
+
+    old = changes = 0
+    current = None
+    for event in events:
+        if 'KeyboardLayoutSwitched' in event:
+            idx = event['KeyboardLayoutSwitched']['idx']
+        elif 'KeyboardLayoutsChanged' in event:
+            idx = event['KeyboardLayoutsChanged']['keyboard_layouts']['current_idx']
+        else:
+            continue
+        old += 1
+        changes += idx != current
+        current = idx
+
+    indicator = niri_kbd.Indicator(['us', 'es'])
+    start = time.perf_counter()
+    emitted = [label for label in map(indicator.feed, events) if label is not None]
+    elapsed = time.perf_counter() - start
+    if len(emitted) != changes:
+        sys.exit(f"{len(emitted)} lines for {changes} layout changes")
+
+    print(f"{len(events)} events, {old} layout events: old kbd-plugin {old} lines, "
+          f"indicator {len(emitted)} lines ({elapsed / len(events) * 1e6:.2f} us/event)")
+
+
+if __name__ == '__main__':
+    main()
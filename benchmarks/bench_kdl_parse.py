@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Time niri_kdl.parse on generated input.kdl files of growing size.
+
+The time per KiB should stay flat as the file grows; a rising column
+means the parser is no longer linear in the size of the file. The slope
+of log(time) over log(size), fitted over all sizes, is 1 for a linear
+parser and 2 for a quadratic one. The exit status is 1 when it is above
+MAX_SLOPE, or when a full collection of the garbage collector runs during
+the largest parse: those walk every object parsed so far, which made
+large files up to half again as slow per KiB.
+"""
+
+import gc
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import niri_kdl
+
+# Trees that no longer fit in the caches are up to about twice as slow per
+# KiB on small machines, which over these four decades is a slope of about
+# 1.08; n**1.2 or worse is a parser that is not linear any more
+MAX_SLOPE = 1.15
+ROUNDS = 3
+
+BLOCK = '''input {
+    // focus-follows-mouse
+    warp-mouse-to-focus
+    mod-key "Super"
+    touchpad {
+        tap
+        // natural-scroll
+        scroll-method "two-finger"
+        accel-speed 0.7
+        accel-profile "adaptive"
+    }
+    mouse {
+        accel-speed -0.4
+        accel-profile "flat"
+        scroll-factor 1.0
+    }
+    keyboard {
+        xkb {
+            layout "it,ch"
+            options r#"grp:alt_shift_toggle"#
+        }
+        repeat-delay 650
+        repeat-rate 35
+    }
+}
+'''
+
+
+def generate(blocks):
+    return ''.join(BLOCK for _ in range(blocks))
+
+
+def best_of(function, repeat, seconds):
+    """Best time of at least repeat runs, more for fast functions"""
+    best = float('inf')
+    runs = 0
+    end = time.perf_counter() + seconds
+    while runs < repeat or time.perf_counter() < end:
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+        runs += 1
+    return best
+
+
+def full_collections(function):
+    """Number of full (generation 2) collections while function runs"""
+    before = gc.get_stats()[2]['collections']
+    function()
+    return gc.get_stats()[2]['collections'] - before
+
+
+def slope(xs, ys):
+    """Least-squares slope of log(ys) over log(xs)"""
+    xs = [math.log(x) for x in xs]
+    ys = [math.log(y) for y in ys]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+
+def main():
+    sizes = (1, 10, 100, 1000, 10000)
+    texts = [generate(blocks) for blocks in sizes]
+    best = [float('inf')] * len(sizes)
+    # Every size once per round, so that a machine getting slower or faster
+    # during the run does not show up as a slope
+    for _ in range(ROUNDS):
+        for index, text in enumerate(texts):
+            best[index] = min(best[index], best_of(lambda: niri_kdl.parse(text), repeat=1, seconds=0.2))
+
+    print(f"{'blocks':>8} {'KiB':>10} {'ms':>10} {'us/KiB':>10}")
+    per_kib = []
+    for blocks, text, seconds in zip(sizes, texts, best):
+        kib = len(text) / 1024
+        per_kib.append(seconds * 1e6 / kib)
+        print(f"{blocks:>8} {kib:>10.1f} {seconds * 1000:>10.2f} {per_kib[-1]:>10.1f}")
+    growth = slope([len(text) for text in texts], best)
+    collections = full_collections(lambda: niri_kdl.parse(texts[-1]))
+    print(f"log-log slope: {growth:.3f} (limit {MAX_SLOPE}), full collections while parsing "
+          f"the largest: {collections}")
+    if growth > MAX_SLOPE:
+        sys.exit(f"parse time grows as size**{growth:.2f}")
+    if collections:
+        sys.exit("the collector ran during a parse")
+
+
+if __name__ == '__main__':
+    main()
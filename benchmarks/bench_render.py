@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Throughput of niri_render in hosts per second, against one settings run per host.
+
+A generated inventory of --hosts machines (JSON lines, fixed seed) varies
+outputs, workspaces, keyboard layouts and autostart entries. It is
+rendered from the repository's config/src:
+
+    per-host     niri-inputsettings.py --set once per host, for --sample
+                 hosts: what a provisioning script does with the settings
+                 tool, and it only covers input.kdl
+    -j N         niri_render into an empty directory, every file written
+    -j N again   the same again: nothing may be written
+
+Every -j N must produce the same bytes as -j 1.
+"""
+
+import argparse
+import filecmp
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, '..', 'scripts')
+sys.path.insert(0, SCRIPTS)
+
+import niri_render
+
+TEMPLATES = os.path.join(HERE, '..', 'config', 'src')
+LAYOUTS = ('it', 'it,ch', 'de', 'fr', 'us', 'es,us')
+MONITORS = ('HDMI-A-1', 'DP-1', 'DP-2')
+
+
+def inventory(count, seed=1):
+    """Yield count generated hosts"""
+    rng = random.Random(seed)
+    for n in range(count):
+        outputs = [{'name': 'eDP-1', 'scale': rng.choice((1, 1.25, 1.5, 2)), 'x': 0, 'y': rng.choice((0, 700))}]
+        monitor = rng.choice(MONITORS + (None,))
+        if monitor:
+            outputs.append({'name': monitor, 'mode': '2560x1440@59.951', 'x': 1536, 'y': 0})
+        host = {
+            'host': f'host-{n:05d}',
+            'outputs': outputs,
+            'workspaces': {name: monitor or 'eDP-1' for name in ('Gente', 'Git', 'Media')},
+            'input': {'keyboard.xkb.layout': rng.choice(LAYOUTS), 'touchpad.tap': rng.random() < 0.8,
+                      'mouse.accel-speed': round(rng.uniform(-1, 1), 1)},
+        }
+        if rng.random() < 0.5:
+            host['autostart'] = ['nm-applet --indicator', ['blueman-applet']]
+        yield host
+
+
+def _set_args(host):
+    return [f'--set={key}={niri_render.niri_input.format_setting(value)}' for key, value in host['input'].items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=2000)
+    parser.add_argument('--sample', type=int, default=50, help="hosts for the per-host baseline")
+    parser.add_argument('--jobs', type=int, nargs='*', default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    templates = niri_render.load_templates(TEMPLATES)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'inventory.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for host in inventory(args.hosts):
+                f.write(json.dumps(host) + '\n')
+
+        base = os.path.join(tmp, 'per-host')
+        start = time.perf_counter()
+        for host in inventory(args.sample):
+            config = os.path.join(base, host['host'], 'src', 'input.kdl')
+            os.makedirs(os.path.dirname(config))
+            shutil.copy(os.path.join(TEMPLATES, 'input.kdl'), config)
+            subprocess.run([sys.executable, os.path.join(SCRIPTS, 'niri-inputsettings.py'), '--config', config,
+                            *_set_args(host)], check=True)
+        elapsed = time.perf_counter() - start
+        print(f"per-host   : {args.sample / elapsed:7.0f} hosts/s ({args.sample} hosts, input.kdl only)")
+
+        reference = None
+        for jobs in args.jobs:
+            out = os.path.join(tmp, f'j{jobs}')
+            for label in ('', ' again'):
+                start = time.perf_counter()
+                results = list(niri_render.render(niri_render.read_inventory(path), out, templates, jobs))
+                elapsed = time.perf_counter() - start
+                written = sum(len(written) for _name, written, _error in results)
+                errors = [error for _name, _written, error in results if error]
+                if errors:
+                    sys.exit(f"-j {jobs}: {errors[0]}")
+                if label and written:
+                    sys.exit(f"-j {jobs}: {written} files written again")
+                print(f"-j {jobs:2d}{label:6}: {args.hosts / elapsed:7.0f} hosts/s, {written} files written")
+            if reference is None:
+                reference = out
+            elif not _same_tree(reference, out):
+                sys.exit(f"-j {jobs} rendered other bytes than -j {args.jobs[0]}")
+
+
+def _same_tree(a, b):
+    comparison = filecmp.dircmp(a, b)
+    stack = [comparison]
+    while stack:
+        comparison = stack.pop()
+        if comparison.left_only or comparison.right_only:
+            return False
+        _match, mismatch, errors = filecmp.cmpfiles(comparison.left, comparison.right, comparison.common_files,
+                                                    shallow=False)
+        if mismatch or errors:
+            return False
+        stack.extend(comparison.subdirs.values())
+    return True
+
+
+if __name__ == '__main__':
+    main()
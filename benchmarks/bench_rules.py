@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Time window-rule matching as floating.kdl grows, compiled vs one regex at a time.
+
+The repository's rules.kdl and floating.kdl are loaded after
+makefloating's store has added --extra more titles to floating.kdl, and
+matched against generated windows. Both evaluations must agree on every
+window, and the merged regexes makefloating writes must stay plain strings.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_floating
+import niri_rules
+
+CONFIG = os.path.join(HERE, '..', 'config', 'src')
+WORDS = ('Apri', 'file', 'Salva', 'immagine', 'Impostazioni', 'Preferenze', 'Mozilla', 'Firefox',
+         'Password', 'Cerca', 'documento', 'progetto', 'niri', 'config', 'Telegram', 'qterminal',
+         'LXQt', 'Panel', '(1)', '[modificato]', 'v2.3', '—', 'KTimer', 'Esegui', 'dotfiles')
+APP_IDS = ('firefox', 'qterminal', 'featherpad', 'org.telegram.desktop', 'lxqt-archiver', 'pcmanfm-qt',
+           'lxqt-config', 'mpv', 'darktable', 'keepassxc', 'copyq', 'VirtualBox Manager')
+
+
+def title(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 7)))
+
+
+def floating_text(extra, rng, tmp):
+    """floating.kdl and the titles after makefloating toggled extra titles on"""
+    path = os.path.join(tmp, 'floating.kdl')
+    shutil.copyfile(os.path.join(CONFIG, 'floating.kdl'), path)
+    store = niri_floating.FloatingStore(path, os.path.join(tmp, 'floating-titles.json'))
+    store.load()
+    titles = [f"{title(rng)} {n}" for n in range(extra)]
+    for text in titles:
+        store.add(text)
+    store.save()
+    with open(path, encoding='utf-8') as f:
+        return f.read(), titles
+
+
+def merged_regexes(pattern_set):
+    """The title regexes of makefloating's rule that are not plain strings"""
+    return [pattern.text for pattern in pattern_set.patterns.values()
+            if pattern.text.startswith('^(?:') and (pattern.regexes or not pattern.literals)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=2000)
+    parser.add_argument('--extra', type=int, nargs='*', default=[0, 100, 1000])
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    windows = [{'app_id': rng.choice(APP_IDS), 'title': title(rng), 'is_focused': rng.random() < 0.1,
+                'is_floating': False, 'is_urgent': False} for _ in range(args.windows)]
+    with open(os.path.join(CONFIG, 'rules.kdl'), encoding='utf-8') as f:
+        rules_text = f.read()
+
+    for extra in args.extra:
+        with tempfile.TemporaryDirectory() as tmp:
+            text, titles = floating_text(extra, rng, tmp)
+        ruleset = niri_rules.Ruleset()
+        ruleset.add(rules_text, 'rules.kdl')
+        ruleset.add(text, 'floating.kdl')
+        not_literal = merged_regexes(ruleset.patterns['title'])
+        if not_literal:
+            sys.exit(f"makefloating's regexes are not matched as plain strings: {not_literal[0][:80]!r}")
+        # Some windows carry a title that makefloating was asked to float
+        for window in windows[:extra]:
+            window['title'] = rng.choice(titles)
+        start = time.perf_counter()
+        ruleset.compile()
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        for window in windows:
+            if ruleset.matching(window) != ruleset.matching_regexes(window):
+                sys.exit(f"compiled and per-regex matching disagree for {window}")
+        compiled = niri_rules.time_per_window(ruleset.matching, windows)
+        per_regex = niri_rules.time_per_window(ruleset.matching_regexes, windows)
+        patterns = sum(len(pattern_set.patterns) for pattern_set in ruleset.patterns.values())
+        print(f"{patterns:5d} patterns: compile {compile_ms:6.1f} ms, compiled {compiled:7.1f} us/window, "
+              f"per-regex {per_regex:7.1f} us/window")
+
+
+if __name__ == '__main__':
+    main()
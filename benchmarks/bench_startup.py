@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Measure niri-inputsettings time-to-first-frame under the offscreen platform.
+
+Every run starts a fresh interpreter so the PyQt import is paid each time,
+just like a launch from the menu. Reported phases are cumulative from
+process start: module import, QApplication, SettingsWindow construction
+and the first paint event of the window.
+
+Use --max-ms to fail (exit status 1) when the median first frame is slower
+than a threshold, e.g. in a pre-commit hook.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, '..', 'scripts')
+
+CHILD = r'''
+import time
+start = time.perf_counter()
+import json, sys
+sys.path.insert(0, SCRIPTS)
+import niri_input_gui as module
+imported = time.perf_counter()
+
+from PyQt6.QtCore import QEvent, QObject, QTimer
+
+app = module.QApplication(sys.argv)
+created = time.perf_counter()
+window = module.SettingsWindow()
+constructed = time.perf_counter()
+times = {}
+
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and 'first_frame' not in times:
+            times['first_frame'] = time.perf_counter()
+            QTimer.singleShot(0, app.quit)
+        return False
+
+
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+QTimer.singleShot(5000, app.quit)
+app.exec()
+
+ms = lambda t: round((t - start) * 1000, 2)
+print(json.dumps({'import': ms(imported), 'app': ms(created), 'window': ms(constructed),
+                  'first_frame': ms(times.get('first_frame', float('nan')))}))
+'''
+
+
+def run_once(config_home):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', XDG_CONFIG_HOME=config_home)
+    code = f'SCRIPTS = {SCRIPTS!r}\n' + CHILD
+    result = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, help='fail if the median first frame is slower')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as config_home:
+        src = os.path.join(config_home, 'lxqt', 'wayland', 'src')
+        os.makedirs(src)
+        with open(os.path.join(HERE, '..', 'config', 'src', 'input.kdl')) as f_in, \
+                open(os.path.join(src, 'input.kdl'), 'w') as f_out:
+            f_out.write(f_in.read())
+        runs = [run_once(config_home) for _ in range(args.runs)]
+
+    medians = {phase: statistics.median(run[phase] for run in runs) for phase in runs[0]}
+    for phase, value in medians.items():
+        print(f"{phase:>12}: {value:8.2f} ms")
+
+    if args.max_ms is not None and medians['first_frame'] > args.max_ms:
+        print(f"first frame {medians['first_frame']:.2f} ms is over {args.max_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Throughput of niri_validate in trees per second, by number of processes.
+
+--trees copies of the repository's config are written to a temporary
+directory; every tenth one gets an out-of-range accel-speed, so each run
+must report exactly that many trees with errors.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'scripts'))
+
+import niri_validate
+
+CONFIG = os.path.join(HERE, '..', 'config')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trees', type=int, default=500)
+    parser.add_argument('--jobs', type=int, nargs='*', default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = []
+        for n in range(args.trees):
+            tree = os.path.join(tmp, str(n))
+            shutil.copytree(CONFIG, tree)
+            if n % 10 == 0:
+                input_path = os.path.join(tree, 'src', 'input.kdl')
+                with open(input_path, encoding='utf-8') as f:
+                    text = f.read()
+                with open(input_path, 'w', encoding='utf-8') as f:
+                    f.write(text.replace('accel-speed', 'accel-speed 1.5 //', 1))
+            trees.append(tree)
+        expected = (args.trees + 9) // 10
+
+        for jobs in args.jobs:
+            start = time.perf_counter()
+            failed = sum(result['errors'] > 0 for result in niri_validate.validate(trees, jobs))
+            elapsed = time.perf_counter() - start
+            if failed != expected:
+                sys.exit(f"-j {jobs}: {failed} trees with errors, expected {expected}")
+            print(f"-j {jobs:2d}: {args.trees / elapsed:7.0f} trees/s")
+
+
+if __name__ == '__main__':
+    main()
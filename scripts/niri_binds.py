@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Index the key bindings of lxqt-niri.kdl and every file it includes.
+
+    niri_binds.py [--config FILE]... list
+    niri_binds.py [--config FILE]... check
+    niri_binds.py [--config FILE]... key CHORD
+    niri_binds.py [--config FILE]... search TEXT
+
+Every bind is normalized to a chord, a (modifier bitmask, key) pair:
+modifier aliases (Ctrl/Control, Super/Win, Mod5/ISO_Level3_Shift, ...)
+share a bit, Mod is the bit of `input { mod-key }`, and key names are
+compared without case like niri does. `MOD+1`, `Mod+1` and `Super+1` are
+therefore the same chord. The binds of `recent-windows` are indexed on
+their own, since they only apply while the switcher is open.
+
+check reports chords bound twice: a conflict when the two are spelled
+alike, a case-only duplicate when they differ only in letter case, which
+usually means a Shift was meant. key looks a chord up, search finds binds
+whose action or hotkey-overlay-title contains TEXT.
+"""
+
+import argparse
+import sys
+
+import niri_config
+import niri_kdl
+
+SHIFT, CTRL, ALT, SUPER, ISO_LEVEL3_SHIFT, ISO_LEVEL5_SHIFT = 1, 2, 4, 8, 16, 32
+
+# Modifier names niri accepts, in any case
+MODIFIERS = {
+    'shift': SHIFT, 'ctrl': CTRL, 'control': CTRL, 'alt': ALT, 'super': SUPER, 'win': SUPER,
+    'iso_level3_shift': ISO_LEVEL3_SHIFT, 'mod5': ISO_LEVEL3_SHIFT,
+    'iso_level5_shift': ISO_LEVEL5_SHIFT, 'mod3': ISO_LEVEL5_SHIFT,
+}
+BINDS, RECENT_WINDOWS = 'binds', 'recent-windows'
+CONFLICT, CASE_ONLY = 'conflict', 'case-only'
+
+
+def parse_chord(text, mod_key=SUPER):
+    """Return (modifier mask, key) for e.g. 'Mod+Shift+Left', None if invalid"""
+    *names, key = text.split('+')
+    if not key:
+        return None
+    mask = 0
+    for name in names:
+        name = name.lower()
+        if name == 'mod':
+            mask |= mod_key
+        elif name in MODIFIERS:
+            mask |= MODIFIERS[name]
+        else:
+            return None
+    return mask, key.lower()
+
+
+def mod_key(nodes):
+    """Return the modifier bit Mod stands for, from the input blocks among nodes"""
+    bit = SUPER
+    for node in nodes:
+        value = node.find('mod-key') if node.name == 'input' else None
+        if value is not None and value.args and isinstance(value.args[0], str):
+            bit = MODIFIERS.get(value.args[0].lower(), bit)
+    return bit
+
+
+class Bind:
+    """One bind node, with its chord and where it is"""
+
+    __slots__ = ('name', 'chord', 'scope', 'action', 'title', 'location', 'config_file', 'node', '_text')
+
+    def __init__(self, node, chord, scope, config_file):
+        self.name = node.name
+        self.chord = chord
+        self.scope = scope
+        self.action = '; '.join(' '.join(niri_kdl.format_node(child).split()) for child in node.children)
+        title = node.props.get('hotkey-overlay-title')
+        self.title = title if isinstance(title, str) else None
+        self.config_file = config_file
+        self.node = node
+        self.location = config_file.location(node) if config_file is not None else None
+        # What search() looks in
+        self._text = f"{self.action}\n{self.title or ''}".casefold()
+
+    def __str__(self):
+        scope = '' if self.scope == BINDS else f' ({self.scope})'
+        title = f'  "{self.title}"' if self.title else ''
+        return f"{self.location}\t{self.name}{scope}\t{self.action}{title}"
+
+
+class BindIndex:
+    """The binds of a configuration, hashed by (scope, chord)"""
+
+    def __init__(self, mod_key=SUPER):
+        self.mod_key = mod_key
+        self.binds = []         # in configuration order
+        self.by_chord = {}      # (scope, chord) -> [Bind], first bound first
+        self.invalid = []       # Binds whose name is not a key combination
+
+    @classmethod
+    def load(cls, paths=None):
+        """Index the binds of some files and what they include, or of the whole configuration"""
+        nodes = niri_config.load_nodes(paths)
+        if not any(node.name in (BINDS, RECENT_WINDOWS) for _config_file, node in nodes):
+            raise ValueError(f"no binds block in {', '.join(paths or [niri_config.CONFIG_PATH])}")
+        index = cls(mod_key(node for _config_file, node in nodes))
+        for config_file, node in nodes:
+            index.add_node(config_file, node)
+        return index
+
+    def add_node(self, config_file, node):
+        """Index a top-level binds or recent-windows node"""
+        if node.name == BINDS:
+            self.add_block(config_file, node, BINDS)
+        elif node.name == RECENT_WINDOWS:
+            for block in node.all(BINDS):
+                self.add_block(config_file, block, RECENT_WINDOWS)
+
+    def add_block(self, config_file, block, scope=BINDS):
+        for node in block.children:
+            chord = parse_chord(node.name, self.mod_key)
+            bind = Bind(node, chord, scope, config_file)
+            self.binds.append(bind)
+            if chord is None:
+                self.invalid.append(bind)
+            else:
+                self.by_chord.setdefault((scope, chord), []).append(bind)
+
+    def lookup(self, text, scope=BINDS):
+        """Return the binds of a chord, e.g. 'super+shift+a'; [] if none or invalid"""
+        chord = parse_chord(text, self.mod_key)
+        return list(self.by_chord.get((scope, chord), ())) if chord is not None else []
+
+    def search(self, text):
+        """Return the binds whose action or hotkey-overlay-title contains text, in any case"""
+        text = text.casefold()
+        return [bind for bind in self.binds if text in bind._text]
+
+    def conflicts(self):
+        """Return (CONFLICT or CASE_ONLY, first bind, later bind) for chords bound twice"""
+        found = []
+        for binds in self.by_chord.values():
+            first_key = binds[0].name.rpartition('+')[2]
+            for bind in binds[1:]:
+                kind = CASE_ONLY if bind.name.rpartition('+')[2] != first_key else CONFLICT
+                found.append((kind, binds[0], bind))
+        order = {id(bind): n for n, bind in enumerate(self.binds)}
+        found.sort(key=lambda conflict: order[id(conflict[2])])
+        return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', action='append', metavar='FILE',
+                        help="KDL file with binds, and its includes (default: lxqt-niri.kdl)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="print every bind")
+    commands.add_parser('check', help="report chords bound twice and invalid ones")
+    key = commands.add_parser('key', help="print the binds of a key combination")
+    key.add_argument('chord')
+    key.add_argument('--recent-windows', action='store_true', help="look in the recent-windows binds")
+    search = commands.add_parser('search', help="find binds by action or hotkey-overlay-title")
+    search.add_argument('text')
+    args = parser.parse_args()
+
+    try:
+        index = BindIndex.load(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error reading binds: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'check':
+        for bind in index.invalid:
+            print(f"{bind.location}: {bind.name} is not a valid key combination")
+        conflicts = index.conflicts()
+        for kind, first, bind in conflicts:
+            if kind == CASE_ONLY:
+                print(f"{bind.location}: {bind.name} differs only in case from {first.name} at {first.location}")
+            else:
+                print(f"{bind.location}: {bind.name} is already bound at {first.location}")
+        sys.exit(1 if conflicts or index.invalid else 0)
+
+    if args.command == 'list':
+        binds = index.binds
+    elif args.command == 'key':
+        binds = index.lookup(args.chord, RECENT_WINDOWS if args.recent_windows else BINDS)
+    else:
+        binds = index.search(args.text)
+    for bind in binds:
+        print(bind)
+    sys.exit(0 if binds else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Step the brightness of an external monitor over DDC/CI without lagging behind.
+
+    niri_brightness.py daemon [OPTION...]   keep the level in memory (see autostart.kdl)
+    niri_brightness.py step [OPTION...]     what dim.sh does: STEP further, turning at 0 and 100
+    niri_brightness.py up|down [OPTION...]
+    niri_brightness.py set LEVEL [OPTION...]
+    niri_brightness.py get
+
+OPTIONs are passed on to ddcutil, e.g. --display 2.
+
+A DDC/CI write takes hundreds of milliseconds. The daemon answers every
+request at once from memory and only one `ddcutil setvcp 10 LEVEL` runs
+at a time: presses that come while it runs just move the target level,
+so a burst of presses costs two writes, the first one and the level they
+end at. Level and direction are saved PERSIST_DELAY seconds after the
+last change and when the daemon stops, to
+
+    $XDG_STATE_HOME/niri-dotfiles/brightness.json
+
+Requests and replies are JSON lines on $XDG_RUNTIME_DIR/niri-brightness.sock,
+{"command": "step", "options": []} -> {"level": 60, "direction": "down"}.
+Without the daemon the commands write and save in-process, like dim.sh did.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import niri_kdl
+
+STATE_PATH = os.path.join(
+    os.environ.get('XDG_STATE_HOME', os.path.expanduser('~/.local/state')),
+    'niri-dotfiles', 'brightness.json'
+)
+# Where dim.sh kept the level and the direction
+OLD_FILES = (os.path.expanduser('~/.brightness_level'), os.path.expanduser('~/.brightness_direction'))
+
+STEP = 20
+PERSIST_DELAY = 5.0
+UP, DOWN = 'up', 'down'
+COMMANDS = ('step', 'up', 'down', 'set', 'get')
+
+
+def socket_path():
+    """Return the path of the daemon's socket"""
+    if os.environ.get('NIRI_BRIGHTNESS_SOCKET'):
+        return os.environ['NIRI_BRIGHTNESS_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f'/tmp/niri-{os.getuid()}'
+    return os.path.join(runtime_dir, 'niri-brightness.sock')
+
+
+class Brightness:
+    """The level and the direction the next step goes"""
+
+    __slots__ = ('level', 'direction')
+
+    def __init__(self, level=100, direction=DOWN):
+        self.level = level
+        self.direction = direction
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            return cls(int(state['level']), DOWN if state['direction'] == DOWN else UP)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        try:
+            with open(OLD_FILES[0]) as f, open(OLD_FILES[1]) as g:
+                return cls(int(f.read()), DOWN if g.read().strip() == DOWN else UP)
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        niri_kdl.write_atomic(path, json.dumps({'level': self.level, 'direction': self.direction}) + '\n')
+
+    def command(self, name, value=None):
+        """Apply a command; raises ValueError for an unknown one"""
+        if name == 'step':
+            self.go(self.direction)
+        elif name in (UP, DOWN):
+            self.go(name)
+        elif name == 'set':
+            self.level = max(0, min(100, int(value)))
+        elif name != 'get':
+            raise ValueError(f"unknown command {name!r}")
+
+    def go(self, direction):
+        if direction == DOWN:
+            self.level = max(0, self.level - STEP)
+            if self.level == 0:
+                self.direction = UP
+        else:
+            self.level = min(100, self.level + STEP)
+            if self.level == 100:
+                self.direction = DOWN
+
+    def reply(self):
+        return {'level': self.level, 'direction': self.direction}
+
+
+def setvcp_args(level, options):
+    return ['ddcutil', 'setvcp', '10', str(level), *options]
+
+
+class BrightnessDaemon:
+    """Answers requests from memory and keeps one ddcutil write going"""
+
+    def __init__(self, state_path=STATE_PATH):
+        self.state_path = state_path
+        self.brightness = Brightness.load(state_path)
+        self.options = []
+        self.written = None         # level the monitor has, as far as we know
+        self.wanted = asyncio.Event()
+        self.save_handle = None
+        self.writes = 0
+
+    def request(self, req):
+        level = self.brightness.level
+        try:
+            self.brightness.command(req.get('command'), req.get('value'))
+        except (ValueError, TypeError) as e:
+            return {'error': str(e)}
+        if req.get('options') is not None:
+            self.options = list(req['options'])
+        if self.brightness.level != level:
+            self.wanted.set()
+            if self.save_handle is not None:
+                self.save_handle.cancel()
+            self.save_handle = asyncio.get_running_loop().call_later(PERSIST_DELAY, self.save)
+        return self.brightness.reply()
+
+    def save(self):
+        self.save_handle = None
+        try:
+            self.brightness.save(self.state_path)
+        except OSError as e:
+            print(f"Cannot save brightness: {e}", file=sys.stderr)
+
+    async def writer(self):
+        while True:
+            await self.wanted.wait()
+            self.wanted.clear()
+            while self.written != self.brightness.level:
+                level = self.brightness.level
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *setvcp_args(level, self.options), stdout=asyncio.subprocess.DEVNULL)
+                    if await proc.wait() != 0:
+                        print(f"ddcutil could not set brightness {level}", file=sys.stderr)
+                except OSError as e:
+                    print(f"Cannot run ddcutil: {e}", file=sys.stderr)
+                self.writes += 1
+                # Also after a failure: the next press tries again
+                self.written = level
+
+    async def handle_client(self, reader, writer):
+        try:
+            line = await reader.readline()
+            while line:
+                try:
+                    reply = self.request(json.loads(line))
+                except (ValueError, AttributeError):
+                    reply = {'error': 'invalid request'}
+                writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                await writer.drain()
+                line = await reader.readline()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        try:
+            await self.writer()
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            if self.save_handle is not None:
+                self.save()
+
+
+def send(req, path=None):
+    """Send a request to the daemon; None when it is not running"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path or socket_path())
+            sock.sendall(json.dumps(req).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def run_once(req, state_path=STATE_PATH):
+    """Do what the daemon would, writing and saving at once"""
+    brightness = Brightness.load(state_path)
+    level = brightness.level
+    brightness.command(req['command'], req.get('value'))
+    if brightness.level != level:
+        if subprocess.run(setvcp_args(brightness.level, req.get('options') or []),
+                          stdout=subprocess.DEVNULL).returncode != 0:
+            raise OSError(f"ddcutil could not set brightness {brightness.level}")
+        brightness.save(state_path)
+    return brightness.reply()
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in COMMANDS + ('daemon',) or args[0] == 'set' and len(args) < 2:
+        print(f"usage: {os.path.basename(sys.argv[0])} daemon | step | up | down | set LEVEL | get "
+              f"[DDCUTIL_OPTION...]", file=sys.stderr)
+        sys.exit(2)
+
+    if args[0] == 'daemon':
+        daemon = BrightnessDaemon()
+        daemon.options = args[1:]
+        # Leave through the finally clauses, which save the level and remove the socket
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            asyncio.run(daemon.serve(socket_path()))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    req = {'command': args[0]}
+    if args[0] == 'set':
+        req['value'] = args[1]
+        args = args[1:]
+    if args[1:]:
+        req['options'] = args[1:]
+    try:
+        reply = send(req) or run_once(req)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if 'error' in reply:
+        print(reply['error'], file=sys.stderr)
+        sys.exit(1)
+    print(f"Brightness set to {reply['level']} ({reply['direction']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Load lxqt-niri.kdl with every file it includes, parsing each at most once.
+
+    niri_config.py [FILE]       print the include tree, cycles and missing files
+
+Includes are resolved relative to the including file, like niri does. The
+parsed tree of every file is cached in $XDG_CACHE_HOME/niri-dotfiles, keyed
+by path, mtime, size and a hash of the content: when mtime and size are
+unchanged the file is not even read, and when only the mtime changed the
+hash decides whether it has to be parsed again.
+
+    config = niri_config.load()
+    for config_file, node in config.all('window-rule'):
+        print(config_file.location(node))
+"""
+
+import bisect
+import hashlib
+import os
+import pickle
+import sys
+
+import niri_kdl
+
+CONFIG_PATH = os.path.join(
+    os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config')),
+    'lxqt', 'wayland', 'lxqt-niri.kdl'
+)
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'niri-dotfiles', 'kdl'
+)
+
+# Bump when niri_kdl.Node changes, to ignore older cache files
+CACHE_VERSION = 1
+
+
+class ConfigFile:
+    """One parsed file of the configuration"""
+
+    __slots__ = ('path', 'root', 'lines', 'includes', 'cached')
+
+    def __init__(self, path, root, lines, cached):
+        self.path = path
+        self.root = root
+        # Offsets of the line starts, to turn node spans into line numbers
+        self.lines = lines
+        self.includes = []
+        self.cached = cached
+
+    def line(self, node):
+        return bisect.bisect_right(self.lines, node.span[0]) if node.span else None
+
+    def location(self, node):
+        return f"{os.path.basename(self.path)}:{self.line(node)}"
+
+
+class Config:
+    """The files of a configuration, in include order"""
+
+    def __init__(self, main):
+        self.main = main
+        self.files = {}         # path -> ConfigFile, first include first
+        self.cycles = []        # [path, ..., path] for every include that loops
+        self.missing = []       # (including path, missing path)
+
+    def nodes(self, path=None, _seen=None):
+        """Yield (ConfigFile, node) for every top-level node, includes expanded"""
+        config_file = self.files.get(path or self.main)
+        if config_file is None:
+            return
+        seen = (_seen or ()) + (config_file.path,)
+        for node in config_file.root.children:
+            if node.name != 'include':
+                yield config_file, node
+                continue
+            target = _include_path(config_file.path, node)
+            if target is not None and target not in seen:
+                yield from self.nodes(target, seen)
+
+    def all(self, name):
+        """Return (ConfigFile, node) for every top-level node called name"""
+        return [(config_file, node) for config_file, node in self.nodes() if node.name == name]
+
+
+def _include_path(including, node):
+    if not node.args or not isinstance(node.args[0], str):
+        return None
+    path = os.path.expanduser(node.args[0])
+    return os.path.normpath(os.path.join(os.path.dirname(including), path))
+
+
+def _line_starts(text):
+    starts = [0]
+    pos = text.find('\n')
+    while pos >= 0:
+        starts.append(pos + 1)
+        pos = text.find('\n', pos + 1)
+    return starts
+
+
+class _Cache:
+    """Parsed trees stored by content hash, with an index of path -> file key.
+
+    A file whose mtime changed but whose content did not only updates the
+    index; trees no path refers to any more are removed.
+    """
+
+    def __init__(self, cache_dir):
+        self.dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.pickle')
+        self.dirty = False
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            index = None
+        if not isinstance(index, dict) or index.get('version') != CACHE_VERSION:
+            index = {'version': CACHE_VERSION, 'files': {}}
+        self.files = index['files']      # path -> (mtime_ns, size, sha256)
+
+    def _tree_path(self, digest):
+        return os.path.join(self.dir, digest + '.pickle')
+
+    def _read_tree(self, digest):
+        try:
+            with open(self._tree_path(digest), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+
+    def parse(self, path):
+        st = os.stat(path)
+        known = self.files.get(path)
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            entry = self._read_tree(known[2])
+            if entry is not None:
+                return ConfigFile(path, entry[0], entry[1], True)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        entry = self._read_tree(digest) if known is not None and known[2] == digest else None
+        cached = entry is not None
+        if entry is None:
+            text = data.decode('utf-8')
+            try:
+                entry = (niri_kdl.parse(text), _line_starts(text))
+            except niri_kdl.KdlError as e:
+                e.path = path
+                e.args = (f"{path}: {e}",)
+                raise
+            self._write(self._tree_path(digest), entry)
+            if known is not None and known[2] != digest and \
+                    not any(other[2] == known[2] for other_path, other in self.files.items() if other_path != path):
+                _remove(self._tree_path(known[2]))
+        self.files[path] = (st.st_mtime_ns, st.st_size, digest)
+        self.dirty = True
+        return ConfigFile(path, entry[0], entry[1], cached)
+
+    def save(self):
+        if self.dirty:
+            self._write(self.index_path, {'version': CACHE_VERSION, 'files': self.files})
+            self.dirty = False
+
+    def _write(self, path, value):
+        """Write a cache file; a cache that cannot be written is no error"""
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _parse_uncached(path):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return ConfigFile(path, niri_kdl.parse(text), _line_starts(text), False)
+    except niri_kdl.KdlError as e:
+        e.path = path
+        e.args = (f"{path}: {e}",)
+        raise
+
+
+def parse_file(path, cache_dir=CACHE_DIR):
+    """Return a ConfigFile, from the cache when the file has not changed"""
+    if not cache_dir:
+        return _parse_uncached(path)
+    cache = _Cache(cache_dir)
+    config_file = cache.parse(path)
+    cache.save()
+    return config_file
+
+
+def load(path=CONFIG_PATH, cache_dir=CACHE_DIR):
+    """Load a configuration file and everything it includes"""
+    config = Config(os.path.abspath(path))
+    cache = _Cache(cache_dir) if cache_dir else None
+    _visit(config, config.main, (), cache)
+    if cache is not None:
+        cache.save()
+    return config
+
+
+def load_nodes(paths=None, cache_dir=CACHE_DIR):
+    """Return (ConfigFile, node) for the top-level nodes of the configuration,
+    or of some files, includes expanded; a file reached by several of them
+    only counts once"""
+    if paths is None:
+        return list(load(cache_dir=cache_dir).nodes())
+    nodes = []
+    done = set()
+    for path in paths:
+        config = load(path, cache_dir)
+        nodes += [(config_file, node) for config_file, node in config.nodes() if config_file.path not in done]
+        done.update(config.files)
+    return nodes
+
+
+def _visit(config, path, stack, cache):
+    if path in stack:
+        config.cycles.append(list(stack[stack.index(path):]) + [path])
+        return
+    if path in config.files:
+        return
+    config_file = cache.parse(path) if cache is not None else _parse_uncached(path)
+    config.files[path] = config_file
+    for node in config_file.root.all('include'):
+        target = _include_path(path, node)
+        if target is None:
+            continue
+        config_file.includes.append(target)
+        if not os.path.exists(target):
+            if not node.props.get('optional'):
+                config.missing.append((path, target))
+            continue
+        _visit(config, target, stack + (path,), cache)
+
+
+def _print_tree(config, path, depth, stack):
+    config_file = config.files[path]
+    note = ' (cached)' if config_file.cached else ''
+    print(f"{'    ' * depth}{os.path.relpath(path, os.path.dirname(config.main))}{note}")
+    for target in config_file.includes:
+        if target in config.files and target not in stack:
+            _print_tree(config, target, depth + 1, stack + (target,))
+
+
+def main():
+    if len(sys.argv) > 2 or sys.argv[1:2] in (['-h'], ['--help']):
+        print(f"usage: {os.path.basename(sys.argv[0])} [FILE]", file=sys.stderr)
+        sys.exit(2)
+    try:
+        config = load(sys.argv[1] if len(sys.argv) > 1 else CONFIG_PATH)
+    except (OSError, niri_kdl.KdlError) as e:
+        print(f"Error reading configuration: {e}", file=sys.stderr)
+        sys.exit(1)
+    _print_tree(config, config.main, 0, (config.main,))
+    for cycle in config.cycles:
+        print(f"include cycle: {' -> '.join(cycle)}", file=sys.stderr)
+    for including, target in config.missing:
+        print(f"{including}: included file {target} does not exist", file=sys.stderr)
+    sys.exit(1 if config.cycles or config.missing else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Share one niri event stream between any number of helpers.
+
+    niri_events.py daemon                       run the hub (see autostart.kdl)
+    niri_events.py subscribe [TYPE...]          print events as JSON lines
+    niri_events.py focused-window [FIELD]       answer from the hub's memory
+    niri_events.py window ID [FIELD]
+    niri_events.py workspace NAME [FIELD]
+    niri_events.py urgent
+
+The daemon reads niri's event stream once and forwards each event to the
+subscribers that asked for its type. Subscribers connect to a Unix socket
+and send one JSON line with the list of event types they want (an empty
+list means everything). Every subscriber has a bounded queue: when a slow
+one falls behind, its oldest events are dropped instead of holding up the
+others. Late subscribers first get the latest keyboard layout, overview
+and config events, so they start from the current state.
+
+The daemon also keeps a niri_state.State up to date from the stream and
+speaks niri's request protocol on the same socket: requests it can answer
+from memory (focused window, windows, workspaces, ...) never reach niri,
+anything else is forwarded. client() returns a niri_ipc.Client for the
+daemon, so helpers need no compositor round trip for queries:
+
+    with niri_events.client() as niri:
+        window = niri.focused_window()
+
+subscribe() and client() fall back to niri itself when the daemon is not
+running, so helpers work either way.
+"""
+
+import asyncio
+import collections
+import json
+import os
+import signal
+import socket
+import sys
+
+import niri_ipc
+import niri_state
+
+# The latest event of these types is replayed to new subscribers
+REPLAY = ('KeyboardLayoutsChanged', 'KeyboardLayoutSwitched',
+          'OverviewOpenedOrClosed', 'ConfigLoaded')
+
+QUEUE_SIZE = 1024
+
+
+def hub_path():
+    """Return the path of the daemon's socket"""
+    if os.environ.get('NIRI_EVENTS_SOCKET'):
+        return os.environ['NIRI_EVENTS_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f'/tmp/niri-{os.getuid()}'
+    return os.path.join(runtime_dir, 'niri-events.sock')
+
+
+def event_type(line):
+    """Return the type of a raw event line without decoding all of it"""
+    # niri writes events as {"Type":{...}}
+    if line.startswith(b'{"'):
+        end = line.find(b'"', 2)
+        if end > 0:
+            return line[2:end].decode('utf-8')
+    return next(iter(json.loads(line)), None)
+
+
+class _Subscriber:
+    __slots__ = ('types', 'queue', 'ready', 'dropped')
+
+    def __init__(self, types, queue_size):
+        self.types = frozenset(types) if types else None
+        self.queue = collections.deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def wants(self, kind):
+        return self.types is None or kind in self.types
+
+    def put(self, line):
+        """Queue a line; True when the queue is at least half full"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(line)
+        self.ready.set()
+        return 2 * len(self.queue) >= self.queue.maxlen
+
+
+class EventHub:
+    """Fan niri events out to subscribers connected to a Unix socket"""
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.latest = {}
+        self.published = 0
+        self.backlog = False
+        self.state = niri_state.State()
+        self.niri_path = None
+
+    def publish(self, line):
+        """Queue one raw event line for every subscriber that wants it"""
+        kind = event_type(line)
+        self.published += 1
+        if kind in REPLAY:
+            # Keep them in arrival order, a layout switch follows the layout list
+            self.latest.pop(kind, None)
+            self.latest[kind] = line
+        if kind in self.state.handlers:
+            self.state.apply(json.loads(line))
+        for subscriber in self.subscribers:
+            if subscriber.wants(kind) and subscriber.put(line):
+                self.backlog = True
+
+    async def read_niri(self, path=None):
+        """Publish every event niri sends until the stream ends"""
+        self.niri_path = path or niri_ipc.socket_path()
+        reader, writer = await asyncio.open_unix_connection(self.niri_path, limit=16 * 1024 * 1024)
+        writer.write(b'"EventStream"\n')
+        await writer.drain()
+        reply = json.loads(await reader.readline() or b'{}')
+        if 'Ok' not in reply:
+            raise niri_ipc.NiriError(reply.get('Err', "niri refused the event stream"))
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            self.publish(line)
+            if self.backlog:
+                # readline() does not yield while niri's data is buffered; let
+                # the subscribers drain before their queues overflow
+                self.backlog = False
+                await asyncio.sleep(0)
+        writer.close()
+
+    async def answer(self, line):
+        """Return the reply line for a request line, asking niri if needed"""
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            return json.dumps({'Err': f"invalid request: {e}"}).encode('utf-8') + b'\n'
+        payload = self.state.answer(req) if self.state.ready else None
+        if payload is not None:
+            return json.dumps({'Ok': payload}).encode('utf-8') + b'\n'
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.niri_path, limit=16 * 1024 * 1024)
+            writer.write(line)
+            await writer.drain()
+            reply = await reader.readline()
+            writer.close()
+        except OSError as e:
+            reply = b''
+            error = str(e)
+        else:
+            error = "niri closed the connection without replying"
+        return reply or json.dumps({'Err': error}).encode('utf-8') + b'\n'
+
+    async def handle_requests(self, line, reader, writer):
+        """Answer request lines until the client hangs up"""
+        while line:
+            writer.write(await self.answer(line))
+            await writer.drain()
+            line = await reader.readline()
+
+    async def handle_client(self, reader, writer):
+        try:
+            line = await reader.readline()
+            if line.lstrip().startswith(b'['):
+                await self.handle_subscriber(json.loads(line), writer)
+            elif line:
+                await self.handle_requests(line, reader, writer)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # niri's stream ended and the daemon is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def handle_subscriber(self, types, writer):
+        subscriber = _Subscriber(types, self.queue_size)
+        for kind, line in self.latest.items():
+            if subscriber.wants(kind):
+                subscriber.put(line)
+        self.subscribers.add(subscriber)
+        try:
+            while True:
+                await subscriber.ready.wait()
+                subscriber.ready.clear()
+                lines = b''.join(subscriber.queue)
+                subscriber.queue.clear()
+                writer.write(lines)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(subscriber)
+
+    async def serve(self, path, niri_path=None):
+        """Accept subscribers on path while niri's stream lasts"""
+        if os.path.exists(path):
+            os.unlink(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        try:
+            await self.read_niri(niri_path)
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def subscribe(types=(), path=None):
+    """Yield events of the given types as dicts, from the daemon if it runs"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or hub_path())
+    except OSError:
+        sock.close()
+        # No daemon: read niri's own stream and filter here
+        wanted = frozenset(types)
+        with niri_ipc.Client() as niri:
+            for event in niri.event_stream():
+                if not wanted or next(iter(event)) in wanted:
+                    yield event
+        return
+    with sock, sock.makefile('rb') as reader:
+        sock.sendall(json.dumps(list(types)).encode('utf-8') + b'\n')
+        for line in reader:
+            yield niri_ipc.parse_event(line)
+
+
+def client(path=None, timeout=1.0):
+    """Return a niri_ipc.Client for the daemon, or for niri when it is not running"""
+    path = path or hub_path()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+    except OSError:
+        return niri_ipc.Client(timeout=timeout)
+    return niri_ipc.Client(path, timeout)
+
+
+def query(req):
+    """Return the Ok payload for a request only the daemon understands.
+
+    Without the daemon the state is fetched from niri and answered here.
+    """
+    with client() as niri:
+        if niri.path == hub_path():
+            return niri.request(req)
+        return niri_state.State.from_niri(niri).answer(req)
+
+
+def _print_record(data, field):
+    if data is None:
+        return 1
+    if field:
+        value = data.get(field)
+        print('' if value is None else value)
+    elif 'app_id' in data:
+        print(f"{data['id']}\t{data['app_id']}\t{data['title']}")
+    else:
+        print(f"{data['id']}\t{data['output']}\t{data['name'] or data['idx']}")
+    return 0
+
+
+def main():
+    usage = (f"usage: {os.path.basename(sys.argv[0])} daemon | subscribe [TYPE...] | "
+             "focused-window [FIELD] | window ID [FIELD] | workspace NAME [FIELD] | urgent")
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else (None, [])
+    arity = {'daemon': (0, 0), 'subscribe': (0, None), 'focused-window': (0, 1),
+             'window': (1, 2), 'workspace': (1, 2), 'urgent': (0, 0)}
+    if command not in arity or len(args) < arity[command][0] or \
+            (arity[command][1] is not None and len(args) > arity[command][1]):
+        print(usage, file=sys.stderr)
+        sys.exit(2)
+    try:
+        if command == 'daemon':
+            # Leave through the finally blocks, which remove the socket
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            asyncio.run(EventHub().serve(hub_path()))
+        elif command == 'subscribe':
+            for event in subscribe(args):
+                print(json.dumps(event), flush=True)
+        elif command == 'focused-window':
+            with client() as niri:
+                data = niri.request('FocusedWindow')['FocusedWindow']
+            sys.exit(_print_record(data, args[0] if args else None))
+        elif command == 'window':
+            data = query({'Window': int(args[0])})['Window']
+            sys.exit(_print_record(data, args[1] if len(args) > 1 else None))
+        elif command == 'workspace':
+            data = query({'Workspace': args[0]})['Workspace']
+            sys.exit(_print_record(data, args[1] if len(args) > 1 else None))
+        else:
+            for data in query('UrgentWindows')['UrgentWindows']:
+                _print_record(data, None)
+    except (niri_ipc.NiriError, OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
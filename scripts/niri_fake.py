@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""A stand-in for niri's IPC socket, to try the helpers without a compositor.
+
+    niri_fake.py /tmp/fake-niri.sock
+    NIRI_SOCKET=/tmp/fake-niri.sock niri-inputsettings.py
+
+Every request is printed and answered: actions with "Handled", other
+requests from the canned replies, or with an error. Like niri, it answers
+one request per connection unless told otherwise, and "EventStream"
+connections receive whatever is passed to emit(). Given a
+niri_state.State, it also answers FocusedWindow, Windows, Workspaces and
+KeyboardLayouts from the events emitted so far (see niri_replay.py).
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+
+
+class FakeNiri:
+    """Serve niri IPC requests on a Unix socket from a background thread"""
+
+    def __init__(self, path, replies=None, keep_alive=False, state=None):
+        self.path = path
+        # request name -> Ok payload, e.g. {'FocusedWindow': {...}}
+        self.replies = dict(replies or {})
+        self.keep_alive = keep_alive
+        self.state = state
+        self.requests = []
+        self.streams = []
+        # Also notified when an event stream connects
+        self.lock = threading.Condition()
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(64)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        with self.lock:
+            for conn in self.streams:
+                conn.close()
+            self.streams = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def serve(self):
+        while self.server is not None:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def reply(self, req):
+        """Return the reply object for a decoded request"""
+        name = req if isinstance(req, str) else next(iter(req))
+        if name == 'Action':
+            return {'Ok': 'Handled'}
+        if self.state is not None:
+            with self.lock:
+                answer = self.state.answer(req)
+            if answer is not None:
+                return {'Ok': answer}
+        if name in self.replies:
+            return {'Ok': {name: self.replies[name]}}
+        return {'Err': f"fake niri cannot answer {name}"}
+
+    def emit(self, event):
+        """Send an event to every EventStream connection"""
+        line = json.dumps(event).encode('utf-8') + b'\n'
+        with self.lock:
+            if self.state is not None:
+                self.state.apply(event)
+            streams = list(self.streams)
+        # Not under the lock: a consumer waiting for a reply would block it
+        for conn in streams:
+            try:
+                conn.sendall(line)
+            except OSError:
+                with self.lock:
+                    if conn in self.streams:
+                        self.streams.remove(conn)
+                conn.close()
+
+    def wait_for_streams(self, count, timeout=None):
+        """Wait until count EventStream connections are open; False on timeout"""
+        with self.lock:
+            return self.lock.wait_for(lambda: len(self.streams) >= count, timeout)
+
+    def handle(self, conn):
+        with conn.makefile('rb') as f:
+            for line in f:
+                req = json.loads(line)
+                with self.lock:
+                    self.requests.append(req)
+                if req == 'EventStream':
+                    conn.sendall(b'{"Ok":"Handled"}\n')
+                    with self.lock:
+                        self.streams.append(conn)
+                        self.lock.notify_all()
+                    return
+                try:
+                    conn.sendall(json.dumps(self.reply(req)).encode('utf-8') + b'\n')
+                except OSError:
+                    break
+                if not self.keep_alive:
+                    break
+        conn.close()
+
+
+class _PrintingFakeNiri(FakeNiri):
+    def reply(self, req):
+        print(json.dumps(req), flush=True)
+        return super().reply(req)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(f"usage: {os.path.basename(sys.argv[0])} SOCKET", file=sys.stderr)
+        sys.exit(2)
+    fake = _PrintingFakeNiri(sys.argv[1])
+    fake.start()
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
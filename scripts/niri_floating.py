@@ -0,0 +1,208 @@
+"""Titles of always-floating windows, as makefloating toggles them.
+
+makefloating owns one window rule in floating.kdl, between two marker
+comments. Its titles are merged into a few anchored alternation regexes,
+so niri evaluates a bounded number of matchers however long the list gets:
+
+    // makefloating: always floating titles, rewritten on every toggle
+    window-rule {
+        match title=r#"^(?:Apri file|Esegui file|Salva immagine - Di tendenz.*)$"#
+        open-floating true
+    }
+    // makefloating: end
+
+Titles longer than LONG_TITLE match by their first characters. The titles
+are indexed in a JSON file under $XDG_STATE_HOME, so a toggle neither
+parses nor searches floating.kdl: the index is rebuilt only when the file
+was changed by something else. Everything outside the markers is left as
+it is, apart from removing `match title=` lines that older versions of
+makefloating added to other floating rules.
+"""
+
+import json
+import os
+
+import niri_kdl
+import niri_rules
+
+BEGIN = '// makefloating: always floating titles, rewritten on every toggle'
+END = '// makefloating: end'
+
+# Longer titles match by their first LONG_TITLE + 1 characters
+LONG_TITLE = 28
+# Alternatives per regex
+CHUNK = 40
+
+EXACT, PREFIX = 'exact', 'prefix'
+
+# Characters with a meaning in niri's (Rust) regexes
+REGEX_SPECIAL = set('\\.+*?()|[]{}^$')
+
+INDEX_PATH = os.path.join(
+    os.environ.get('XDG_STATE_HOME', os.path.expanduser('~/.local/state')),
+    'niri-dotfiles', 'floating-titles.json'
+)
+
+
+def escape(text):
+    """Escape the characters with a meaning in niri's (Rust) regexes"""
+    return ''.join('\\' + char if char in REGEX_SPECIAL else char for char in text)
+
+
+def title_key(title):
+    """Return the (text, kind) a window title is stored as"""
+    if len(title) > LONG_TITLE:
+        return title[:LONG_TITLE + 1], PREFIX
+    return title, EXACT
+
+
+def legacy_matcher(title):
+    """Return the match title= value older makefloating versions wrote"""
+    if len(title) > LONG_TITLE:
+        return f"^{escape(title[:LONG_TITLE + 1])}.*$"
+    return escape(title)
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [os.path.realpath(path), st.st_mtime_ns, st.st_size]
+
+
+class FloatingStore:
+    """The titles of makefloating's rule, indexed by title"""
+
+    def __init__(self, config_path, index_path=INDEX_PATH):
+        self.config_path = config_path
+        self.index_path = index_path
+        self.titles = {}            # text -> EXACT or PREFIX
+        self.legacy = set()         # match title= values in other floating rules
+        self.text = None
+
+    def load(self):
+        """Read the index, or rebuild it when floating.kdl changed since"""
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if index is not None and index.get('config') == _file_key(self.config_path):
+            self.titles = index['titles']
+            self.legacy = set(index['legacy'])
+        else:
+            self.rebuild()
+
+    def rebuild(self):
+        """Read the titles and older matchers from floating.kdl"""
+        self.titles = {}
+        self.legacy = set()
+        try:
+            text = self._read()
+        except FileNotFoundError:
+            return
+        start, end = self._region(text)
+        outside = text if start is None else text[:start] + text[end:]
+        for rule in niri_kdl.parse(outside).all('window-rule'):
+            if rule.child('open-floating') is None:
+                continue
+            for node in rule.all('match'):
+                if list(node.props) == ['title'] and isinstance(node.props['title'], str):
+                    self.legacy.add(node.props['title'])
+        if start is None:
+            return
+        for rule in niri_kdl.parse(text[start:end]).all('window-rule'):
+            for node in rule.all('match'):
+                regex = node.props.get('title', '')
+                if not (regex.startswith('^(?:') and regex.endswith(')$')):
+                    continue
+                for alternative in niri_rules.alternatives(regex):
+                    parsed = niri_rules.literal(alternative)
+                    if parsed is not None:
+                        self.titles[parsed[1]] = EXACT if parsed[2] else PREFIX
+
+    def _read(self):
+        if self.text is None:
+            with open(self.config_path, encoding='utf-8') as f:
+                self.text = f.read()
+        return self.text
+
+    @staticmethod
+    def _region(text):
+        """Return the span of the marked rule, markers included, or (None, None)"""
+        start = text.find(BEGIN)
+        if start < 0:
+            return None, None
+        end = text.find(END, start)
+        if end < 0:
+            raise niri_kdl.KdlError(f"{BEGIN!r} without {END!r}")
+        end += len(END)
+        if text.startswith('\n', end):
+            end += 1
+        return start, end
+
+    def __contains__(self, title):
+        text, kind = title_key(title)
+        return self.titles.get(text) == kind or legacy_matcher(title) in self.legacy
+
+    def add(self, title):
+        text, kind = title_key(title)
+        self.titles[text] = kind
+
+    def remove(self, title):
+        """Forget a title, also when an older makefloating added it"""
+        text, kind = title_key(title)
+        if self.titles.get(text) == kind:
+            del self.titles[text]
+        matcher = legacy_matcher(title)
+        if matcher in self.legacy:
+            doc = niri_kdl.Document(self._read())
+            for rule in doc.root.all('window-rule'):
+                if rule.child('open-floating') is not None:
+                    for node in rule.all('match'):
+                        if node.props == {'title': matcher}:
+                            doc.remove(node)
+            self.text = doc.render()
+            self.legacy.discard(matcher)
+
+    def toggle(self, title):
+        """Add or remove a title; True when it floats now"""
+        if title in self:
+            self.remove(title)
+            return False
+        self.add(title)
+        return True
+
+    def render(self):
+        """Return the marked rule for the current titles"""
+        alternatives = [escape(text) + ('.*' if kind == PREFIX else '')
+                        for text, kind in sorted(self.titles.items())]
+        if not alternatives:
+            # A rule without matches would make every window float
+            return f"{BEGIN}\n{END}\n"
+        rule = niri_kdl.Node('window-rule')
+        for start in range(0, len(alternatives), CHUNK):
+            regex = niri_kdl.RawString(f"^(?:{'|'.join(alternatives[start:start + CHUNK])})$")
+            rule.children.append(niri_kdl.Node('match', props={'title': regex}))
+        rule.children.append(niri_kdl.Node('open-floating', [True]))
+        return f"{BEGIN}\n{niri_kdl.format_node(rule)}{END}\n"
+
+    def save(self):
+        """Write floating.kdl and the index; True if floating.kdl changed"""
+        try:
+            text = self._read()
+        except FileNotFoundError:
+            text = ''
+        start, end = self._region(text)
+        if start is None:
+            separator = '' if not text or text.endswith('\n\n') else '\n' if text.endswith('\n') else '\n\n'
+            text = f"{text}{separator}{self.render()}"
+        else:
+            text = text[:start] + self.render() + text[end:]
+        written = niri_kdl.write_atomic(self.config_path, text)
+        self.text = text
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        index = {'config': _file_key(self.config_path), 'titles': self.titles, 'legacy': sorted(self.legacy)}
+        niri_kdl.write_atomic(self.index_path, json.dumps(index, ensure_ascii=False, indent=1) + '\n')
+        return written
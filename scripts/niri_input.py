@@ -0,0 +1,568 @@
+"""Input settings of niri-inputsettings, without any Qt.
+
+Every setting has a dotted key such as 'touchpad.tap' or 'keyboard.xkb.layout'
+that maps to a node below the 'input' block of input.kdl. The GUI and the
+command line both read and write settings through get() and put().
+"""
+
+import os
+import sys
+
+import niri_kdl
+
+
+# Configuration path:
+CONFIG_PATH = os.path.join(
+    os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config')),
+    'lxqt', 'wayland', 'src', 'input.kdl'
+)
+
+# Named profiles are whole input.kdl files in this directory next to input.kdl
+PROFILES_DIR = 'input-profiles'
+
+FLAG, FLOAT, INT, STRING = 'flag', 'float', 'int', 'string'
+
+# key -> (type, allowed values, value niri uses when the node is missing)
+SETTINGS = {
+    'general.warp-mouse-to-focus': (FLAG, None, False),
+    'general.focus-follows-mouse': (FLAG, None, False),
+    'general.disable-power-key-handling': (FLAG, None, False),
+    'general.workspace-auto-back-and-forth': (FLAG, None, False),
+    'general.mod-key': (STRING, ('Super', 'Alt', 'Ctrl', 'Shift', 'Mod3', 'Mod5', 'ISO_Level3_Shift',
+                                 'ISO_Level5_Shift'), 'Super'),
+    'touchpad.tap': (FLAG, None, False),
+    'touchpad.dwt': (FLAG, None, False),
+    'touchpad.natural-scroll': (FLAG, None, False),
+    'touchpad.drag-lock': (FLAG, None, False),
+    'touchpad.disabled-on-external-mouse': (FLAG, None, False),
+    'touchpad.left-handed': (FLAG, None, False),
+    'touchpad.scroll-method': (STRING, ('two-finger', 'edge', 'on-button-down', 'no-scroll'), 'two-finger'),
+    'touchpad.accel-speed': (FLOAT, None, 0.0),
+    'touchpad.accel-profile': (STRING, ('adaptive', 'flat'), 'adaptive'),
+    'mouse.natural-scroll': (FLAG, None, False),
+    'mouse.left-handed': (FLAG, None, False),
+    'mouse.middle-emulation': (FLAG, None, False),
+    'mouse.accel-speed': (FLOAT, None, 0.0),
+    'mouse.accel-profile': (STRING, ('adaptive', 'flat'), 'adaptive'),
+    'mouse.scroll-factor': (FLOAT, None, 1.0),
+    'keyboard.track-layout': (STRING, ('global', 'window'), 'global'),
+    'keyboard.numlock': (FLAG, None, False),
+    'keyboard.xkb.layout': (STRING, None, ''),
+    'keyboard.xkb.options': (STRING, None, ''),
+    'keyboard.repeat-delay': (INT, None, 600),
+    'keyboard.repeat-rate': (INT, None, 25),
+}
+
+# key -> (lowest, highest) value niri accepts, for numeric settings
+RANGES = {
+    'touchpad.accel-speed': (-1.0, 1.0),
+    'mouse.accel-speed': (-1.0, 1.0),
+    'mouse.scroll-factor': (0.0, 100.0),
+    'keyboard.repeat-delay': (0, 65535),
+    'keyboard.repeat-rate': (0, 255),
+}
+
+_TRUE = ('true', 'yes', 'on', '1')
+_FALSE = ('false', 'no', 'off', '0')
+
+
+def node_path(key):
+    """Return the KDL path of a setting, e.g. ('input', 'touchpad', 'tap')"""
+    section, _, rest = key.partition('.')
+    names = tuple(rest.split('.'))
+    return ('input',) + names if section == 'general' else ('input', section) + names
+
+
+def get(config, key):
+    """Read a setting from a parsed config; None when it is not set.
+
+    config is a niri_kdl.Node tree or Document. Flags are never None:
+    they are True when the node is present and False otherwise.
+    """
+    kind = SETTINGS[key][0]
+    node = config.find(*node_path(key))
+    if kind == FLAG:
+        return node is not None
+    if node is None or not node.args:
+        return None
+    value = node.args[0]
+    if kind == FLOAT:
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if kind == INT:
+        return value if isinstance(value, int) and not isinstance(value, bool) else None
+    return value if isinstance(value, str) else None
+
+
+def put(doc, key, value):
+    """Write a setting into a niri_kdl.Document"""
+    path = node_path(key)
+    if SETTINGS[key][0] == FLAG:
+        doc.set_enabled(path, bool(value))
+    elif value is None:
+        doc.set_enabled(path, False)
+    else:
+        doc.set_value(path, value)
+
+
+def parse_value(key, text):
+    """Convert a command line value for key, raising ValueError if invalid"""
+    kind, choices, _default = SETTINGS[key]
+    if kind == FLAG:
+        if text.lower() in _TRUE:
+            return True
+        if text.lower() in _FALSE:
+            return False
+        raise ValueError(f"{key} must be true or false, not {text!r}")
+    if kind in (FLOAT, INT):
+        value = float(text) if kind == FLOAT else int(text)
+        low, high = RANGES.get(key, (value, value))
+        if not low <= value <= high:
+            raise ValueError(f"{key} must be between {low} and {high}, not {text!r}")
+        return value
+    if choices is not None and text not in choices:
+        raise ValueError(f"{key} must be one of {', '.join(choices)}, not {text!r}")
+    return text
+
+
+def load_document(path):
+    """Read input.kdl as a Document; an empty one if it does not exist yet"""
+    try:
+        return niri_kdl.Document.load(path)
+    except FileNotFoundError:
+        return niri_kdl.Document('// Generated by niri-inputsettings.py\n')
+
+
+def profiles_dir(config_path=CONFIG_PATH):
+    return os.path.join(os.path.dirname(config_path), PROFILES_DIR)
+
+
+def profile_path(name, config_path=CONFIG_PATH):
+    """Return the file of a named profile, raising ValueError for an invalid name"""
+    if not name or '/' in name or name.startswith('.'):
+        raise ValueError(f"invalid profile name {name!r}")
+    return os.path.join(profiles_dir(config_path), name + '.kdl')
+
+
+def list_profiles(config_path=CONFIG_PATH):
+    try:
+        names = os.listdir(profiles_dir(config_path))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-4] for name in names if name.endswith('.kdl') and not name.startswith('.'))
+
+
+def active_profile(config_path=CONFIG_PATH):
+    """Return the name of the profile input.kdl links to, or None"""
+    try:
+        target = os.readlink(config_path)
+    except OSError:
+        return None
+    directory, name = os.path.split(os.path.join(os.path.dirname(config_path), target))
+    if os.path.normpath(directory) != os.path.normpath(profiles_dir(config_path)) or not name.endswith('.kdl'):
+        return None
+    return name[:-4]
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def activate_profile(name, config_path=CONFIG_PATH):
+    """Make input.kdl a symlink to a profile; returns False if it already was.
+
+    The link is made beside input.kdl and renamed over it, so niri sees the
+    old settings or the new ones and nothing is parsed. Raises
+    FileNotFoundError for a missing profile and FileExistsError when
+    input.kdl is a file of its own that no profile holds, as replacing it
+    would lose it.
+    """
+    path = profile_path(name, config_path)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"no input profile {name!r} in {profiles_dir(config_path)}")
+    target = os.path.relpath(path, os.path.dirname(config_path))
+    if os.path.islink(config_path):
+        if os.readlink(config_path) == target:
+            return False
+    elif os.path.exists(config_path):
+        data = _read(config_path)
+        if not any(_read(profile_path(other, config_path)) == data for other in list_profiles(config_path)):
+            raise FileExistsError(f"{config_path} is not a profile, save it first with --save-profile NAME")
+
+    link = os.path.join(os.path.dirname(config_path), f".{os.path.basename(config_path)}.{os.getpid()}")
+    os.symlink(target, link)
+    try:
+        os.replace(link, config_path)
+    except OSError:
+        os.unlink(link)
+        raise
+    return True
+
+
+def next_profile(config_path=CONFIG_PATH):
+    """Return the profile after the active one, in name order; None without profiles"""
+    names = list_profiles(config_path)
+    if not names:
+        return None
+    active = active_profile(config_path)
+    return names[(names.index(active) + 1) % len(names)] if active in names else names[0]
+
+
+def format_setting(value):
+    """Return a setting the way the command line prints and accepts it"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _attribute(key):
+    """Return the record attribute of a setting, e.g. 'xkb_layout' for 'keyboard.xkb.layout'"""
+    return key.partition('.')[2].replace('.', '_').replace('-', '_')
+
+
+def _coerce(key, value):
+    """Return value with the type of the setting; None stays None except for flags"""
+    kind = SETTINGS[key][0]
+    if kind == FLAG:
+        return bool(value)
+    if value is None:
+        return None
+    if kind == FLOAT:
+        return float(value)
+    if kind == INT:
+        return int(value)
+    return str(value)
+
+
+class _Section:
+    """Settings of one section, one attribute per key.
+
+    Records are never changed after they are made: replace() returns a
+    new one, so Settings snapshots can share the records they have in common.
+    """
+
+    __slots__ = ()
+    SECTION = None
+    KEYS = ()       # keys in the order of __slots__
+
+    def __init_subclass__(cls):
+        cls.KEYS = tuple(key for key in SETTINGS if key.partition('.')[0] == cls.SECTION)
+        assert tuple(map(_attribute, cls.KEYS)) == cls.__slots__, cls.__name__
+
+    def __init__(self, *values):
+        for name, key, value in zip(self.__slots__, self.KEYS, values):
+            object.__setattr__(self, name, _coerce(key, value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only, use replace()")
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(*(get(config, key) for key in cls.KEYS))
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def replace(self, name, value):
+        values = list(self.values())
+        values[self.__slots__.index(name)] = value
+        return type(self)(*values)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.values() == self.values()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={value!r}" for name, value in zip(self.__slots__, self.values()))
+        return f"{type(self).__name__}({fields})"
+
+
+class GeneralSettings(_Section):
+    __slots__ = ('warp_mouse_to_focus', 'focus_follows_mouse', 'disable_power_key_handling',
+                 'workspace_auto_back_and_forth', 'mod_key')
+    SECTION = 'general'
+
+
+class TouchpadSettings(_Section):
+    __slots__ = ('tap', 'dwt', 'natural_scroll', 'drag_lock', 'disabled_on_external_mouse', 'left_handed',
+                 'scroll_method', 'accel_speed', 'accel_profile')
+    SECTION = 'touchpad'
+
+
+class MouseSettings(_Section):
+    __slots__ = ('natural_scroll', 'left_handed', 'middle_emulation', 'accel_speed', 'accel_profile',
+                 'scroll_factor')
+    SECTION = 'mouse'
+
+
+class KeyboardSettings(_Section):
+    __slots__ = ('track_layout', 'numlock', 'xkb_layout', 'xkb_options', 'repeat_delay', 'repeat_rate')
+    SECTION = 'keyboard'
+
+
+class Settings:
+    """Every input setting, as one record per section.
+
+    Like the records, a Settings is never changed: set() returns a new one
+    that shares the untouched sections with this one.
+    """
+
+    __slots__ = ('general', 'touchpad', 'mouse', 'keyboard')
+    SECTIONS = (GeneralSettings, TouchpadSettings, MouseSettings, KeyboardSettings)
+
+    def __init__(self, general, touchpad, mouse, keyboard):
+        self.general = general
+        self.touchpad = touchpad
+        self.mouse = mouse
+        self.keyboard = keyboard
+
+    @classmethod
+    def from_config(cls, config):
+        """Read the settings of a niri_kdl.Node tree or Document"""
+        return cls(*(section.from_config(config) for section in cls.SECTIONS))
+
+    def get(self, key):
+        return getattr(getattr(self, key.partition('.')[0]), _attribute(key))
+
+    def set(self, key, value):
+        """Return the settings with key set to value; self when that changes nothing"""
+        section = key.partition('.')[0]
+        record = getattr(self, section)
+        if getattr(record, _attribute(key)) == _coerce(key, value):
+            return self
+        records = [getattr(self, name) for name in self.__slots__]
+        records[self.__slots__.index(section)] = record.replace(_attribute(key), value)
+        return Settings(*records)
+
+    def changed(self, other):
+        """Return the keys whose values differ between self and other"""
+        keys = []
+        for name, section in zip(self.__slots__, self.SECTIONS):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            # Shared records are equal without comparing their fields
+            if mine is not theirs:
+                keys.extend(key for key, a, b in zip(section.KEYS, mine.values(), theirs.values()) if a != b)
+        return keys
+
+    def take(self, keys, source):
+        """Return the settings with the values of keys from the Settings source"""
+        settings = self
+        for key in keys:
+            settings = settings.set(key, source.get(key))
+        return settings
+
+    def write(self, doc, keys):
+        """Put the values of keys into a niri_kdl.Document"""
+        for key in keys:
+            put(doc, key, self.get(key))
+
+
+class SettingsModel:
+    """What the settings window edits: the saved settings, the current ones and the history.
+
+    Edits are not written anywhere until the window saves, and then only
+    the dirty keys, those whose value differs from the saved one. Undo and
+    redo keep whole Settings snapshots; each shares all but one record
+    with its neighbour, so an edit costs one small record and a long
+    session stays small. Edits of the same key in a row, such as the ticks
+    of a spinbox, are one step.
+
+    When another program changes the file, merge() takes its values for
+    the keys not edited here. Keys edited here and changed there too are
+    conflicts, kept as edited until the window asks which one wins.
+
+    Listeners are called with the changed keys when the current settings
+    change under the widgets: undo, redo, merge() and reset(), not set().
+    """
+
+    HISTORY = 500
+
+    def __init__(self, saved=None):
+        self.saved = self.current = saved or Settings.from_config(niri_kdl.Node(None))
+        self.undo_stack = []
+        self.redo_stack = []
+        self.last_key = None
+        self.conflicting = set()
+        self.listeners = []
+
+    def set(self, key, value):
+        """Record an edit made in the widgets"""
+        settings = self.current.set(key, value)
+        if settings is self.current:
+            return
+        if key != self.last_key or not self.undo_stack:
+            self.undo_stack.append(self.current)
+            del self.undo_stack[:-self.HISTORY]
+        self.redo_stack.clear()
+        self.last_key = key
+        self.current = settings
+
+    def undo(self):
+        if self.undo_stack:
+            self.redo_stack.append(self.current)
+            self._show(self.undo_stack.pop())
+
+    def redo(self):
+        if self.redo_stack:
+            self.undo_stack.append(self.current)
+            self._show(self.redo_stack.pop())
+
+    def reset(self, saved, current=None):
+        """Start over from freshly loaded settings, forgetting the history"""
+        self.saved = saved
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.conflicting.clear()
+        self._show(current or saved)
+
+    def merge(self, disk):
+        """Take in the settings read from a file changed elsewhere; return the new conflicts"""
+        changed = disk.changed(self.saved)
+        if not changed:
+            return []
+        dirty = set(self.dirty())
+        taken = [key for key in changed if key not in dirty]
+        conflicts = [key for key in changed if key in dirty and disk.get(key) != self.current.get(key)]
+        self.saved = disk
+        self.conflicting.update(conflicts)
+        # Into the history too, so that undo does not bring the old values back
+        self.undo_stack[:] = [settings.take(taken, disk) for settings in self.undo_stack]
+        self.redo_stack[:] = [settings.take(taken, disk) for settings in self.redo_stack]
+        self._show(self.current.take(taken, disk))
+        return conflicts
+
+    def conflicts(self):
+        """Return the keys edited here that were also changed in the file"""
+        return [key for key in self.dirty() if key in self.conflicting]
+
+    def revert(self, keys):
+        """Drop the edits of keys, as one step that can be undone"""
+        settings = self.current.take(keys, self.saved)
+        if settings is not self.current:
+            self.undo_stack.append(self.current)
+            self.redo_stack.clear()
+            self._show(settings)
+
+    def dirty(self):
+        """Return the keys edited since the last save"""
+        return self.current.changed(self.saved)
+
+    def write(self, doc):
+        """Put the dirty keys into a niri_kdl.Document"""
+        self.current.write(doc, self.dirty())
+
+    def mark_saved(self):
+        self.saved = self.current
+        self.conflicting.clear()
+
+    def _show(self, settings):
+        keys = settings.changed(self.current)
+        self.current = settings
+        self.last_key = None
+        if keys:
+            for listener in self.listeners:
+                listener(keys)
+
+
+def run_cli(config_path, changes=(), keys=(), show_all=False):
+    """Apply KEY=VALUE changes with a single write, then print settings.
+
+    Returns the exit status: 0 on success, 2 for invalid input and 1 when
+    the file could not be read or written.
+    """
+    # A bare file name has no directory to create or link from
+    config_path = os.path.abspath(config_path)
+    values = {}
+    for change in changes:
+        key, sep, text = change.partition('=')
+        if not sep or key not in SETTINGS:
+            print(f"Unknown setting {key!r}, use --list to see them all", file=sys.stderr)
+            return 2
+        try:
+            values[key] = parse_value(key, text)
+        except ValueError as e:
+            print(f"Invalid value for {key}: {e}", file=sys.stderr)
+            return 2
+    for key in keys:
+        if key not in SETTINGS:
+            print(f"Unknown setting {key!r}, use --list to see them all", file=sys.stderr)
+            return 2
+
+    try:
+        doc = load_document(config_path)
+    except (OSError, niri_kdl.KdlError) as e:
+        print(f"Error reading configuration: {e}", file=sys.stderr)
+        return 1
+
+    if values:
+        for key, value in values.items():
+            put(doc, key, value)
+        try:
+            os.makedirs(os.path.dirname(config_path), exist_ok=True)
+            doc.save(config_path)
+        except OSError as e:
+            print(f"Error saving configuration: {e}", file=sys.stderr)
+            return 1
+
+    for key in keys:
+        value = get(doc, key)
+        print(format_setting(SETTINGS[key][2] if value is None else value))
+    if show_all:
+        for key, (_kind, _choices, default) in SETTINGS.items():
+            value = get(doc, key)
+            print(f"{key}={format_setting(default if value is None else value)}")
+    return 0
+
+
+def run_profile_cli(config_path, save=None, use=None, changes=(), show=False):
+    """Save input.kdl with KEY=VALUE changes as profile save, then switch to profile use.
+
+    Returns the exit status like run_cli(). The changes only go into the
+    saved profile; switching writes nothing but the link.
+    """
+    # A bare file name has no directory to create or link from
+    config_path = os.path.abspath(config_path)
+    # Imported here: the other commands never talk to niri
+    import niri_ipc
+
+    values = {}
+    for change in changes:
+        key, sep, text = change.partition('=')
+        if not sep or key not in SETTINGS:
+            print(f"Unknown setting {key!r}, use --list to see them all", file=sys.stderr)
+            return 2
+        try:
+            values[key] = parse_value(key, text)
+        except ValueError as e:
+            print(f"Invalid value for {key}: {e}", file=sys.stderr)
+            return 2
+
+    try:
+        if save is not None:
+            doc = load_document(config_path)
+            for key, value in values.items():
+                put(doc, key, value)
+            path = profile_path(save, config_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            niri_kdl.write_atomic(path, doc.render())
+            print(f"Input profile {save} saved to {path}")
+        if use is not None and use not in list_profiles(config_path):
+            print(f"Unknown input profile {use!r}, use --profiles to see them all", file=sys.stderr)
+            return 2
+        if use is not None and activate_profile(use, config_path):
+            try:
+                niri_ipc.action('LoadConfigFile')
+            except niri_ipc.NiriError:
+                pass    # niri's own watcher picks the new link up
+            print(f"Input profile {use} active")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except (OSError, niri_kdl.KdlError) as e:
+        print(f"Cannot switch input profile: {e}", file=sys.stderr)
+        return 1
+
+    if show:
+        active = active_profile(config_path)
+        for name in list_profiles(config_path):
+            print(f"{'*' if name == active else ' '} {name}")
+    return 0
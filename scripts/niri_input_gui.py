@@ -0,0 +1,803 @@
+"""Qt window of niri-inputsettings"""
+
+import functools
+import os
+import sys
+
+import niri_trace
+
+with niri_trace.span('import PyQt6'):
+    from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                                 QHBoxLayout, QRadioButton, QLabel, QFrame,
+                                 QButtonGroup, QPushButton, QCheckBox, QDoubleSpinBox,
+                                 QComboBox, QTabWidget, QSpinBox, QLineEdit, QGroupBox, QMessageBox)
+    from PyQt6.QtCore import QEvent, QFileSystemWatcher, QObject, QTimer
+    from PyQt6.QtGui import QKeySequence, QShortcut
+
+import niri_input
+import niri_ipc
+import niri_kdl
+from niri_input import CONFIG_PATH
+
+
+class _Tab(QWidget):
+    """A page of settings, bound to the window's SettingsModel.
+
+    WIDGETS maps every key the page shows to the attribute of its widget,
+    or for radio buttons to {value: attribute}.
+    """
+
+    WIDGETS = {}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent = parent
+        self.model = None
+        self.loading = False
+        self.init_ui()
+
+    def bind(self, model):
+        """Show the model's settings and pass every edit on to it"""
+        self.model = model
+        self.load_settings(model.current)
+        for key, name in self.WIDGETS.items():
+            if isinstance(name, dict):
+                for value, radio in name.items():
+                    getattr(self, radio).toggled.connect(self.edit_checked(key, value))
+                continue
+            widget = getattr(self, name)
+            if isinstance(widget, QCheckBox):
+                widget.toggled.connect(functools.partial(self.edit, key))
+            elif isinstance(widget, QComboBox):
+                widget.currentTextChanged.connect(functools.partial(self.edit, key))
+            elif isinstance(widget, QLineEdit):
+                widget.textEdited.connect(functools.partial(self.edit, key))
+            else:
+                widget.valueChanged.connect(functools.partial(self.edit, key))
+
+    def load_settings(self, settings, keys=None):
+        """Show a niri_input.Settings in the widgets, or only in those of keys.
+
+        The signals this fires are not edits.
+        """
+        with niri_trace.span(f'{type(self).__name__}.load_settings'):
+            self.loading = True
+            try:
+                for key in self.WIDGETS if keys is None else keys:
+                    if key in self.WIDGETS:
+                        self.show_value(key, settings.get(key))
+            finally:
+                self.loading = False
+
+    def show_value(self, key, value):
+        if value is None:
+            # Not in the file means niri's default; showing anything else,
+            # such as the value an undone edit left, would not be written
+            value = niri_input.SETTINGS[key][2]
+        name = self.WIDGETS[key]
+        if isinstance(name, dict):
+            # A value without a button changes nothing
+            radio = name.get(value)
+            if radio is not None:
+                getattr(self, radio).setChecked(True)
+            return
+        widget = getattr(self, name)
+        if isinstance(widget, QCheckBox):
+            widget.setChecked(value)
+        elif isinstance(widget, QComboBox):
+            index = widget.findText(str(value))
+            if index >= 0:
+                widget.setCurrentIndex(index)
+        elif isinstance(widget, QLineEdit):
+            # setText() moves the cursor, even to the same text
+            if widget.text() != value:
+                widget.setText(value)
+        else:
+            widget.setValue(value)
+
+    def edit(self, key, value):
+        if self.model is not None and not self.loading:
+            self.model.set(key, value)
+
+    def edit_checked(self, key, value):
+        """Return a slot for a radio button's toggled signal that sets key to value"""
+        return lambda checked: self.edit(key, value) if checked else None
+
+
+class GeneralTab(_Tab):
+    WIDGETS = {
+        'general.warp-mouse-to-focus': 'warp_mouse_to_focus_checkbox',
+        'general.focus-follows-mouse': 'focus_follows_mouse_checkbox',
+        'general.disable-power-key-handling': 'disable_power_key_checkbox',
+        'general.workspace-auto-back-and-forth': 'workspace_auto_back_forth_checkbox',
+        'general.mod-key': {"Super": 'super_radio', "Alt": 'alt_radio', "Ctrl": 'ctrl_radio'},
+    }
+
+    @niri_trace.traced
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        # General configuration section
+        general_frame = QFrame()
+        general_frame.setFrameStyle(QFrame.Shape.StyledPanel)
+        general_layout = QVBoxLayout(general_frame)
+
+        # General checkboxes
+        self.warp_mouse_to_focus_checkbox = QCheckBox('Warp mouse to focus')
+        self.focus_follows_mouse_checkbox = QCheckBox('Focus follows mouse')
+        self.disable_power_key_checkbox = QCheckBox('Disable power key handling')
+        self.workspace_auto_back_forth_checkbox = QCheckBox('Workspace auto back and forth')
+
+        general_layout.addWidget(self.warp_mouse_to_focus_checkbox)
+        general_layout.addWidget(self.focus_follows_mouse_checkbox)
+        general_layout.addWidget(self.disable_power_key_checkbox)
+        general_layout.addWidget(self.workspace_auto_back_forth_checkbox)
+
+        # Mod key selection with radio buttons
+        general_layout.addSpacing(10)  # Adds 10px of empty space
+        mod_key_label = QLabel('Mod Key:')
+        general_layout.addWidget(mod_key_label)
+
+        self.mod_key_group = QButtonGroup(self)
+        self.super_radio = QRadioButton('Super')
+        self.alt_radio = QRadioButton('Alt')
+        self.ctrl_radio = QRadioButton('Ctrl')
+
+        self.mod_key_group.addButton(self.super_radio)
+        self.mod_key_group.addButton(self.alt_radio)
+        self.mod_key_group.addButton(self.ctrl_radio)
+
+        # Default to Super
+        self.super_radio.setChecked(True)
+
+        # Layout for radio buttons
+        mod_key_radio_layout = QHBoxLayout()
+        mod_key_radio_layout.addWidget(self.super_radio)
+        mod_key_radio_layout.addWidget(self.alt_radio)
+        mod_key_radio_layout.addWidget(self.ctrl_radio)
+        mod_key_radio_layout.addStretch()
+
+        general_layout.addLayout(mod_key_radio_layout)
+
+        layout.addWidget(general_frame)
+        layout.addStretch()
+
+
+
+class TouchpadTab(_Tab):
+    WIDGETS = {
+        'touchpad.tap': 'tap_checkbox',
+        'touchpad.dwt': 'dwt_checkbox',
+        'touchpad.natural-scroll': 'natural_scroll_checkbox',
+        'touchpad.drag-lock': 'drag_lock_checkbox',
+        'touchpad.disabled-on-external-mouse': 'disable_external_mouse_checkbox',
+        'touchpad.left-handed': 'left_handed_checkbox',
+        'touchpad.scroll-method': {"two-finger": 'two_finger_radio', "edge": 'edge_radio'},
+        'touchpad.accel-speed': 'accel_speed_spinbox',
+        'touchpad.accel-profile': 'accel_profile_combobox',
+    }
+
+    @niri_trace.traced
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        # Touchpad configuration section
+        touchpad_frame = QFrame()
+        touchpad_frame.setFrameStyle(QFrame.Shape.StyledPanel)
+        touchpad_layout = QVBoxLayout(touchpad_frame)
+
+        # Touchpad checkboxes
+        self.tap_checkbox = QCheckBox('Tap to click')
+        self.natural_scroll_checkbox = QCheckBox('Natural scroll')
+        self.drag_lock_checkbox = QCheckBox('Drag lock')
+        self.disable_external_mouse_checkbox = QCheckBox('Disable when external mouse connected')
+        self.dwt_checkbox = QCheckBox('Disable while typing')
+        self.left_handed_checkbox = QCheckBox('Left handed')
+
+        touchpad_layout.addWidget(self.tap_checkbox)
+        touchpad_layout.addWidget(self.natural_scroll_checkbox)
+        touchpad_layout.addWidget(self.drag_lock_checkbox)
+        touchpad_layout.addWidget(self.disable_external_mouse_checkbox)
+        touchpad_layout.addWidget(self.dwt_checkbox)
+        touchpad_layout.addWidget(self.left_handed_checkbox)
+
+        # Scroll method selection
+        touchpad_layout.addSpacing(10)  # Adds 10px of empty space
+        scroll_label = QLabel('Scroll Method:')
+        touchpad_layout.addWidget(scroll_label)
+
+        self.scroll_group = QButtonGroup(self)
+        self.two_finger_radio = QRadioButton('Two Finger')
+        self.edge_radio = QRadioButton('Edge')
+
+        self.scroll_group.addButton(self.two_finger_radio)
+        self.scroll_group.addButton(self.edge_radio)
+
+        touchpad_layout.addWidget(self.two_finger_radio)
+        touchpad_layout.addWidget(self.edge_radio)
+
+        # Acceleration speed
+        accel_speed_layout = QHBoxLayout()
+        accel_speed_label = QLabel('Acceleration Speed:')
+        self.accel_speed_spinbox = QDoubleSpinBox()
+        self.accel_speed_spinbox.setRange(*niri_input.RANGES['touchpad.accel-speed'])
+        self.accel_speed_spinbox.setSingleStep(0.1)
+        self.accel_speed_spinbox.setValue(0.2)
+        self.accel_speed_spinbox.setDecimals(1)
+
+        accel_speed_layout.addWidget(accel_speed_label)
+        accel_speed_layout.addWidget(self.accel_speed_spinbox)
+        accel_speed_layout.addStretch()
+        touchpad_layout.addLayout(accel_speed_layout)
+
+        # Acceleration profile
+        accel_profile_layout = QHBoxLayout()
+        accel_profile_label = QLabel('Acceleration Profile:')
+        self.accel_profile_combobox = QComboBox()
+        self.accel_profile_combobox.addItems(["flat", "adaptive"])
+
+        accel_profile_layout.addWidget(accel_profile_label)
+        accel_profile_layout.addWidget(self.accel_profile_combobox)
+        accel_profile_layout.addStretch()
+        touchpad_layout.addLayout(accel_profile_layout)
+
+        layout.addWidget(touchpad_frame)
+        layout.addStretch()
+
+
+
+class MouseTab(_Tab):
+    WIDGETS = {
+        'mouse.natural-scroll': 'natural_scroll_checkbox',
+        'mouse.left-handed': 'left_handed_checkbox',
+        'mouse.middle-emulation': 'middle_emulation_checkbox',
+        'mouse.accel-speed': 'accel_speed_spinbox',
+        'mouse.accel-profile': 'accel_profile_combobox',
+        'mouse.scroll-factor': 'scroll_factor_spinbox',
+    }
+
+    @niri_trace.traced
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        # Mouse configuration section
+        mouse_frame = QFrame()
+        mouse_frame.setFrameStyle(QFrame.Shape.StyledPanel)
+        mouse_layout = QVBoxLayout(mouse_frame)
+
+        # Mouse checkboxes
+        self.natural_scroll_checkbox = QCheckBox('Natural scroll')
+        self.left_handed_checkbox = QCheckBox('Left handed')
+        self.middle_emulation_checkbox = QCheckBox('Middle button emulation')
+
+        mouse_layout.addWidget(self.natural_scroll_checkbox)
+        mouse_layout.addWidget(self.left_handed_checkbox)
+        mouse_layout.addWidget(self.middle_emulation_checkbox)
+
+        # Acceleration speed
+        accel_speed_layout = QHBoxLayout()
+        accel_speed_label = QLabel('Acceleration Speed:')
+        self.accel_speed_spinbox = QDoubleSpinBox()
+        self.accel_speed_spinbox.setRange(*niri_input.RANGES['mouse.accel-speed'])
+        self.accel_speed_spinbox.setSingleStep(0.1)
+        self.accel_speed_spinbox.setValue(0.2)
+        self.accel_speed_spinbox.setDecimals(1)
+
+        accel_speed_layout.addWidget(accel_speed_label)
+        accel_speed_layout.addWidget(self.accel_speed_spinbox)
+        accel_speed_layout.addStretch()
+        mouse_layout.addLayout(accel_speed_layout)
+
+        # Acceleration profile
+        accel_profile_layout = QHBoxLayout()
+        accel_profile_label = QLabel('Acceleration Profile:')
+        self.accel_profile_combobox = QComboBox()
+        self.accel_profile_combobox.addItems(["flat", "adaptive"])
+
+        accel_profile_layout.addWidget(accel_profile_label)
+        accel_profile_layout.addWidget(self.accel_profile_combobox)
+        accel_profile_layout.addStretch()
+        mouse_layout.addLayout(accel_profile_layout)
+
+        # Scroll factor
+        scroll_factor_layout = QHBoxLayout()
+        scroll_factor_label = QLabel('Scroll Factor:')
+        self.scroll_factor_spinbox = QDoubleSpinBox()
+        self.scroll_factor_spinbox.setRange(*niri_input.RANGES['mouse.scroll-factor'])
+        self.scroll_factor_spinbox.setSingleStep(0.1)
+        self.scroll_factor_spinbox.setValue(1.0)
+        self.scroll_factor_spinbox.setDecimals(1)
+
+        scroll_factor_layout.addWidget(scroll_factor_label)
+        scroll_factor_layout.addWidget(self.scroll_factor_spinbox)
+        scroll_factor_layout.addStretch()
+        mouse_layout.addLayout(scroll_factor_layout)
+
+        layout.addWidget(mouse_frame)
+        layout.addStretch()
+
+
+
+class KeyboardTab(_Tab):
+    WIDGETS = {
+        'keyboard.track-layout': 'track_layout_combobox',
+        'keyboard.numlock': 'numlock_checkbox',
+        'keyboard.xkb.layout': 'layout_edit',
+        'keyboard.xkb.options': 'options_edit',
+        'keyboard.repeat-delay': 'repeat_delay_spinbox',
+        'keyboard.repeat-rate': 'repeat_rate_spinbox',
+    }
+
+    @niri_trace.traced
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        # Keyboard configuration section
+        keyboard_frame = QFrame()
+        keyboard_frame.setFrameStyle(QFrame.Shape.StyledPanel)
+        keyboard_layout = QVBoxLayout(keyboard_frame)
+
+        # Numlock checkbox
+        self.numlock_checkbox = QCheckBox('Num Lock enabled')
+        keyboard_layout.addWidget(self.numlock_checkbox)
+
+        # Track layout
+        track_layout_layout = QHBoxLayout()
+        track_layout_label = QLabel('Track Layout:')
+        self.track_layout_combobox = QComboBox()
+        self.track_layout_combobox.addItems(["window", "global"])
+
+        track_layout_layout.addWidget(track_layout_label)
+        track_layout_layout.addWidget(self.track_layout_combobox)
+        track_layout_layout.addStretch()
+        keyboard_layout.addLayout(track_layout_layout)
+
+        # XKB Settings Group
+        xkb_group = QGroupBox("XKB Settings")
+        xkb_layout = QVBoxLayout(xkb_group)
+
+        # Layout
+        layout_layout = QHBoxLayout()
+        layout_label = QLabel('Layout:')
+        self.layout_edit = QLineEdit()
+        self.layout_edit.setText("us")
+
+        layout_layout.addWidget(layout_label)
+        layout_layout.addWidget(self.layout_edit)
+        layout_layout.addStretch()
+        xkb_layout.addLayout(layout_layout)
+
+        # Options
+        options_layout = QHBoxLayout()
+        options_label = QLabel('Options:')
+        self.options_edit = QLineEdit()
+        self.options_edit.setText("grp:alt_shift_toggle,compose:rctrl")
+
+        options_layout.addWidget(options_label)
+        options_layout.addWidget(self.options_edit)
+        options_layout.addStretch()
+        xkb_layout.addLayout(options_layout)
+
+        keyboard_layout.addWidget(xkb_group)
+
+        # Repeat settings
+        repeat_group = QGroupBox("Repeat Settings")
+        repeat_layout = QVBoxLayout(repeat_group)
+
+        # Repeat delay
+        repeat_delay_layout = QHBoxLayout()
+        repeat_delay_label = QLabel('Repeat Delay:')
+        self.repeat_delay_spinbox = QSpinBox()
+        self.repeat_delay_spinbox.setRange(100, 2000)
+        self.repeat_delay_spinbox.setSingleStep(100)
+        self.repeat_delay_spinbox.setValue(500)
+        self.repeat_delay_spinbox.setSuffix(' ms')
+
+        repeat_delay_layout.addWidget(repeat_delay_label)
+        repeat_delay_layout.addWidget(self.repeat_delay_spinbox)
+        repeat_delay_layout.addStretch()
+        repeat_layout.addLayout(repeat_delay_layout)
+
+        # Repeat rate
+        repeat_rate_layout = QHBoxLayout()
+        repeat_rate_label = QLabel('Repeat Rate:')
+        self.repeat_rate_spinbox = QSpinBox()
+        self.repeat_rate_spinbox.setRange(1, 100)
+        self.repeat_rate_spinbox.setValue(30)
+
+        repeat_rate_layout.addWidget(repeat_rate_label)
+        repeat_rate_layout.addWidget(self.repeat_rate_spinbox)
+        repeat_rate_layout.addStretch()
+        repeat_layout.addLayout(repeat_rate_layout)
+
+        keyboard_layout.addWidget(repeat_group)
+
+        layout.addWidget(keyboard_frame)
+        layout.addStretch()
+
+
+
+class LivePreview:
+    """Apply spinbox changes while they are being edited.
+
+    niri takes input settings only from its config file, so a preview writes
+    input.kdl and then asks niri over $NIRI_SOCKET to reload it right away.
+    Changes are debounced: every tick restarts the timer, so a burst of
+    ticks ends up as one write and one reload. The text from before the
+    first preview is kept until Apply commits or closing reverts it; when
+    another program changes input.kdl meanwhile, its changes are kept in
+    that text too, and every preview starts from the file on disk.
+    """
+
+    DELAY_MS = 250
+
+    def __init__(self, window):
+        self.window = window
+        self.committed = None  # input.kdl without the preview, None if no preview
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DELAY_MS)
+        self.timer.timeout.connect(self.flush)
+        self.enabled = False
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled:
+            self.revert()
+
+    def schedule(self):
+        """Note a change; the preview happens once changes settle"""
+        if self.enabled:
+            self.timer.start()
+
+    def flush(self):
+        """Write the previewed settings and make niri reload them"""
+        # Take in a change not noticed yet, before this write hides it
+        self.window.reload_settings()
+        self.timer.stop()
+        config_path = self.window.get_config_path()
+        try:
+            doc = niri_input.load_document(config_path)
+            if self.committed is None:
+                self.committed = doc.source
+            self.window.update_document(doc)
+            if niri_kdl.write_atomic(config_path, doc.render()):
+                self.window.file_written()
+                self.reload()
+        except (OSError, niri_kdl.KdlError) as e:
+            print(f"Error previewing configuration: {e}")
+
+    def reload(self):
+        try:
+            niri_ipc.action('LoadConfigFile')
+        except niri_ipc.NiriError as e:
+            # niri still picks the file up through its own watcher
+            print(f"Could not ask niri to reload: {e}")
+
+    def commit(self):
+        """The previewed file is now the saved one"""
+        self.timer.stop()
+        self.committed = None
+
+    def revert(self):
+        """Put back the file without the preview, keeping what other programs changed"""
+        if self.committed is not None:
+            self.window.reload_settings()
+        self.timer.stop()
+        if self.committed is None:
+            return
+        try:
+            if niri_kdl.write_atomic(self.window.get_config_path(), self.committed):
+                self.window.file_written()
+                self.reload()
+        except OSError as e:
+            print(f"Error restoring configuration: {e}")
+        self.committed = None
+
+
+class SettingsWindow(QMainWindow):
+    # Tabs are built the first time they are shown: (attribute, class, title)
+    TABS = (
+        ('general_tab', GeneralTab, "General"),
+        ('touchpad_tab', TouchpadTab, "Touchpad"),
+        ('mouse_tab', MouseTab, "Mouse"),
+        ('keyboard_tab', KeyboardTab, "Keyboard"),
+    )
+
+    # Spinboxes previewed while they change, per tab attribute
+    LIVE_WIDGETS = {
+        'touchpad_tab': ('accel_speed_spinbox',),
+        'mouse_tab': ('accel_speed_spinbox', 'scroll_factor_spinbox'),
+        'keyboard_tab': ('repeat_delay_spinbox', 'repeat_rate_spinbox'),
+    }
+
+    # Milliseconds without changes to input.kdl before it is read again
+    RELOAD_DELAY_MS = 200
+
+    def __init__(self):
+        super().__init__()
+        # The tabs edit the model; only what differs from the saved settings is written
+        self.model = niri_input.SettingsModel()
+        self.model.listeners.append(self.show_settings)
+        # input.kdl as last read or written here: (inode, mtime, size)
+        self.file_stamp = None
+        # Edits by other programs are taken in once a burst of writes is over
+        self.watcher = QFileSystemWatcher(self)
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(self.RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.reload_settings)
+        self.watcher.fileChanged.connect(self.reload_timer.start)
+        self.watcher.directoryChanged.connect(self.reload_timer.start)
+        self.general_tab = None
+        self.touchpad_tab = None
+        self.mouse_tab = None
+        self.keyboard_tab = None
+        self.live_preview = LivePreview(self)
+        # Parse before building any widget, so tabs fill straight from the tree
+        self.load_settings()
+        self.init_ui()
+
+    @niri_trace.traced
+    def init_ui(self):
+        self.setWindowTitle('Niri Input Settings')
+        self.setFixedSize(500, 550)
+
+        # Central widget
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        # Main layout
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setSpacing(20)
+        main_layout.setContentsMargins(10, 10, 10, 10)
+
+        # Create tab widget
+        self.tabs = QTabWidget()
+
+        # Add an empty page per tab, the real tab is built when first shown
+        for _attribute, _tab_class, title in self.TABS:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, title)
+        self.tabs.currentChanged.connect(self.build_tab)
+        self.build_tab(self.tabs.currentIndex())
+
+        main_layout.addWidget(self.tabs)
+
+        # Button layout
+        button_layout = QHBoxLayout()
+
+        # Live preview toggle
+        live_checkbox = QCheckBox('Live preview')
+        live_checkbox.toggled.connect(self.live_preview.set_enabled)
+        button_layout.addWidget(live_checkbox)
+
+        # Apply button
+        apply_btn = QPushButton('Apply')
+
+        apply_btn.setFixedWidth(100)
+        apply_btn.clicked.connect(self.apply_settings)
+
+        # Close button
+        close_btn = QPushButton('Close')
+        close_btn.setFixedWidth(100)
+        close_btn.clicked.connect(self.close)
+        button_layout.addStretch()  # This will push buttons to the right
+        button_layout.addWidget(apply_btn)
+        button_layout.addWidget(close_btn)
+
+        main_layout.addLayout(button_layout)
+
+        # Undo and redo edits not applied yet
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo)
+
+    @niri_trace.traced
+    def build_tab(self, index):
+        """Create the tab at index and fill it, unless that already happened"""
+        if index < 0:
+            return
+        attribute, tab_class, _title = self.TABS[index]
+        if getattr(self, attribute) is not None:
+            return
+        page = self.tabs.widget(index)
+        tab = tab_class(self)
+        tab.bind(self.model)
+        for name in self.LIVE_WIDGETS.get(attribute, ()):
+            getattr(tab, name).valueChanged.connect(self.live_preview.schedule)
+        page.layout().addWidget(tab)
+        setattr(self, attribute, tab)
+
+    def get_config_path(self):
+        """Get the configuration file path"""
+        # Ensure the directory exists
+        config_dir = os.path.dirname(CONFIG_PATH)
+        os.makedirs(config_dir, exist_ok=True)
+        return CONFIG_PATH
+
+    @niri_trace.traced
+    def apply_settings(self):
+        """Save settings to input.kdl in KDL format"""
+        config_path = self.get_config_path()
+        try:
+            doc = niri_input.load_document(config_path)
+        except (OSError, niri_kdl.KdlError) as e:
+            print(f"Error reading configuration: {e}")
+            return
+
+        # Whatever another program wrote since is in doc: take it in, and
+        # ask before overwriting what was also edited here
+        self.merge_file(doc)
+        conflicts = self.model.conflicts()
+        if conflicts:
+            answer = QMessageBox.question(
+                self, 'Settings changed elsewhere',
+                f"{config_path} was changed by another program while you edited "
+                f"{', '.join(conflicts)}.\n\nReplace those with your settings? "
+                f"No keeps the values in the file.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+            if answer == QMessageBox.StandardButton.Cancel:
+                return
+            if answer == QMessageBox.StandardButton.No:
+                self.model.revert(conflicts)
+
+        self.update_document(doc)
+        try:
+            if doc.save(config_path):
+                self.file_written()
+                print(f"Settings applied to {config_path}!")
+            else:
+                print(f"Settings unchanged, {config_path} not written")
+        except OSError as e:
+            print(f"Error saving configuration: {e}")
+            return
+        self.model.mark_saved()
+        self.live_preview.commit()
+
+    def closeEvent(self, event):
+        # Closing without Apply drops whatever is being previewed
+        self.live_preview.revert()
+        super().closeEvent(event)
+
+    def undo(self):
+        self.model.undo()
+        self.live_preview.schedule()
+
+    def redo(self):
+        self.model.redo()
+        self.live_preview.schedule()
+
+    def show_settings(self, keys):
+        """Update the widgets of keys in the built tabs, after undo, redo or loading"""
+        for attribute, _tab_class, _title in self.TABS:
+            tab = getattr(self, attribute)
+            if tab is not None:
+                tab.load_settings(self.model.current, keys)
+
+    def stat_file(self):
+        try:
+            st = os.stat(self.get_config_path())
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def file_written(self):
+        """Note a write of input.kdl from this window, so it is not taken for another program's"""
+        self.file_stamp = self.stat_file()
+
+    def watch(self):
+        """Watch input.kdl, the profile it links to and their directories.
+
+        Files are replaced by renames, which end the watch of the old file,
+        so this runs again after every change.
+        """
+        path = self.get_config_path()
+        paths = {path, os.path.realpath(path), os.path.dirname(path), os.path.dirname(os.path.realpath(path))}
+        watched = set(self.watcher.files() + self.watcher.directories())
+        missing = [path for path in paths if path not in watched and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    @niri_trace.traced
+    def reload_settings(self):
+        """Take in the changes another program made to input.kdl"""
+        self.watch()
+        stamp = self.stat_file()
+        if stamp is None or stamp == self.file_stamp:
+            return
+        self.file_stamp = stamp
+        try:
+            doc = niri_input.load_document(self.get_config_path())
+        except (OSError, niri_kdl.KdlError) as e:
+            # Perhaps half edited; the next change is read again
+            print(f"Error reloading configuration: {e}")
+            return
+        conflicts = self.merge_file(doc)
+        if conflicts:
+            print(f"{self.get_config_path()} changed {', '.join(conflicts)}, which you edited too; "
+                  f"Apply asks which to keep")
+        if self.live_preview.committed is not None:
+            # The other program may have dropped the previewed values
+            self.live_preview.schedule()
+
+    def merge_file(self, doc):
+        """Take in input.kdl as read from disk; return the new conflicts.
+
+        While a preview runs, the file also holds the previewed values. They
+        are not saved settings: they are taken out of what the preview
+        reverts to and of what the model merges.
+        """
+        disk = niri_input.Settings.from_config(doc)
+        if self.live_preview.committed is not None:
+            previewed = [key for key in self.model.dirty() if disk.get(key) == self.model.current.get(key)]
+            committed = niri_kdl.Document(doc.source)
+            self.model.saved.write(committed, previewed)
+            self.live_preview.committed = committed.render()
+            disk = disk.take(previewed, self.model.saved)
+        return self.model.merge(disk)
+
+    @niri_trace.traced
+    def update_document(self, doc):
+        """Write the settings edited since the last save into doc"""
+        # Only the dirty keys are put: sections nobody touched are not
+        # re-rendered, and whatever is on disk for them stays as it is.
+        self.model.write(doc)
+
+    @niri_trace.traced
+    def load_settings(self):
+        """Load existing settings from input.kdl"""
+        self.watch()
+        self.file_stamp = self.stat_file()
+        config = niri_kdl.Node(None)
+        try:
+            config = niri_kdl.load(self.get_config_path())
+        except FileNotFoundError:
+            print(f"No existing config file found at {self.get_config_path()}, using defaults")
+        except Exception as e:
+            print(f"Error loading configuration: {e}")
+            return
+
+        saved = niri_input.Settings.from_config(config)
+        current = saved
+        if config.child('input') is None:
+            # No config file yet: suggest these, they are written on Apply
+            current = (saved.set('touchpad.tap', True).set('touchpad.natural-scroll', True)
+                       .set('touchpad.scroll-method', "two-finger"))
+        self.model.reset(saved, current)
+
+
+class _FirstPaint(QObject):
+    """Record the first paint of the window in the trace"""
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            niri_trace.instant('first paint')
+            obj.removeEventFilter(self)
+        return False
+
+
+def main():
+    """Run the settings window"""
+    app = QApplication(sys.argv)
+
+    # Set application properties
+    app.setApplicationName('Niri Input Settings')
+    app.setApplicationVersion('0.1')
+
+    window = SettingsWindow()
+    if niri_trace.enabled():
+        first_paint = _FirstPaint()
+        window.installEventFilter(first_paint)
+    window.show()
+
+    sys.exit(app.exec())
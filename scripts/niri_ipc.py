@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Talk to niri over its IPC socket ($NIRI_SOCKET).
+
+Requests and replies are single lines of JSON, the same protocol that
+`niri msg --json` uses, without spawning a process for every call.
+Client keeps its connection for as long as the server allows and can send
+several requests before reading the replies:
+
+    with niri_ipc.Client() as niri:
+        window = niri.focused_window()
+        niri.action('ToggleWindowFloating', id=window.id)
+
+As a script it answers a few queries for shell helpers:
+
+    niri_ipc.py version | focused-window | windows | workspaces
+"""
+
+import json
+import os
+import socket
+import sys
+
+
+class NiriError(Exception):
+    """niri answered with an error, or could not be reached"""
+
+
+def socket_path():
+    """Return the path of niri's IPC socket"""
+    path = os.environ.get('NIRI_SOCKET')
+    if not path:
+        raise NiriError("NIRI_SOCKET is not set, is niri running?")
+    return path
+
+
+def _unwrap(line):
+    if not line:
+        raise NiriError("niri closed the connection without replying")
+    try:
+        reply = json.loads(line)
+    except ValueError as e:
+        raise NiriError(f"bad reply from niri: {e}: {line[:80]!r}") from None
+    if isinstance(reply, dict) and 'Err' in reply:
+        raise NiriError(reply['Err'])
+    if not isinstance(reply, dict) or 'Ok' not in reply:
+        raise NiriError(f"bad reply from niri, neither Ok nor Err: {line[:80]!r}")
+    return reply['Ok']
+
+
+def parse_event(line):
+    """Return an event line as a dict, raising NiriError when it is not JSON"""
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise NiriError(f"bad event from niri: {e}: {line[:80]!r}") from None
+
+
+def request(req, path=None, timeout=1.0):
+    """Send one request, e.g. "FocusedWindow", and return the Ok payload"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path or socket_path())
+            sock.sendall(json.dumps(req).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as f:
+                line = f.readline()
+    except OSError as e:
+        raise NiriError(f"Cannot talk to niri: {e}") from e
+    return _unwrap(line)
+
+
+def action(name, path=None, **fields):
+    """Run a niri action, e.g. action('FocusWindow', id=12)"""
+    return request({'Action': {name: fields}}, path=path)
+
+
+class _Record:
+    """Typed view of a JSON object from niri; unknown keys are ignored"""
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**data) if data is not None else None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Window(_Record):
+    __slots__ = ('id', 'title', 'app_id', 'pid', 'workspace_id',
+                 'is_focused', 'is_floating', 'is_urgent')
+
+
+class Workspace(_Record):
+    __slots__ = ('id', 'idx', 'name', 'output', 'is_urgent', 'is_active',
+                 'is_focused', 'active_window_id')
+
+
+class KeyboardLayouts(_Record):
+    __slots__ = ('names', 'current_idx')
+
+
+class Client:
+    """A connection to niri that is reused for many requests.
+
+    niri itself answers a single request per connection and then closes
+    it. The client notices that on the first reuse and from then on opens
+    one connection per request; pipeline() still sends every request before
+    reading any reply, so they are all in flight at once.
+    """
+
+    # Connections open at once when the server takes one request per connection
+    MAX_IN_FLIGHT = 32
+
+    def __init__(self, path=None, timeout=1.0):
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self.reusable = True
+        self._sock = None
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = self._reader = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # Set first: the timeout makes connect() fail instead of waiting
+            # when the backlog is full
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile('rb')
+
+    def request(self, req):
+        """Send one request and return the Ok payload"""
+        return self.pipeline([req])[0]
+
+    def pipeline(self, reqs):
+        """Send every request, then collect the Ok payloads in order"""
+        payloads = [json.dumps(req).encode('utf-8') + b'\n' for req in reqs]
+        lines = []
+        try:
+            if self.reusable:
+                lines = self._send_on_connection(payloads)
+                if len(lines) < len(payloads):
+                    # The server closed the connection: one request per connection
+                    self.reusable = False
+                    self.close()
+            if len(lines) < len(payloads):
+                lines += self._send_one_per_connection(payloads[len(lines):])
+        except OSError as e:
+            self.close()
+            raise NiriError(f"Cannot talk to niri: {e}") from e
+        return [_unwrap(line) for line in lines]
+
+    def _send_on_connection(self, payloads):
+        if self._sock is None:
+            self._sock, self._reader = self._connect()
+        try:
+            self._sock.sendall(b''.join(payloads))
+        except (BrokenPipeError, ConnectionResetError):
+            return []
+        lines = []
+        try:
+            for _ in payloads:
+                line = self._reader.readline()
+                if not line:
+                    break
+                lines.append(line)
+        except ConnectionResetError:
+            pass
+        return lines
+
+    def _send_one_per_connection(self, payloads):
+        lines = []
+        for start in range(0, len(payloads), self.MAX_IN_FLIGHT):
+            connections = []
+            try:
+                for payload in payloads[start:start + self.MAX_IN_FLIGHT]:
+                    sock, reader = self._connect()
+                    connections.append((sock, reader))
+                    sock.sendall(payload)
+                lines += [reader.readline() for _sock, reader in connections]
+            finally:
+                for sock, reader in connections:
+                    reader.close()
+                    sock.close()
+        return lines
+
+    def action(self, name, **fields):
+        """Run a niri action, e.g. action('FocusWindow', id=12)"""
+        return self.request({'Action': {name: fields}})
+
+    def version(self):
+        return self.request('Version')['Version']
+
+    def focused_window(self):
+        return Window.from_json(self.request('FocusedWindow')['FocusedWindow'])
+
+    def windows(self):
+        return [Window.from_json(data) for data in self.request('Windows')['Windows']]
+
+    def workspaces(self):
+        return [Workspace.from_json(data) for data in self.request('Workspaces')['Workspaces']]
+
+    def keyboard_layouts(self):
+        return KeyboardLayouts.from_json(self.request('KeyboardLayouts')['KeyboardLayouts'])
+
+    def event_stream(self):
+        """Yield niri events as dicts, e.g. {'WindowUrgencyChanged': {...}}
+
+        The stream uses a connection of its own and never times out, so
+        requests can still be sent while iterating.
+        """
+        sock, reader = self._connect()
+        try:
+            sock.settimeout(None)
+            sock.sendall(b'"EventStream"\n')
+            _unwrap(reader.readline())
+            for line in reader:
+                yield parse_event(line)
+        finally:
+            reader.close()
+            sock.close()
+
+
+def main():
+    commands = ('version', 'focused-window', 'windows', 'workspaces')
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"usage: {os.path.basename(sys.argv[0])} {{{'|'.join(commands)}}}", file=sys.stderr)
+        sys.exit(2)
+    try:
+        with Client() as niri:
+            if sys.argv[1] == 'version':
+                print(niri.version())
+            elif sys.argv[1] == 'focused-window':
+                window = niri.focused_window()
+                if window is not None:
+                    print(f"{window.id}\t{window.app_id}\t{window.title}")
+            elif sys.argv[1] == 'windows':
+                for window in niri.windows():
+                    print(f"{window.id}\t{window.app_id}\t{window.title}")
+            else:
+                for workspace in niri.workspaces():
+                    print(f"{workspace.id}\t{workspace.output}\t{workspace.name or workspace.idx}")
+    except NiriError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
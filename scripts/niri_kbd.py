@@ -0,0 +1,84 @@
+"""Keyboard layout labels for kbd-plugin, written only when they change.
+
+The layouts are the ones of `xkb { layout "it,ch" }` in input.kdl; each one
+is shown as its flag from FLAGS_DIR or, without a flag, as its code in
+capitals. Labels are worked out once per layout list, and an event that
+leaves the label as it is, such as a replayed KeyboardLayoutsChanged or a
+switch to the current layout, produces nothing:
+
+    indicator = niri_kbd.Indicator(niri_kbd.layout_codes(), niri_kbd.FLAGS_DIR)
+    for event in niri_events.subscribe(niri_kbd.EVENTS):
+        label = indicator.feed(event)
+        if label is not None:
+            print(label, flush=True)
+"""
+
+import os
+import re
+
+import niri_config
+import niri_input
+import niri_kdl
+
+# Install flags: https://github.com/hampusborgos/country-flags
+FLAGS_DIR = os.path.join(
+    os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share')),
+    'iso-flags-svg', 'country-4x3'
+)
+
+EVENTS = ('KeyboardLayoutsChanged', 'KeyboardLayoutSwitched')
+
+
+def layout_codes(config_path=niri_input.CONFIG_PATH):
+    """Return the xkb layouts of input.kdl, e.g. ['it', 'ch']; [] if unset"""
+    try:
+        config = niri_config.parse_file(config_path).root
+    except (OSError, niri_kdl.KdlError):
+        return []
+    layouts = niri_input.get(config, 'keyboard.xkb.layout') or ''
+    # 'us(intl)' is the us layout with a variant
+    return [re.sub(r'\(.*\)', '', code).strip() for code in layouts.split(',') if code.strip()]
+
+
+def labels(names, codes=(), flags_dir=None):
+    """Return the line shown for each layout name: a flag's path or a code"""
+    result = []
+    for n, name in enumerate(names):
+        code = codes[n] if n < len(codes) else name[:2].lower()
+        flag = os.path.join(flags_dir, f"{code}.svg") if flags_dir else None
+        result.append(flag if flag and os.path.isfile(flag) else code.upper())
+    return result
+
+
+class Indicator:
+    """The label of the current layout, following layout events"""
+
+    def __init__(self, codes=(), flags_dir=None):
+        self.codes = list(codes)
+        self.flags_dir = flags_dir
+        self.names = None
+        self.labels = []
+        self.label = None           # last label returned
+
+    def layouts(self, names, idx):
+        """Take a new layout list; return the label if it changed"""
+        if names != self.names:
+            self.names = names
+            self.labels = labels(names, self.codes, self.flags_dir)
+        return self.switch(idx)
+
+    def switch(self, idx):
+        """Take the index of the current layout; return the label if it changed"""
+        if idx is None or not 0 <= idx < len(self.labels) or self.labels[idx] == self.label:
+            return None
+        self.label = self.labels[idx]
+        return self.label
+
+    def feed(self, event):
+        """Take an event dict; return the label if it changed"""
+        if 'KeyboardLayoutSwitched' in event:
+            return self.switch(event['KeyboardLayoutSwitched'].get('idx'))
+        if 'KeyboardLayoutsChanged' in event:
+            layouts = event['KeyboardLayoutsChanged']['keyboard_layouts']
+            return self.layouts(layouts['names'], layouts.get('current_idx'))
+        return None
@@ -0,0 +1,763 @@
+"""Small KDL (v1) reader for the niri configuration files.
+
+The whole file is tokenized in one pass and turned into a tree of Node
+objects, so settings can be looked up by block path instead of searching
+the raw text, e.g. config.get('input', 'touchpad', 'accel-speed').
+"""
+
+import bisect
+import contextlib
+import gc
+import os
+import re
+
+
+class KdlError(ValueError):
+    """Raised when a file is not valid KDL"""
+
+    def __init__(self, message, text='', pos=0):
+        self.line = text.count('\n', 0, pos) + 1
+        self.column = pos - (text.rfind('\n', 0, pos) + 1) + 1
+        super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+
+_TOKEN_RE = re.compile(r'''
+      (?P<newline>\r\n|\n|\r)
+    | (?P<ws>[ \t\ufeff]+)
+    | (?P<line_comment>//[^\r\n]*)
+    | (?P<block_comment>/\*(?s:.*?)\*/)
+    | (?P<slashdash>/-)
+    | (?P<continuation>\\[ \t]*(?://[^\r\n]*)?(?:\r\n|\n|\r|$))
+    | (?P<lbrace>\{)
+    | (?P<rbrace>\})
+    | (?P<semi>;)
+    | (?P<equals>=)
+    | (?P<raw>r(?P<hashes>\#*)"(?P<raw_body>(?s:.*?))"(?P=hashes))
+    | (?P<string>"(?P<body>(?:\\.|[^"\\])*)")
+    | (?P<ident>[^\s\\/(){}<>;\[\]=,"]+)
+''', re.VERBOSE)
+
+_NUMBER_RE = re.compile(r'''
+    [+-]?(?:
+        0x[0-9a-fA-F][0-9a-fA-F_]*
+      | 0o[0-7][0-7_]*
+      | 0b[01][01_]*
+      | [0-9][0-9_]*(?:\.[0-9][0-9_]*)?(?:[eE][+-]?[0-9][0-9_]*)?
+    )$
+''', re.VERBOSE)
+
+_ESCAPE_RE = re.compile(r'\\(u\{[0-9a-fA-F]{1,6}\}|.)', re.DOTALL)
+_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', '\\': '\\', '/': '/',
+            '"': '"', 'b': '\b', 'f': '\f'}
+
+_KEYWORDS = {'true': True, 'false': False, 'null': None}
+
+# Tokens that carry no meaning for the tree
+_TRIVIA = frozenset(('ws', 'line_comment', 'block_comment', 'continuation'))
+
+
+def _unescape(match):
+    escape = match.group(1)
+    if escape.startswith('u{'):
+        return chr(int(escape[2:-1], 16))
+    return _ESCAPES.get(escape, escape)
+
+
+def _number(text):
+    text = text.replace('_', '')
+    sign = -1 if text.startswith('-') else 1
+    digits = text.lstrip('+-')
+    for prefix, base in (('0x', 16), ('0o', 8), ('0b', 2)):
+        if digits.startswith(prefix):
+            return sign * int(digits[2:], base)
+    if '.' in digits or 'e' in digits or 'E' in digits:
+        return float(text)
+    return int(text)
+
+
+def tokenize(text):
+    """Yield (kind, value, start, end) tuples for text, including trivia"""
+    pos = 0
+    end = len(text)
+    match = _TOKEN_RE.match
+    while pos < end:
+        m = match(text, pos)
+        if m is None:
+            raise KdlError(f"Unexpected character {text[pos]!r}", text, pos)
+        kind = m.lastgroup
+        if kind == 'raw':
+            value = m.group('raw_body')
+        elif kind == 'string':
+            value = _ESCAPE_RE.sub(_unescape, m.group('body'))
+        else:
+            value = m.group()
+        yield kind, value, pos, m.end()
+        pos = m.end()
+    yield 'eof', '', end, end
+
+
+class Node:
+    """A KDL node: name, positional arguments, properties and children
+
+    Parsed nodes also remember where they came from in the source text
+    (span, name_span, arg_spans, prop_spans and the braces of body), which
+    Document uses to patch them in place. Nodes built in code have no spans.
+    """
+
+    __slots__ = ('name', 'args', 'props', 'children',
+                 'span', 'name_span', 'arg_spans', 'prop_spans', 'body')
+
+    def __init__(self, name, args=None, props=None, children=None):
+        self.name = name
+        self.args = args if args is not None else []
+        self.props = props if props is not None else {}
+        self.children = children if children is not None else []
+        self.span = None
+        self.name_span = None
+        self.arg_spans = []
+        self.prop_spans = {}
+        self.body = None
+
+    def __repr__(self):
+        return (f"Node({self.name!r}, args={self.args!r}, props={self.props!r}, "
+                f"children={len(self.children)})")
+
+    def __getstate__(self):
+        # A tuple pickles smaller and loads faster than the default slot dict
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def child(self, name):
+        """Return the first child called name, or None"""
+        for node in self.children:
+            if node.name == name:
+                return node
+        return None
+
+    def all(self, name):
+        """Return every child called name"""
+        return [node for node in self.children if node.name == name]
+
+    def find(self, *path):
+        """Follow a path of child names, e.g. find('input', 'mouse')"""
+        node = self
+        for name in path:
+            node = node.child(name)
+            if node is None:
+                return None
+        return node
+
+    def get(self, *path, default=None):
+        """Return the first argument of the node at path"""
+        node = self.find(*path)
+        if node is None or not node.args:
+            return default
+        return node.args[0]
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        self.comments = []
+        for token in tokenize(text):
+            if token[0] not in _TRIVIA:
+                self.tokens.append(token)
+            elif token[0] == 'line_comment':
+                self.comments.append((token[2], token[3]))
+        self.index = 0
+
+    def error(self, message):
+        raise KdlError(message, self.text, self.tokens[self.index][2])
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def skip_newlines(self):
+        while self.tokens[self.index][0] == 'newline':
+            self.index += 1
+
+    def nodes(self, nested):
+        nodes = []
+        while True:
+            kind = self.tokens[self.index][0]
+            if kind in ('newline', 'semi'):
+                self.index += 1
+            elif kind == 'eof':
+                if nested:
+                    self.error("Missing '}'")
+                return nodes
+            elif kind == 'rbrace':
+                if not nested:
+                    self.error("Unexpected '}'")
+                self.index += 1
+                return nodes
+            elif kind == 'slashdash':
+                self.index += 1
+                self.skip_newlines()
+                self.node()
+            else:
+                nodes.append(self.node())
+
+    def value(self):
+        kind, value, start, end = self.tokens[self.index]
+        self.index += 1
+        if kind in ('string', 'raw'):
+            return value
+        if kind == 'ident':
+            if value in _KEYWORDS:
+                return _KEYWORDS[value]
+            if _NUMBER_RE.match(value):
+                return _number(value)
+            # Bare words are not valid KDL values, but keep them readable
+            return value
+        self.index -= 1
+        self.error(f"Expected a value, found {value!r}")
+
+    def node(self):
+        kind, name, start, end = self.tokens[self.index]
+        if kind not in ('ident', 'string', 'raw'):
+            self.error(f"Expected a node name, found {name!r}")
+        self.index += 1
+        node = Node(name)
+        node.name_span = (start, end)
+        while True:
+            kind = self.tokens[self.index][0]
+            if kind in ('newline', 'semi', 'eof', 'rbrace'):
+                node.span = (start, end)
+                if kind in ('newline', 'semi'):
+                    self.index += 1
+                return node
+            discard = kind == 'slashdash'
+            if discard:
+                self.index += 1
+                kind = self.tokens[self.index][0]
+            if kind == 'lbrace':
+                lbrace = self.tokens[self.index][2]
+                self.index += 1
+                children = self.nodes(nested=True)
+                end = self.tokens[self.index - 1][3]
+                if not discard:
+                    node.children = children
+                    node.body = (lbrace, end - 1)
+                    node.span = (start, end)
+                    return node
+            elif kind in ('ident', 'string', 'raw') and self.peek(1)[0] == 'equals':
+                key = self.tokens[self.index][1]
+                self.index += 2
+                value_start = self.tokens[self.index][2]
+                value = self.value()
+                end = self.tokens[self.index - 1][3]
+                if not discard:
+                    node.props[key] = value
+                    node.prop_spans[key] = (value_start, end)
+            else:
+                value_start = self.tokens[self.index][2]
+                value = self.value()
+                end = self.tokens[self.index - 1][3]
+                if not discard:
+                    node.args.append(value)
+                    node.arg_spans.append((value_start, end))
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    # A parse allocates tokens and nodes without any cycles, but each one
+    # counts towards the next collection, and the full collections walk
+    # everything parsed so far: large files got slower per KiB
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def parse(text):
+    """Parse KDL text and return a root Node holding the top-level nodes"""
+    with _gc_paused():
+        return Node(None, children=_Parser(text).nodes(nested=False))
+
+
+def load(path):
+    """Read and parse the KDL file at path"""
+    with open(path, 'r') as f:
+        return parse(f.read())
+
+
+_BARE_RE = re.compile(r'[^\s\\/(){}<>;\[\]=,"0-9+-][^\s\\/(){}<>;\[\]=,"]*'
+                      r'|[+-](?:[^\s\\/(){}<>;\[\]=,"0-9][^\s\\/(){}<>;\[\]=,"]*)?')
+_QUOTE = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+INDENT = '    '
+
+
+class RawString(str):
+    """A string written as a KDL raw string, r#"..."#, e.g. for regexes"""
+
+
+def format_value(value):
+    """Return the KDL spelling of a Python value"""
+    if isinstance(value, RawString):
+        hashes = '#'
+        while f'"{hashes}' in value:
+            hashes += '#'
+        return f'r{hashes}"{value}"{hashes}'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + ''.join(_QUOTE.get(char, char) for char in str(value)) + '"'
+
+
+def format_name(name):
+    """Return name as a bare identifier when possible, quoted otherwise"""
+    if _BARE_RE.fullmatch(name) and name not in _KEYWORDS:
+        return name
+    return format_value(name)
+
+
+def _format_head(node):
+    parts = [format_value(arg) for arg in node.args]
+    parts += [f'{format_name(key)}={format_value(value)}' for key, value in node.props.items()]
+    return ''.join(' ' + part for part in parts)
+
+
+def format_node(node, indent=''):
+    """Render node and its children as KDL lines"""
+    line = indent + format_name(node.name) + _format_head(node)
+    if not node.children:
+        return line + '\n'
+    children = ''.join(format_node(child, indent + INDENT) for child in node.children)
+    return f'{line} {{\n{children}{indent}}}\n'
+
+
+def dumps(root):
+    """Render the top-level nodes of root as KDL text"""
+    return ''.join(format_node(node) for node in root.children)
+
+
+def _same(a, b):
+    return type(a) is type(b) and a == b or (
+        isinstance(a, (int, float)) and isinstance(b, (int, float))
+        and not isinstance(a, bool) and not isinstance(b, bool) and a == b)
+
+
+class _Insert:
+    """New nodes waiting to be rendered at one position of the source"""
+
+    __slots__ = ('prefix', 'suffix', 'indent', 'nodes')
+
+    def __init__(self, indent, prefix='', suffix=''):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.indent = indent
+        self.nodes = []
+
+    def render(self):
+        body = ''.join(format_node(node, self.indent) for node in self.nodes)
+        return self.prefix + body + self.suffix if body else ''
+
+
+class _Replace:
+    """A new node taking the place of a //-disabled one"""
+
+    __slots__ = ('indent', 'node')
+
+    def __init__(self, indent, node):
+        self.indent = indent
+        self.node = node
+
+    def render(self):
+        return format_node(self.node, self.indent)[len(self.indent):-1]
+
+
+class _Head:
+    """Arguments and properties of a node whose number of values changed"""
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def render(self):
+        return _format_head(self.node)
+
+
+class Document:
+    """A KDL file that can be edited without losing its formatting.
+
+    Edits are recorded as patches against the original text and only touch
+    the nodes that actually change, so comments, blank lines, indentation
+    and //-disabled nodes are kept, and render() with no edits returns the
+    source unchanged. Nodes written out as a '// name ...' comment count as
+    disabled: enabling one uncomments it in place instead of adding a copy.
+    """
+
+    def __init__(self, text):
+        with _gc_paused():
+            parser = _Parser(text)
+            root = Node(None, children=parser.nodes(nested=False))
+        self.source = text
+        self.root = root
+        self._comments = parser.comments
+        self._parents = {}
+        self._edits = {}      # (start, end) -> str or an object with render()
+        self._inserts = {}    # position -> _Insert
+        self._disabled = {}   # id of a node commented out by disable() -> node
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                self._parents[id(child)] = node
+                stack.append(child)
+
+    @classmethod
+    def load(cls, path):
+        """Read the KDL file at path into a Document"""
+        with open(path, 'r') as f:
+            return cls(f.read())
+
+    def save(self, path):
+        """Write the edited document to path; returns True if it changed"""
+        text = self.render()
+        written = write_atomic(path, text)
+        self.__init__(text)
+        return written
+
+    @property
+    def changed(self):
+        return bool(self._edits) or any(insert.nodes for insert in self._inserts.values())
+
+    def find(self, *path):
+        return self.root.find(*path)
+
+    def get(self, *path, default=None):
+        return self.root.get(*path, default=default)
+
+    def parent(self, node):
+        return self._parents.get(id(node))
+
+    # Rendering
+
+    def _patches(self, start, end):
+        patches = []
+        for (edit_start, edit_end), edit in self._edits.items():
+            if start <= edit_start and edit_end <= end:
+                patches.append((edit_start, edit_end, edit))
+        for pos, insert in self._inserts.items():
+            if start <= pos <= end:
+                patches.append((pos, pos, insert))
+        patches.sort(key=lambda patch: (patch[0], patch[1]))
+        return patches
+
+    def _render(self, start, end):
+        pieces = []
+        pos = start
+        for edit_start, edit_end, edit in self._patches(start, end):
+            pieces.append(self.source[pos:edit_start])
+            pieces.append(edit if isinstance(edit, str) else edit.render())
+            pos = edit_end
+        pieces.append(self.source[pos:end])
+        return ''.join(pieces)
+
+    def render(self):
+        """Return the document text with every edit applied"""
+        return self._render(0, len(self.source))
+
+    def _drop_edits(self, start, end):
+        for key in [key for key in self._edits if start <= key[0] and key[1] <= end]:
+            del self._edits[key]
+        for pos in [pos for pos in self._inserts if start <= pos < end]:
+            del self._inserts[pos]
+
+    # Source helpers
+
+    def _line_start(self, pos):
+        return self.source.rfind('\n', 0, pos) + 1
+
+    def _indent_of(self, pos):
+        line_start = self._line_start(pos)
+        prefix = self.source[line_start:pos]
+        return prefix if prefix.isspace() or not prefix else None
+
+    def _child_indent(self, parent):
+        for child in reversed(parent.children):
+            if child.span is not None:
+                indent = self._indent_of(child.span[0])
+                if indent is not None:
+                    return indent
+        if parent is self.root:
+            return ''
+        return (self._indent_of(parent.span[0]) or '') + INDENT
+
+    def _line_range(self, start, end):
+        """Grow start..end to whole lines when nothing else shares them"""
+        line_start = self._line_start(start)
+        line_end = self.source.find('\n', end)
+        line_end = len(self.source) if line_end < 0 else line_end
+        before = self.source[line_start:start]
+        after = self.source[end:line_end].strip().lstrip(';').strip()
+        if before.strip() or (after and not after.startswith('//')):
+            return None
+        return line_start, line_end
+
+    def _disabled_comment(self, parent, name):
+        """Find a '// name ...' comment directly inside parent"""
+        if parent is self.root:
+            low, high = 0, len(self.source)
+        elif parent.body is not None:
+            low, high = parent.body
+        else:
+            return None
+        starts = [child.span[0] for child in parent.children if child.span is not None]
+        ends = [child.span[1] for child in parent.children if child.span is not None]
+        for start, end in self._comments[bisect.bisect_left(self._comments, (low,)):]:
+            if start >= high:
+                break
+            index = bisect.bisect_right(starts, start) - 1
+            if (index >= 0 and start < ends[index]) or (start, end) in self._edits:
+                continue
+            text = self.source[start + 2:end].strip()
+            if not text.startswith(name):
+                continue
+            try:
+                nodes = parse(text).children
+            except KdlError:
+                continue
+            if len(nodes) == 1 and nodes[0].name == name:
+                return start, end
+        return None
+
+    # Editing
+
+    def insert(self, parent, node, before=None):
+        """Add node as a child of parent, before another child if given"""
+        if parent.span is None and parent is not self.root:
+            # parent is new itself and gets rendered with all its children
+            index = parent.children.index(before) if before is not None else len(parent.children)
+            parent.children.insert(index, node)
+        elif before is not None and before.span is not None:
+            pos = self._line_start(before.span[0])
+            indent = self._indent_of(before.span[0]) or ''
+            self._inserts.setdefault(pos, _Insert(indent)).nodes.append(node)
+            parent.children.insert(parent.children.index(before), node)
+        else:
+            self._insert_last(parent, node)
+            parent.children.append(node)
+        self._parents[id(node)] = parent
+        return node
+
+    def _insert_last(self, parent, node):
+        indent = self._child_indent(parent)
+        if parent is self.root:
+            pos = len(self.source)
+            prefix = '\n' if self.source and not self.source.endswith('\n') else ''
+            insert = self._inserts.setdefault(pos, _Insert(indent, prefix))
+        elif parent.body is None:
+            pos = parent.span[1]
+            insert = self._inserts.setdefault(
+                pos, _Insert(indent, ' {\n', (self._indent_of(parent.span[0]) or '') + '}'))
+        else:
+            close = parent.body[1]
+            line_start = self._line_start(close)
+            if self.source[line_start:close].strip():
+                # Closing brace shares its line: move it to a line of its own
+                outer = self._indent_of(parent.span[0]) or ''
+                insert = self._inserts.setdefault(close, _Insert(indent, '\n', outer))
+            else:
+                insert = self._inserts.setdefault(line_start, _Insert(indent))
+        insert.nodes.append(node)
+
+    def remove(self, node):
+        """Delete node and its children from the document"""
+        parent = self._parents.pop(id(node), None)
+        if parent is not None:
+            parent.children.remove(node)
+        if node.span is None:
+            for insert in self._inserts.values():
+                if node in insert.nodes:
+                    insert.nodes.remove(node)
+            for key, edit in list(self._edits.items()):
+                if isinstance(edit, _Replace) and edit.node is node:
+                    del self._edits[key]
+            return
+        start, end = node.span
+        lines = self._line_range(start, end)
+        if lines is not None:
+            start, end = lines[0], min(lines[1] + 1, len(self.source))
+        elif self.source.startswith(';', end):
+            end += 1
+        self._drop_edits(start, end)
+        self._edits[(start, end)] = ''
+
+    def disable(self, node):
+        """Comment node out, keeping its text so it can be enabled again"""
+        if node.span is None:
+            self.remove(node)
+            return
+        parent = self._parents.pop(id(node), None)
+        if parent is not None:
+            parent.children.remove(node)
+        start, end = node.span
+        text = self._render(start, end)
+        if self._line_range(start, end) is not None:
+            lines = text.split('\n')
+            for i in range(1, len(lines)):
+                stripped = lines[i].lstrip()
+                lines[i] = lines[i][:len(lines[i]) - len(stripped)] + '// ' + stripped
+            text = '// ' + '\n'.join(lines)
+        else:
+            text = '/-' + text
+        self._drop_edits(start, end)
+        self._edits[(start, end)] = text
+        self._disabled[id(node)] = (parent, node)
+
+    def _enable(self, parent, name):
+        """Bring back a node disabled in the source or by disable()"""
+        for key, (disabled_parent, node) in list(self._disabled.items()):
+            if disabled_parent is parent and node.name == name:
+                del self._disabled[key]
+                del self._edits[node.span]
+                parent.children.append(node)
+                self._parents[id(node)] = parent
+                return node
+        comment = self._disabled_comment(parent, name)
+        if comment is None:
+            return None
+        start, end = comment
+        node = parse(self.source[start + 2:end].strip()).children[0]
+        # Spans point into the comment text, not the document
+        stack = [node]
+        while stack:
+            detached = stack.pop()
+            detached.span = detached.name_span = detached.body = None
+            detached.arg_spans = []
+            detached.prop_spans = {}
+            stack.extend(detached.children)
+        self._edits[comment] = _Replace(self._indent_of(start) or '', node)
+        parent.children.append(node)
+        self._parents[id(node)] = parent
+        return node
+
+    def set_args(self, node, *args):
+        """Replace the arguments of node"""
+        args = list(args)
+        if len(args) == len(node.args) and all(map(_same, args, node.args)):
+            return
+        old = node.args
+        node.args = args
+        if node.span is None:
+            return
+        head = self._head_span(node)
+        if head in self._edits or len(args) != len(old):
+            self._drop_edits(*head)
+            self._edits[head] = _Head(node)
+            return
+        for value, old_value, span in zip(args, old, node.arg_spans):
+            if not _same(value, old_value):
+                self._edits[span] = format_value(value)
+
+    def set_prop(self, node, key, value):
+        """Set the property key of node"""
+        if key in node.props and _same(node.props[key], value):
+            return
+        node.props[key] = value
+        if node.span is None:
+            return
+        head = self._head_span(node)
+        if head in self._edits or key not in node.prop_spans:
+            self._drop_edits(*head)
+            self._edits[head] = _Head(node)
+        else:
+            self._edits[node.prop_spans[key]] = format_value(value)
+
+    def _head_span(self, node):
+        ends = [span[1] for span in node.arg_spans] + [span[1] for span in node.prop_spans.values()]
+        return node.name_span[1], max(ends, default=node.name_span[1])
+
+    def _ensure(self, path):
+        """Return the node at path, creating or enabling missing blocks"""
+        node = self.root
+        for name in path:
+            child = node.child(name) or self._enable(node, name)
+            if child is None:
+                child = self.insert(node, Node(name))
+            node = child
+        return node
+
+    def set_value(self, path, *args):
+        """Set the arguments of the node at path, adding the node if needed"""
+        parent = self._ensure(path[:-1])
+        node = parent.child(path[-1]) or self._enable(parent, path[-1])
+        if node is None:
+            self.insert(parent, Node(path[-1], list(args)))
+        else:
+            self.set_args(node, *args)
+
+    def set_enabled(self, path, enabled):
+        """Make a flag node such as 'input > touchpad > tap' present or disabled"""
+        if enabled:
+            parent = self._ensure(path[:-1])
+            if parent.child(path[-1]) is None and self._enable(parent, path[-1]) is None:
+                self.insert(parent, Node(path[-1]))
+        else:
+            node = self.find(*path)
+            while node is not None:
+                self.disable(node)
+                node = self.find(*path)
+
+
+def write_atomic(path, text):
+    """Replace the file at path with text in a single rename.
+
+    The data goes to a temporary file in the same directory, is fsynced and
+    then renamed over path, so readers never see a partial file. Nothing is
+    written when path already holds exactly this text. Returns True if the
+    file was written.
+    """
+    # Imported here: it is slow to import and only needed when writing
+    import tempfile
+
+    data = text.encode('utf-8')
+    # Write through symlinks, so a config linked into a dotfiles repo stays linked
+    path = os.path.realpath(path)
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o644
+
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Make the rename itself durable
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return True
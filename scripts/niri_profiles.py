@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Switch output, workspace and panel layouts when monitors come and go.
+
+    niri_profiles.py daemon [--root DIR]   follow hotplug events, started from autostart.kdl
+    niri_profiles.py apply [PROFILE]       apply PROFILE, or the one for the connected outputs
+    niri_profiles.py status                print the connected outputs and their profile
+
+Profiles are read from profiles.kdl next to lxqt-niri.kdl:
+
+    profile "Niri dual" {
+        connected "eDP-1" "HDMI-A-1"
+        outputs "profiles/dual/outputs.kdl"         // copied to src/outputs.kdl
+        workspaces "profiles/dual/workspaces.kdl"   // copied to src/workspaces.kdl
+        panel "~/.local/share/lxqt-panel-profiles/layouts/Niri dual/panel.conf"
+    }
+
+The profile whose `connected` outputs are exactly the connected ones is
+used, else the one with most of them connected, else one without
+`connected`. Relative paths are relative to profiles.kdl. Only files whose
+content differs are written; niri reloads its own config, and lxqt-panel
+is restarted only when panel.conf really changes, as soon as the old one
+has exited.
+
+The daemon listens for kernel uevents of the drm subsystem, waits until
+none came for DEBOUNCE seconds, so a flapping connector switches once,
+and reads the status of every /sys/class/drm/*/status connector. Each
+switch is logged with the time from the first event to the finished
+switch. --root prefixes /sys and makes the daemon read the statuses
+every --interval seconds instead, to try it on a fake tree.
+"""
+
+import argparse
+import glob
+import os
+import select
+import socket
+import subprocess
+import sys
+import time
+
+import niri_config
+import niri_kdl
+
+CONFIG_DIR = os.path.dirname(niri_config.CONFIG_PATH)
+PROFILES_PATH = os.path.join(CONFIG_DIR, 'profiles.kdl')
+PANEL_CONF = os.path.join(
+    os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config')),
+    'lxqt', 'panel.conf'
+)
+
+# Seconds without hotplug events before the outputs are read
+DEBOUNCE = 0.5
+# Seconds to wait for lxqt-panel to exit before writing its config anyway
+PANEL_EXIT_TIMEOUT = 5.0
+
+# Profile node -> file it is copied to
+TARGETS = {
+    'outputs': os.path.join(CONFIG_DIR, 'src', 'outputs.kdl'),
+    'workspaces': os.path.join(CONFIG_DIR, 'src', 'workspaces.kdl'),
+    'panel': PANEL_CONF,
+}
+
+NETLINK_KOBJECT_UEVENT = 15
+
+
+class Profile:
+    """A named layout for a set of connected outputs"""
+
+    __slots__ = ('name', 'connected', 'files')
+
+    def __init__(self, name, connected, files):
+        self.name = name
+        self.connected = connected      # frozenset of output names, None for any
+        self.files = files              # [(source, target)]
+
+
+def load_profiles(path=PROFILES_PATH, targets=TARGETS):
+    """Read the profiles of a profiles.kdl"""
+    base = os.path.dirname(os.path.abspath(path))
+    profiles = []
+    for node in niri_kdl.load(path).all('profile'):
+        if not node.args or not isinstance(node.args[0], str):
+            raise niri_kdl.KdlError(f"{path}: profile without a name")
+        connected = node.child('connected')
+        files = []
+        for name, target in targets.items():
+            source = node.child(name)
+            if source is not None and source.args:
+                files.append((os.path.join(base, os.path.expanduser(source.args[0])), target))
+        profiles.append(Profile(node.args[0], frozenset(connected.args) if connected else None, files))
+    return profiles
+
+
+def connected_outputs(root='/'):
+    """Return the names of the connected outputs, e.g. {'eDP-1', 'HDMI-A-1'}"""
+    outputs = set()
+    for path in glob.glob(os.path.join(root, 'sys', 'class', 'drm', 'card*-*', 'status')):
+        try:
+            with open(path) as f:
+                if f.read().strip() != 'connected':
+                    continue
+        except OSError:
+            continue
+        # card1-HDMI-A-1 is niri's HDMI-A-1
+        outputs.add(os.path.basename(os.path.dirname(path)).split('-', 1)[1])
+    return frozenset(outputs)
+
+
+def choose(profiles, outputs):
+    """Return the profile for a set of connected outputs, or None"""
+    best = None
+    for profile in profiles:
+        if profile.connected == outputs:
+            return profile
+        if profile.connected is not None and profile.connected <= outputs:
+            if best is None or best.connected is None or len(profile.connected) > len(best.connected):
+                best = profile
+        elif profile.connected is None and best is None:
+            best = profile
+    return best
+
+
+def _session(method):
+    subprocess.run(['qdbus6', 'org.lxqt.session', '/LXQtSession', f'org.lxqt.session.{method}',
+                    'lxqt-panel.desktop'], stdout=subprocess.DEVNULL, check=False)
+
+
+def _running(name):
+    for path in glob.glob('/proc/[0-9]*/comm'):
+        try:
+            with open(path) as f:
+                if f.read().strip() == name:
+                    return True
+        except OSError:
+            pass
+    return False
+
+
+def apply(profile, panel_conf=PANEL_CONF):
+    """Copy a profile's files that differ; return the targets that were written"""
+    written = []
+    for source, target in profile.files:
+        with open(source, encoding='utf-8') as f:
+            text = f.read()
+        try:
+            with open(target, encoding='utf-8') as f:
+                if f.read() == text:
+                    continue
+        except FileNotFoundError:
+            pass
+        if target == panel_conf:
+            # lxqt-panel writes its config when it exits: stop it first
+            _session('stopModule')
+            deadline = time.monotonic() + PANEL_EXIT_TIMEOUT
+            while _running('lxqt-panel') and time.monotonic() < deadline:
+                time.sleep(0.02)
+            niri_kdl.write_atomic(target, text)
+            _session('startModule')
+        else:
+            niri_kdl.write_atomic(target, text)
+        written.append(target)
+    return written
+
+
+class HotplugEvents:
+    """Wait for drm hotplug events, from the kernel or by reading the statuses"""
+
+    def __init__(self, root='/', interval=2.0):
+        self.root = root
+        self.interval = interval
+        self.sock = None
+        self.outputs = connected_outputs(root)
+        if root == '/':
+            try:
+                self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+                self.sock.bind((0, 1))
+            except OSError as e:
+                print(f"No hotplug events ({e}), reading the outputs every {interval} s", file=sys.stderr)
+                self.sock = None
+
+    def _event(self, timeout):
+        """True if a drm event came within timeout seconds"""
+        if self.sock is None:
+            time.sleep(min(timeout, self.interval))
+            outputs = connected_outputs(self.root)
+            changed, self.outputs = outputs != self.outputs, outputs
+            return changed
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.sock], [], [], remaining)[0]:
+                return False
+            fields = self.sock.recv(16384).split(b'\0')
+            if b'SUBSYSTEM=drm' in fields:
+                return True
+
+    def wait(self, debounce=DEBOUNCE):
+        """Block until outputs may have changed and events stopped; return when the first came"""
+        while not self._event(3600):
+            pass
+        first = time.monotonic()
+        while self._event(debounce):
+            pass
+        return first
+
+
+def switch(outputs, profiles_path=PROFILES_PATH):
+    """Apply the profile for outputs; return (profile, written) or (None, [])"""
+    profile = choose(load_profiles(profiles_path), outputs)
+    return (profile, apply(profile)) if profile is not None else (None, [])
+
+
+def _log(outputs, profile, written, start, settled=None):
+    """Print a switch, with the time since start and since the outputs settled"""
+    now = time.monotonic()
+    what = ', '.join(os.path.basename(path) for path in written) or 'nothing changed'
+    name = profile.name if profile is not None else 'no profile'
+    timing = f"{(now - start) * 1000:.0f} ms"
+    if settled is not None and settled != start:
+        timing += f" after the first event, {(now - settled) * 1000:.0f} ms to apply"
+    print(f"{' '.join(sorted(outputs)) or 'no outputs'}: {name} ({what}) in {timing}", flush=True)
+
+
+def daemon(root, interval, profiles_path=PROFILES_PATH):
+    events = HotplugEvents(root, interval)
+    current = None
+    while True:
+        start = events.wait() if current is not None else time.monotonic()
+        settled = time.monotonic() if current is not None else start
+        outputs = connected_outputs(root)
+        if outputs == current:
+            continue
+        try:
+            profile, written = switch(outputs, profiles_path)
+        except (OSError, niri_kdl.KdlError) as e:
+            print(f"Cannot switch profile: {e}", file=sys.stderr)
+            profile, written = None, []
+        current = outputs
+        _log(outputs, profile, written, start, settled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default=PROFILES_PATH, help="profiles file (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('daemon', help="switch profiles on hotplug")
+    run.add_argument('--root', default='/', help="prefix of /sys, for a fake tree")
+    run.add_argument('--interval', type=float, default=2.0,
+                     help="seconds between status reads without hotplug events")
+    apply_parser = commands.add_parser('apply', help="apply a profile now")
+    apply_parser.add_argument('profile', nargs='?')
+    commands.add_parser('status', help="print the connected outputs and their profile")
+    args = parser.parse_args()
+
+    if args.command == 'daemon':
+        try:
+            daemon(args.root, args.interval, args.profiles)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        profiles = load_profiles(args.profiles)
+    except (OSError, niri_kdl.KdlError) as e:
+        print(f"Error reading profiles: {e}", file=sys.stderr)
+        sys.exit(1)
+    outputs = connected_outputs()
+    if args.command == 'status':
+        profile = choose(profiles, outputs)
+        print(f"{' '.join(sorted(outputs)) or 'no outputs'}: {profile.name if profile else 'no profile'}")
+        return
+
+    start = time.monotonic()
+    if args.profile:
+        profile = next((profile for profile in profiles if profile.name == args.profile), None)
+        if profile is None:
+            print(f"Unknown profile {args.profile!r}", file=sys.stderr)
+            sys.exit(2)
+    else:
+        profile = choose(profiles, outputs)
+    try:
+        written = apply(profile) if profile is not None else []
+    except OSError as e:
+        print(f"Cannot apply profile: {e}", file=sys.stderr)
+        sys.exit(1)
+    _log(outputs, profile, written, start)
+
+
+if __name__ == '__main__':
+    main()
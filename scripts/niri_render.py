@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Render config/src trees for many machines from an inventory.
+
+    niri_render.py [-j JOBS] [--templates DIR] [--out DIR] INVENTORY
+
+INVENTORY is a JSON lines file (or `-` for stdin) with one host per line,
+a JSON array, or a CSV file:
+
+    {"host": "lab-017",
+     "outputs": [{"name": "eDP-1", "scale": 1.25, "x": 0, "y": 700},
+                 {"name": "HDMI-A-1", "mode": "2560x1440@59.951", "x": 1536, "y": 0}],
+     "workspaces": {"Rete": "eDP-1", "Git": "HDMI-A-1"},
+     "input": {"keyboard.xkb.layout": "de", "touchpad.tap": true},
+     "autostart": ["swaybg -i /usr/share/backgrounds/lab.png", ["nm-applet"]]}
+
+In CSV the outputs, workspaces and autostart cells hold the same JSON and
+every other column is an input setting named by its key, such as
+keyboard.xkb.layout (see niri-inputsettings.py --list); empty cells are
+left out.
+
+Each host gets DIR/HOST/src/ with every file of the templates (default:
+the src directory next to lxqt-niri.kdl). Four are edited with the same
+writer as niri-inputsettings, so their comments and layout stay:
+
+    outputs.kdl      outputs not listed are removed; scale, mode, transform,
+                     x/y (position) and off are set on the listed ones
+    workspaces.kdl   open-on-output of the listed workspaces, added when
+                     missing; null unbinds
+    input.kdl        settings, checked like --set
+    autostart.kdl    a string is added as spawn-sh-at-startup, a list as
+                     spawn-at-startup, unless the template has it
+
+The inventory is read as it is rendered, in batches for a pool of JOBS
+processes (default: one per CPU). A file is only written when its content
+changes, and the same inventory and templates always render the same
+bytes. Hosts with changes or errors are printed in inventory order, then
+a summary; the exit status is 1 when any host failed.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import niri_config
+import niri_input
+import niri_kdl
+
+TEMPLATES = os.path.join(os.path.dirname(niri_config.CONFIG_PATH), 'src')
+OUT_DIR = 'hosts'
+
+# Hosts handed to the pool at a time, per process
+BATCH = 64
+
+FIELDS = ('host', 'outputs', 'workspaces', 'input', 'autostart')
+OUTPUT_FIELDS = ('name', 'scale', 'mode', 'transform', 'x', 'y', 'off')
+
+_templates = {}     # file name -> text, set in every worker
+
+
+def load_templates(directory=TEMPLATES):
+    """Read the *.kdl files of a template directory"""
+    templates = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.kdl'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                templates[name] = f.read()
+    for name in ('outputs.kdl', 'workspaces.kdl', 'input.kdl', 'autostart.kdl'):
+        templates.setdefault(name, '')
+    return templates
+
+
+def read_inventory(path):
+    """Yield the hosts of an inventory one by one, as dicts"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield _csv_host(row)
+        return
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == '[':
+            # A JSON array can only be read whole
+            yield from json.loads(first + f.read())
+            return
+        for number, line in enumerate(itertools.chain([first + f.readline()], f), 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {e}") from None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _csv_host(row):
+    host = {'host': row.pop('host', None), 'input': {}}
+    for name in ('outputs', 'workspaces', 'autostart'):
+        if row.get(name):
+            host[name] = json.loads(row[name])
+        row.pop(name, None)
+    for key, value in row.items():
+        if value:
+            host['input'][key] = value
+    return host
+
+
+def _setting(key, value):
+    if key not in niri_input.SETTINGS:
+        raise ValueError(f"unknown input setting {key!r}")
+    # The same checks as --set, for typed JSON values too
+    text = value if isinstance(value, str) else niri_input.format_setting(value)
+    return niri_input.parse_value(key, text)
+
+
+def _render_outputs(text, outputs):
+    doc = niri_kdl.Document(text)
+    wanted = {}
+    for output in outputs:
+        if (not isinstance(output, dict) or set(output) - set(OUTPUT_FIELDS)
+                or not isinstance(output.get('name'), str)):
+            raise ValueError(f"output needs a name and only {', '.join(OUTPUT_FIELDS)}: {output!r}")
+        wanted[output['name']] = output
+    for node in doc.root.all('output'):
+        if not node.args or node.args[0] not in wanted:
+            doc.remove(node)
+    for name, output in wanted.items():
+        node = next((node for node in doc.root.all('output') if node.args[:1] == [name]), None)
+        if node is None:
+            node = doc.insert(doc.root, niri_kdl.Node('output', [name]))
+        if 'scale' in output:
+            # niri wants a float, 2.0 rather than 2
+            _set_child(doc, node, 'scale', float(output['scale']))
+        for field in ('mode', 'transform'):
+            if field in output:
+                _set_child(doc, node, field, str(output[field]))
+        if 'x' in output or 'y' in output:
+            position = node.child('position') or doc.insert(node, niri_kdl.Node('position'))
+            for field in ('x', 'y'):
+                if field in output:
+                    doc.set_prop(position, field, int(output[field]))
+        if 'off' in output:
+            off = node.child('off')
+            if output['off'] and off is None:
+                doc.insert(node, niri_kdl.Node('off'))
+            elif not output['off'] and off is not None:
+                doc.remove(off)
+    return doc.render()
+
+
+def _set_child(doc, node, name, value):
+    child = node.child(name)
+    if child is None:
+        doc.insert(node, niri_kdl.Node(name, [value]))
+    else:
+        doc.set_args(child, value)
+
+
+def _render_workspaces(text, workspaces):
+    doc = niri_kdl.Document(text)
+    for name, output in workspaces.items():
+        node = next((node for node in doc.root.all('workspace') if node.args[:1] == [name]), None)
+        if node is None:
+            if output is None:
+                continue
+            node = doc.insert(doc.root, niri_kdl.Node('workspace', [name]))
+        if output is None:
+            if node.child('open-on-output') is not None:
+                doc.remove(node.child('open-on-output'))
+        else:
+            _set_child(doc, node, 'open-on-output', str(output))
+    return doc.render()
+
+
+def _render_input(text, settings):
+    doc = niri_kdl.Document(text)
+    for key, value in settings.items():
+        niri_input.put(doc, key, _setting(key, value))
+    return doc.render()
+
+
+def _render_autostart(text, entries):
+    doc = niri_kdl.Document(text)
+    present = {(node.name, tuple(node.args)) for node in doc.root.children}
+    for entry in entries:
+        if isinstance(entry, str):
+            node = niri_kdl.Node('spawn-sh-at-startup', [entry])
+        elif isinstance(entry, list) and entry and all(isinstance(arg, str) for arg in entry):
+            node = niri_kdl.Node('spawn-at-startup', list(entry))
+        else:
+            raise ValueError(f"autostart entries are a command line or a list of arguments, not {entry!r}")
+        if (node.name, tuple(node.args)) not in present:
+            present.add((node.name, tuple(node.args)))
+            doc.insert(doc.root, node)
+    return doc.render()
+
+
+def render_host(host, templates):
+    """Return {file name: text} of a host's src directory"""
+    unknown = set(host) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields {', '.join(sorted(unknown))}")
+    for field, kind in (('outputs', list), ('workspaces', dict), ('input', dict), ('autostart', list)):
+        if host.get(field) is not None and not isinstance(host[field], kind):
+            raise ValueError(f"{field} must be a JSON {'array' if kind is list else 'object'}")
+    files = dict(templates)
+    if host.get('outputs') is not None:
+        files['outputs.kdl'] = _render_outputs(templates['outputs.kdl'], host['outputs'])
+    if host.get('workspaces') is not None:
+        files['workspaces.kdl'] = _render_workspaces(templates['workspaces.kdl'], host['workspaces'])
+    if host.get('input'):
+        files['input.kdl'] = _render_input(templates['input.kdl'], host['input'])
+    if host.get('autostart'):
+        files['autostart.kdl'] = _render_autostart(templates['autostart.kdl'], host['autostart'])
+    return files
+
+
+def host_name(host):
+    """Return the host's name, raising ValueError unless it is a usable directory name"""
+    name = host.get('host') if isinstance(host, dict) else None
+    if not isinstance(name, str) or not name or '/' in name or name.startswith('.'):
+        raise ValueError(f"host without a valid name: {host!r:.80}")
+    return name
+
+
+def write_host(out_dir, name, files):
+    """Write the files that differ from what is there; return their names"""
+    directory = os.path.join(out_dir, name, 'src')
+    os.makedirs(directory, exist_ok=True)
+    return [file_name for file_name, text in files.items()
+            if niri_kdl.write_atomic(os.path.join(directory, file_name), text)]
+
+
+def _init(templates):
+    global _templates
+    _templates = templates
+
+
+def _job(job):
+    host, out_dir = job
+    name = host['host']
+    try:
+        return name, write_host(out_dir, name, render_host(host, _templates)), None
+    except (ValueError, TypeError, OSError, niri_kdl.KdlError) as e:
+        return name, [], str(e)
+
+
+def _checked(hosts, seen):
+    """Yield (host, None) for the hosts to render and (None, result) for the others"""
+    for host in hosts:
+        try:
+            name = host_name(host)
+        except ValueError as e:
+            yield None, (None, [], str(e))
+            continue
+        if name in seen:
+            yield None, (name, [], "listed twice, only the first one is rendered")
+            continue
+        seen.add(name)
+        yield host, None
+
+
+def render(hosts, out_dir, templates, jobs=None):
+    """Render and write every host; yield (name, written, error) in inventory order"""
+    jobs = jobs or os.cpu_count() or 1
+    seen = set()
+    if jobs == 1:
+        _init(templates)
+        for host, result in _checked(hosts, seen):
+            yield result or _job((host, out_dir))
+        return
+
+    hosts = iter(hosts)
+    with multiprocessing.Pool(jobs, initializer=_init, initargs=(templates,)) as pool:
+        while True:
+            # Only a batch is read ahead, however long the inventory
+            batch = list(_checked(itertools.islice(hosts, jobs * BATCH), seen))
+            if not batch:
+                return
+            results = pool.imap(_job, [(host, out_dir) for host, result in batch if result is None],
+                                chunksize=max(1, BATCH // 4))
+            for host, result in batch:
+                yield result or next(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-j', '--jobs', type=int, help="processes to use (default: one per CPU)")
+    parser.add_argument('--templates', default=TEMPLATES, help="template src directory (default: %(default)s)")
+    parser.add_argument('--out', default=OUT_DIR, help="directory of the host trees (default: %(default)s)")
+    parser.add_argument('inventory', help="JSON lines, JSON array or .csv file, - for stdin")
+    args = parser.parse_args()
+
+    try:
+        templates = load_templates(args.templates)
+    except OSError as e:
+        print(f"Cannot read the templates: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    count = failed = files = 0
+    try:
+        for name, written, error in render(read_inventory(args.inventory), args.out, templates, args.jobs):
+            count += 1
+            files += len(written)
+            if error:
+                failed += 1
+                print(f"{name or '?'}: {error}", file=sys.stderr)
+            elif written:
+                print(f"{name}: {' '.join(written)}")
+    except (OSError, ValueError) as e:
+        print(f"Cannot read the inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"{count} hosts, {files} files written, {failed} failed, {count / elapsed:.0f} hosts/s", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Record niri's event stream and play it back on a fake niri socket.
+
+    niri_replay.py record FILE [--stdin] [--limit N]
+    niri_replay.py replay FILE [--socket PATH] [--speed N|max] [--clients N] [--loop N] [-- COMMAND...]
+    niri_replay.py info FILE
+
+record reads niri's event stream, or with --stdin the output of
+`niri msg -j event-stream`, and writes one JSON line per event with the
+seconds since the first one, gzip-compressed when FILE ends in .gz:
+
+    {"t": 12.503, "event": {"WindowFocusChanged": {"id": 12}}}
+
+replay serves FILE on a niri_fake socket at --speed times the recorded
+pace (default 1), or as fast as the consumers take it with `max`. Plain
+event lines without "t", such as benchmarks/events.jsonl, are played
+back to back and left out of how far the replay fell behind. The replay
+starts once --clients event streams are connected. Until it ends,
+requests are answered like niri does: actions with "Handled",
+FocusedWindow, Windows, Workspaces and KeyboardLayouts from the events
+played so far.
+
+With COMMAND, it is started with $NIRI_SOCKET set to the fake socket and
+$NIRI_EVENTS_SOCKET to one that does not exist, so that the helpers do
+not find a running niri_events.py daemon:
+
+    niri_replay.py replay session.jsonl.gz --speed max --loop 100 -- focus-urgent
+
+At the end the streams are closed, COMMAND gets PROCESS_EXIT_TIMEOUT
+seconds to exit, and the events per second and the most the replay fell
+behind the recorded pace are printed.
+"""
+
+import argparse
+import collections
+import gzip
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import niri_fake
+import niri_ipc
+import niri_state
+
+PROCESS_EXIT_TIMEOUT = 5.0
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def record(path, events, limit=None):
+    """Write events with their times to path until Ctrl+C; return how many were written"""
+    start = None
+    count = 0
+    with _open(path, 'w') as f:
+        try:
+            for event in events:
+                now = time.monotonic()
+                if start is None:
+                    start = now
+                f.write(json.dumps({'t': round(now - start, 6), 'event': event}, separators=(',', ':')) + '\n')
+                count += 1
+                if count == limit:
+                    break
+        except KeyboardInterrupt:
+            pass
+    return count
+
+
+def read_recording(path):
+    """Yield (seconds, event) from a recording, None as time for plain event lines"""
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.keys() == {'t', 'event'}:
+                yield data['t'], data['event']
+            else:
+                yield None, data
+
+
+def play(fake, path, speed=1.0, loops=1):
+    """Emit the recording on fake; return (events, seconds, most seconds behind)"""
+    start = time.monotonic()
+    count = 0
+    behind = 0.0
+    offset = 0.0
+    for _ in range(loops):
+        t = 0.0
+        for recorded, event in read_recording(path):
+            # Plain lines have no time: they go out at once and never count as late
+            if recorded is not None:
+                t = recorded
+                if speed:
+                    delay = start + (offset + t) / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        behind = max(behind, -delay)
+            fake.emit(event)
+            count += 1
+        offset += t
+    return count, time.monotonic() - start, behind
+
+
+def _speed(text):
+    if text == 'max':
+        return 0.0
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("the speed must be above 0, or max")
+    return speed
+
+
+def _stdin_events():
+    for line in sys.stdin:
+        if line.strip():
+            yield json.loads(line)
+
+
+def replay(args):
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    path = args.socket or os.path.join(runtime_dir, f'niri-replay-{os.getpid()}.sock')
+    fake = niri_fake.FakeNiri(path, keep_alive=True, state=niri_state.State())
+    fake.start()
+    process = None
+    try:
+        if args.command:
+            env = dict(os.environ, NIRI_SOCKET=path,
+                       NIRI_EVENTS_SOCKET=os.path.join(os.path.dirname(path), f'.no-hub-{os.getpid()}'))
+            process = subprocess.Popen(args.command, env=env)
+        else:
+            print(f"NIRI_SOCKET={path}", flush=True)
+        while not fake.wait_for_streams(args.clients, 0.5):
+            if process is not None and process.poll() is not None:
+                sys.exit(f"{args.command[0]} exited before reading events")
+        count, elapsed, behind = play(fake, args.file, args.speed, args.loop)
+    finally:
+        fake.stop()
+        if process is not None:
+            try:
+                process.wait(PROCESS_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+                process.wait()
+    print(f"{count} events in {elapsed:.2f} s, {count / elapsed if elapsed else 0:.0f} events/s, "
+          f"{len(fake.requests)} requests, at most {behind * 1000:.1f} ms behind", file=sys.stderr)
+
+
+def info(path):
+    types = collections.Counter()
+    duration = 0.0
+    for t, event in read_recording(path):
+        types.update(event.keys())
+        duration = t if t is not None else duration
+    print(f"{sum(types.values())} events over {duration:.1f} s")
+    for kind, count in types.most_common():
+        print(f"{count:8d}  {kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command_name', required=True)
+    record_parser = commands.add_parser('record', help="save niri's event stream to FILE")
+    record_parser.add_argument('file', metavar='FILE', help="recording, .gz to compress, - for stdout")
+    record_parser.add_argument('--stdin', action='store_true', help="read `niri msg -j event-stream` from stdin")
+    record_parser.add_argument('--limit', type=int, help="stop after this many events")
+    replay_parser = commands.add_parser('replay', help="serve FILE on a fake niri socket",
+                                        epilog="-- COMMAND...  run COMMAND against the fake socket")
+    replay_parser.add_argument('file', metavar='FILE', help="recording or plain event lines, - for stdin")
+    replay_parser.add_argument('--socket', help="socket path (default: one in $XDG_RUNTIME_DIR)")
+    replay_parser.add_argument('--speed', type=_speed, default=1.0, help="times the recorded pace, or max")
+    replay_parser.add_argument('--clients', type=int, default=1, help="event streams to wait for (default: 1)")
+    replay_parser.add_argument('--loop', type=int, default=1, help="play the recording this many times")
+    info_parser = commands.add_parser('info', help="count the events of FILE by type")
+    info_parser.add_argument('file', metavar='FILE')
+    # Everything after -- is the command, whatever options come before it
+    argv = sys.argv[1:]
+    command = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:len(argv) - len(command) - 1] if '--' in argv else argv)
+    args.command = command
+
+    # Leave through the finally blocks, which close the recording and the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if args.command_name == 'record':
+            if args.stdin:
+                count = record(args.file, _stdin_events(), args.limit)
+            else:
+                with niri_ipc.Client() as niri:
+                    count = record(args.file, niri.event_stream(), args.limit)
+            print(f"{count} events recorded", file=sys.stderr)
+        elif args.command_name == 'replay':
+            if args.loop > 1 and args.file == '-':
+                parser.error("--loop needs a FILE, not stdin")
+            replay(args)
+        else:
+            info(args.file)
+    except (niri_ipc.NiriError, OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""Evaluate niri window rules offline, and find the ones that do nothing.
+
+    niri_rules.py [--config FILE]... check
+    niri_rules.py [--config FILE]... match APP_ID TITLE
+    niri_rules.py [--config FILE]... batch [WINDOWS.json]
+
+niri tests every match and exclude of every window-rule whenever a window
+opens or changes its title. Here the regexes of each property (app-id,
+title) are compiled together: literal alternatives, which is all that
+makefloating writes, go into exact, prefix and suffix tables and one
+Aho-Corasick automaton for substrings, and only the remaining regexes are
+searched one by one. Every pattern gets a bit, so a window is tested
+against all rules with a few bit operations.
+
+The rules come from each --config FILE, default lxqt-niri.kdl, and every
+file it includes, through niri_config's parse cache.
+
+check lists matchers that cannot change the result: duplicates, matchers
+implied by another one in the same rule, matchers always excluded by
+their own rule, and matchers whose effect a later rule always sets again.
+
+batch reads windows as `niri msg -j windows` prints them, or JSON lines
+of events (WindowsChanged, WindowOpenedOrChanged); without a file it asks
+niri for the current windows. It prints the matching rules per window and
+times the compiled evaluation against searching each regex on its own.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+import niri_config
+import niri_ipc
+import niri_kdl
+
+REGEX_PROPS = ('app-id', 'title')
+
+# Characters with a meaning in niri's (Rust) regexes
+_META = set('\\.+*?()|[]{}^$')
+
+
+def _escaped(text, pos):
+    """True if the character at pos is preceded by an odd number of backslashes"""
+    count = 0
+    while pos > count and text[pos - count - 1] == '\\':
+        count += 1
+    return count % 2 == 1
+
+
+def split_alternatives(regex):
+    """Split a regex at its top-level |"""
+    parts, depth, in_class, start = [], 0, False, 0
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            parts.append(regex[start:i])
+            start = i + 1
+        i += 1
+    parts.append(regex[start:])
+    return parts
+
+
+def _group_end(regex, start):
+    """Return the index of the ) closing the group opened at start, or None"""
+    depth, in_class = 0, False
+    i = start
+    while i < len(regex):
+        char = regex[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return None
+
+
+def alternatives(regex):
+    """Split a regex into its alternatives, also when a group spans all of it
+
+    ^(?:a|b.*)$ gives ^a$ and ^b.*$, so the titles makefloating merges into
+    one regex stay plain strings.
+    """
+    head = '^' if regex.startswith('^') else ''
+    tail = '$' if regex.endswith('$') and not _escaped(regex, len(regex) - 1) else ''
+    body = regex[len(head):len(regex) - len(tail)]
+    if body.startswith('(?:') and _group_end(body, 0) == len(body) - 1:
+        return [head + alternative + tail for alternative in split_alternatives(body[3:-1])]
+    return split_alternatives(regex)
+
+
+def literal(alternative):
+    """Return (anchored at start, text, anchored at end) if the regex is a plain string"""
+    start = end = False
+    if alternative.startswith('^'):
+        start, alternative = True, alternative[1:]
+    if alternative.startswith('.*'):
+        start, alternative = False, alternative[2:]
+    if alternative.endswith('$') and not _escaped(alternative, len(alternative) - 1):
+        end, alternative = True, alternative[:-1]
+    if alternative.endswith('.*') and not _escaped(alternative, len(alternative) - 2):
+        end, alternative = False, alternative[:-2]
+    chars = []
+    i = 0
+    while i < len(alternative):
+        char = alternative[i]
+        if char == '\\':
+            if i + 1 < len(alternative) and not alternative[i + 1].isalnum():
+                chars.append(alternative[i + 1])
+                i += 2
+                continue
+            return None
+        if char in _META:
+            return None
+        chars.append(char)
+        i += 1
+    return start, ''.join(chars), end
+
+
+def _implies(a, b):
+    """True if every string matching literal a also matches literal b"""
+    a_start, a_text, a_end = a
+    b_start, b_text, b_end = b
+    if b_start and b_end:
+        return a_start and a_end and a_text == b_text
+    if b_start:
+        return a_start and a_text.startswith(b_text)
+    if b_end:
+        return a_end and a_text.endswith(b_text)
+    return b_text in a_text
+
+
+class Pattern:
+    """One regex of a match or exclude, split into its alternatives"""
+
+    __slots__ = ('text', 'bit', 'literals', 'regexes', 'regex')
+
+    def __init__(self, text, bit):
+        self.text = text
+        self.bit = bit
+        self.literals = []
+        self.regexes = []
+        for alternative in alternatives(text):
+            parsed = literal(alternative)
+            if parsed is None:
+                self.regexes.append(alternative)
+            else:
+                self.literals.append(parsed)
+        try:
+            self.regex = re.compile(text)
+        except re.error:
+            self.regex = None
+
+    def implies(self, other):
+        """True if every string this pattern matches is matched by other too"""
+        if self.text == other.text:
+            return True
+        if self.regexes:
+            return False
+        return all(any(_implies(a, b) for b in other.literals) for a in self.literals)
+
+
+class _AhoCorasick:
+    """Find which of many substrings occur in a text in a single pass"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [0]
+
+    def add(self, word, mask):
+        state = 0
+        for char in word:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(0)
+            state = next_state
+        self.out[state] |= mask
+
+    def build(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.out[next_state] |= self.out[self.fail[next_state]]
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = mask = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            mask |= out[state]
+        return mask
+
+
+class PatternSet:
+    """All regexes used for one window property, matched together"""
+
+    def __init__(self):
+        self.patterns = {}
+        self.always = 0
+        self.exact = {}
+        self.prefixes = {}          # length -> {text: mask}
+        self.suffixes = {}
+        self.automaton = None
+        self.regexes = []           # (bit, compiled regex of the other alternatives)
+        self.unsupported = []
+
+    def add(self, text, bit):
+        """Return the Pattern for text, allocating bit if it is new"""
+        if text not in self.patterns:
+            self.patterns[text] = Pattern(text, bit)
+        return self.patterns[text]
+
+    def compile(self):
+        automaton = _AhoCorasick()
+        for pattern in self.patterns.values():
+            for start, text, end in pattern.literals:
+                if start and end:
+                    self.exact[text] = self.exact.get(text, 0) | pattern.bit
+                elif start:
+                    table = self.prefixes.setdefault(len(text), {})
+                    table[text] = table.get(text, 0) | pattern.bit
+                elif end:
+                    table = self.suffixes.setdefault(len(text), {})
+                    table[text] = table.get(text, 0) | pattern.bit
+                elif not text:
+                    self.always |= pattern.bit
+                else:
+                    automaton.add(text, pattern.bit)
+            if pattern.regexes:
+                try:
+                    self.regexes.append((pattern.bit, re.compile('|'.join(pattern.regexes))))
+                except re.error:
+                    self.unsupported.append(pattern.text)
+        if len(automaton.goto) > 1:
+            automaton.build()
+            self.automaton = automaton
+        self.prefixes = sorted(self.prefixes.items())
+        self.suffixes = sorted(self.suffixes.items())
+
+    def match(self, text):
+        """Return the bits of every pattern that matches text"""
+        if text is None:
+            return 0
+        mask = self.always | self.exact.get(text, 0)
+        if self.automaton is not None:
+            mask |= self.automaton.search(text)
+        size = len(text)
+        for length, table in self.prefixes:
+            if length > size:
+                break
+            mask |= table.get(text[:length], 0)
+        for length, table in self.suffixes:
+            if length > size:
+                break
+            mask |= table.get(text[size - length:], 0)
+        for bit, regex in self.regexes:
+            if not mask & bit and regex.search(text):
+                mask |= bit
+        return mask
+
+
+class Matcher:
+    """A match or exclude node: every condition has to hold"""
+
+    __slots__ = ('node', 'location', 'conditions')
+
+    def __init__(self, node, location, conditions):
+        self.node = node
+        self.location = location
+        # property -> Pattern for app-id/title, the value for flags like is-focused
+        self.conditions = conditions
+
+    def __str__(self):
+        return niri_kdl.format_node(self.node).strip()
+
+    def test(self, masks, window):
+        for prop, condition in self.conditions.items():
+            if isinstance(condition, Pattern):
+                if not masks[prop] & condition.bit:
+                    return False
+            elif window.get(prop.replace('-', '_')) != condition:
+                return False
+        return True
+
+    def test_regexes(self, window):
+        """test() by searching every regex on its own, the way niri does"""
+        for prop, condition in self.conditions.items():
+            value = window.get(prop.replace('-', '_'))
+            if isinstance(condition, Pattern):
+                if value is None or condition.regex is None or not condition.regex.search(value):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def implies(self, other):
+        """True if every window this matcher matches is matched by other too"""
+        for prop, condition in other.conditions.items():
+            mine = self.conditions.get(prop)
+            if mine is None:
+                return False
+            if isinstance(condition, Pattern):
+                if not isinstance(mine, Pattern) or not mine.implies(condition):
+                    return False
+            elif mine != condition:
+                return False
+        return True
+
+
+class _MatcherGroup:
+    """The matches (or excludes) of one rule, with single-regex matchers merged"""
+
+    def __init__(self, matchers):
+        self.matchers = matchers
+        self.any = {}               # property -> bits, one of them is enough
+        self.other = []
+        for matcher in matchers:
+            if len(matcher.conditions) == 1:
+                prop, condition = next(iter(matcher.conditions.items()))
+                if isinstance(condition, Pattern):
+                    self.any[prop] = self.any.get(prop, 0) | condition.bit
+                    continue
+            self.other.append(matcher)
+        self.any = list(self.any.items())
+
+    def test(self, masks, window):
+        for prop, bits in self.any:
+            if masks[prop] & bits:
+                return True
+        for matcher in self.other:
+            if matcher.test(masks, window):
+                return True
+        return False
+
+
+class Rule:
+    """A window-rule node"""
+
+    def __init__(self, node, location, matches, excludes):
+        self.node = node
+        self.location = location
+        self.matches = _MatcherGroup(matches)
+        self.excludes = _MatcherGroup(excludes)
+        self.properties = [child for child in node.children if child.name not in ('match', 'exclude')]
+
+    def __str__(self):
+        names = ', '.join(child.name for child in self.properties)
+        return f"{self.location} window-rule ({names})"
+
+    def applies(self, masks, window):
+        if self.matches.matchers and not self.matches.test(masks, window):
+            return False
+        return not self.excludes.test(masks, window)
+
+    def applies_regexes(self, window):
+        matchers = self.matches.matchers
+        if matchers and not any(matcher.test_regexes(window) for matcher in matchers):
+            return False
+        return not any(matcher.test_regexes(window) for matcher in self.excludes.matchers)
+
+
+class Ruleset:
+    """Every window-rule of some config files, compiled for matching"""
+
+    def __init__(self):
+        self.rules = []
+        self.patterns = {prop: PatternSet() for prop in REGEX_PROPS}
+        self._bits = 0
+
+    @classmethod
+    def load(cls, paths=None):
+        """Load the rules of some files and what they include, or of the whole configuration"""
+        ruleset = cls()
+        for config_file, node in niri_config.load_nodes(paths):
+            if node.name == 'window-rule':
+                ruleset.add_rule(node, config_file.location)
+        if not ruleset.rules:
+            raise ValueError(f"no window-rule in {', '.join(paths or [niri_config.CONFIG_PATH])}")
+        ruleset.compile()
+        return ruleset
+
+    def add(self, text, name):
+        """Add the window rules of a file's text; name is used in locations"""
+        def location(node):
+            return f"{name}:{text.count(chr(10), 0, node.span[0]) + 1}"
+
+        for node in niri_kdl.parse(text).all('window-rule'):
+            self.add_rule(node, location)
+
+    def add_rule(self, node, location):
+        """Add a window-rule node; location(node) names where it is"""
+        matches, excludes = [], []
+        for child in node.children:
+            if child.name in ('match', 'exclude'):
+                matcher = Matcher(child, location(child), self._conditions(child))
+                (matches if child.name == 'match' else excludes).append(matcher)
+        self.rules.append(Rule(node, location(node), matches, excludes))
+
+    def _conditions(self, node):
+        conditions = {}
+        for prop, value in node.props.items():
+            if prop in REGEX_PROPS and isinstance(value, str):
+                pattern_set = self.patterns[prop]
+                pattern = pattern_set.patterns.get(value)
+                if pattern is None:
+                    pattern = pattern_set.add(value, 1 << self._bits)
+                    self._bits += 1
+                conditions[prop] = pattern
+            else:
+                conditions[prop] = value
+        return conditions
+
+    def compile(self):
+        for pattern_set in self.patterns.values():
+            pattern_set.compile()
+
+    def masks(self, window):
+        return {prop: pattern_set.match(window.get(prop.replace('-', '_')))
+                for prop, pattern_set in self.patterns.items()}
+
+    def matching(self, window):
+        """Return the rules that apply to a window dict with app_id and title"""
+        masks = self.masks(window)
+        return [rule for rule in self.rules if rule.applies(masks, window)]
+
+    def matching_regexes(self, window):
+        """matching() by searching every regex on its own"""
+        return [rule for rule in self.rules if rule.applies_regexes(window)]
+
+    def unsupported(self):
+        return [text for pattern_set in self.patterns.values() for text in pattern_set.unsupported]
+
+    def findings(self):
+        """Return (location, message) for matchers that cannot change the result"""
+        findings = [('', f"regex not understood here, it never matches: {text}") for text in self.unsupported()]
+        for index, rule in enumerate(self.rules):
+            matchers = rule.matches.matchers
+            for n, matcher in enumerate(matchers):
+                for other in matchers[:n]:
+                    if str(other) == str(matcher):
+                        findings.append((matcher.location, f"{matcher} repeats {other.location}"))
+                        break
+                else:
+                    reason = self._redundant(matcher, matchers, rule, self.rules[index + 1:])
+                    if reason:
+                        findings.append((matcher.location, f"{matcher} {reason}"))
+            if not rule.properties:
+                findings.append((rule.location, "window-rule sets nothing"))
+        return findings
+
+    def _redundant(self, matcher, matchers, rule, later_rules):
+        for other in matchers:
+            if other is not matcher and str(other) != str(matcher) and matcher.implies(other):
+                return f"is implied by {other} at {other.location}"
+        for exclude in rule.excludes.matchers:
+            if matcher.implies(exclude):
+                return f"never applies, {exclude} at {exclude.location} excludes it"
+        if not rule.properties:
+            return None
+        names = {child.name for child in rule.properties}
+        for later in later_rules:
+            if later.excludes.matchers or not names <= {child.name for child in later.properties}:
+                continue
+            if later.matches.matchers and not any(matcher.implies(other) for other in later.matches.matchers):
+                continue
+            mine = {niri_kdl.format_node(child) for child in rule.properties}
+            theirs = {niri_kdl.format_node(child) for child in later.properties}
+            if mine <= theirs:
+                return f"is covered by {later}, which sets the same"
+            return f"is overridden by {later}"
+        return None
+
+
+def read_windows(path):
+    """Read windows from a JSON list or from JSON lines of windows or events"""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    windows = []
+    for item in data if isinstance(data, list) else [data]:
+        if 'WindowsChanged' in item:
+            windows.extend(item['WindowsChanged']['windows'])
+        elif 'WindowOpenedOrChanged' in item:
+            windows.append(item['WindowOpenedOrChanged']['window'])
+        elif 'title' in item or 'app_id' in item:
+            windows.append(item)
+    return windows
+
+
+def time_per_window(function, windows):
+    """Return microseconds per window, over at least 1000 evaluations"""
+    rounds = max(1, 1000 // max(1, len(windows)))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for window in windows:
+            function(window)
+    return (time.perf_counter() - start) * 1e6 / (rounds * max(1, len(windows)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', action='append', metavar='FILE',
+                        help="KDL file with window rules, and its includes (default: lxqt-niri.kdl)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('check', help="list matchers that cannot change the result")
+    match = commands.add_parser('match', help="list the rules that apply to a window")
+    match.add_argument('app_id')
+    match.add_argument('title')
+    batch = commands.add_parser('batch', help="match recorded windows and time it")
+    batch.add_argument('windows', nargs='?', help="JSON file of windows or events, - for stdin")
+    args = parser.parse_args()
+
+    try:
+        ruleset = Ruleset.load(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error reading rules: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'check':
+        findings = ruleset.findings()
+        for location, message in findings:
+            print(f"{location}: {message}" if location else message)
+        sys.exit(1 if findings else 0)
+
+    if args.command == 'match':
+        for rule in ruleset.matching({'app_id': args.app_id, 'title': args.title}):
+            print(rule)
+        return
+
+    try:
+        if args.windows:
+            windows = read_windows(args.windows)
+        else:
+            import niri_events
+            with niri_events.client() as niri:
+                windows = niri.request('Windows')['Windows']
+    except (OSError, ValueError, niri_ipc.NiriError) as e:
+        print(f"Error reading windows: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for window in windows:
+        rules = ruleset.matching(window)
+        if rules != ruleset.matching_regexes(window):
+            print(f"compiled and per-regex matching disagree for {window.get('title')!r}", file=sys.stderr)
+        print(f"{window.get('app_id')}\t{window.get('title')}\t"
+              f"{' '.join(rule.location for rule in rules) or '-'}")
+    compiled = time_per_window(ruleset.matching, windows)
+    per_regex = time_per_window(ruleset.matching_regexes, windows)
+    print(f"{len(windows)} windows, {len(ruleset.rules)} rules: compiled {compiled:.1f} us/window, "
+          f"per-regex {per_regex:.1f} us/window", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Windows, workspaces, focus and urgency of niri, kept in memory.
+
+State starts from the snapshot niri sends at the beginning of its event
+stream (WorkspacesChanged, WindowsChanged, ...) and applies the events that
+follow. Windows and workspaces are stored as the JSON objects niri sends,
+indexed so that every lookup except the full lists is a dict access.
+
+niri_events.py keeps one State in its daemon and answers requests from it.
+"""
+
+import niri_ipc
+
+
+class State:
+    """The compositor state as seen through its event stream"""
+
+    def __init__(self):
+        self.windows = {}               # id -> window
+        self.workspaces = {}            # id -> workspace
+        self.workspace_ids = {}         # name -> id
+        self.active_workspaces = {}     # output -> id
+        self.urgent = set()             # window ids
+        self.focused_window_id = None
+        self.focused_workspace_id = None
+        self.keyboard_layouts = None
+        self.overview_open = False
+        self.have_windows = self.have_workspaces = False
+        self.handlers = {
+            'WorkspacesChanged': self._workspaces_changed,
+            'WorkspaceActivated': self._workspace_activated,
+            'WorkspaceUrgencyChanged': self._workspace_urgency_changed,
+            'WorkspaceActiveWindowChanged': self._workspace_active_window_changed,
+            'WindowsChanged': self._windows_changed,
+            'WindowOpenedOrChanged': self._window_opened_or_changed,
+            'WindowClosed': self._window_closed,
+            'WindowFocusChanged': self._window_focus_changed,
+            'WindowUrgencyChanged': self._window_urgency_changed,
+            'WindowLayoutsChanged': self._window_layouts_changed,
+            'KeyboardLayoutsChanged': self._keyboard_layouts_changed,
+            'KeyboardLayoutSwitched': self._keyboard_layout_switched,
+            'OverviewOpenedOrClosed': self._overview_opened_or_closed,
+        }
+
+    @classmethod
+    def from_niri(cls, niri):
+        """Build a State from one round of requests to a niri_ipc.Client"""
+        windows, workspaces, layouts = niri.pipeline(['Windows', 'Workspaces', 'KeyboardLayouts'])
+        state = cls()
+        state.apply({'WorkspacesChanged': {'workspaces': workspaces['Workspaces']}})
+        state.apply({'WindowsChanged': {'windows': windows['Windows']}})
+        state.apply({'KeyboardLayoutsChanged': {'keyboard_layouts': layouts['KeyboardLayouts']}})
+        return state
+
+    @property
+    def ready(self):
+        """True once the window and workspace snapshots have arrived"""
+        return self.have_windows and self.have_workspaces
+
+    def apply(self, event):
+        """Update the state from one event, e.g. {'WindowClosed': {'id': 3}}"""
+        for kind, data in event.items():
+            handler = self.handlers.get(kind)
+            if handler is not None:
+                handler(data)
+
+    # Workspaces
+
+    def _workspaces_changed(self, data):
+        self.workspaces = {workspace['id']: workspace for workspace in data['workspaces']}
+        self.workspace_ids = {}
+        self.active_workspaces = {}
+        self.focused_workspace_id = None
+        for workspace in self.workspaces.values():
+            if workspace['name'] is not None:
+                self.workspace_ids[workspace['name']] = workspace['id']
+            if workspace['is_active']:
+                self.active_workspaces[workspace['output']] = workspace['id']
+            if workspace['is_focused']:
+                self.focused_workspace_id = workspace['id']
+        self.have_workspaces = True
+
+    def _workspace_activated(self, data):
+        workspace = self.workspaces.get(data['id'])
+        if workspace is None:
+            return
+        previous = self.workspaces.get(self.active_workspaces.get(workspace['output']))
+        if previous is not None:
+            previous['is_active'] = False
+        workspace['is_active'] = True
+        self.active_workspaces[workspace['output']] = workspace['id']
+        if data['focused']:
+            previous = self.workspaces.get(self.focused_workspace_id)
+            if previous is not None:
+                previous['is_focused'] = False
+            workspace['is_focused'] = True
+            self.focused_workspace_id = workspace['id']
+
+    def _workspace_urgency_changed(self, data):
+        workspace = self.workspaces.get(data['id'])
+        if workspace is not None:
+            workspace['is_urgent'] = data['urgent']
+
+    def _workspace_active_window_changed(self, data):
+        workspace = self.workspaces.get(data['workspace_id'])
+        if workspace is not None:
+            workspace['active_window_id'] = data['active_window_id']
+
+    # Windows
+
+    def _windows_changed(self, data):
+        self.windows = {window['id']: window for window in data['windows']}
+        self.urgent = {id for id, window in self.windows.items() if window.get('is_urgent')}
+        self.focused_window_id = next(
+            (id for id, window in self.windows.items() if window['is_focused']), None)
+        self.have_windows = True
+
+    def _window_opened_or_changed(self, data):
+        window = data['window']
+        self.windows[window['id']] = window
+        if window.get('is_urgent'):
+            self.urgent.add(window['id'])
+        else:
+            self.urgent.discard(window['id'])
+        if window['is_focused']:
+            self._focus(window['id'])
+        elif self.focused_window_id == window['id']:
+            self.focused_window_id = None
+
+    def _window_closed(self, data):
+        self.windows.pop(data['id'], None)
+        self.urgent.discard(data['id'])
+        if self.focused_window_id == data['id']:
+            self.focused_window_id = None
+
+    def _window_focus_changed(self, data):
+        self._focus(data['id'])
+
+    def _focus(self, id):
+        previous = self.windows.get(self.focused_window_id)
+        if previous is not None:
+            previous['is_focused'] = False
+        window = self.windows.get(id)
+        if window is not None:
+            window['is_focused'] = True
+        self.focused_window_id = id
+
+    def _window_urgency_changed(self, data):
+        window = self.windows.get(data['id'])
+        if window is None:
+            return
+        window['is_urgent'] = data['urgent']
+        if data['urgent']:
+            self.urgent.add(data['id'])
+        else:
+            self.urgent.discard(data['id'])
+
+    def _window_layouts_changed(self, data):
+        for id, layout in data['changes']:
+            window = self.windows.get(id)
+            if window is not None:
+                window['layout'] = layout
+
+    # Keyboard and overview
+
+    def _keyboard_layouts_changed(self, data):
+        self.keyboard_layouts = dict(data['keyboard_layouts'])
+
+    def _keyboard_layout_switched(self, data):
+        if self.keyboard_layouts is not None:
+            self.keyboard_layouts['current_idx'] = data['idx']
+
+    def _overview_opened_or_closed(self, data):
+        self.overview_open = data['is_open']
+
+    # Queries
+
+    def answer(self, req):
+        """Return the Ok payload niri would send for req, or None if unknown.
+
+        Besides niri's own FocusedWindow, Windows, Workspaces and
+        KeyboardLayouts it answers {"Window": ID}, {"Workspace": NAME},
+        "FocusedWorkspace" and "UrgentWindows".
+        """
+        if isinstance(req, str):
+            name, arg = req, None
+        elif isinstance(req, dict) and len(req) == 1:
+            name, arg = next(iter(req.items()))
+        else:
+            return None
+        if name == 'FocusedWindow':
+            return {name: self.windows.get(self.focused_window_id)}
+        if name == 'Window':
+            return {name: self.windows.get(arg)}
+        if name == 'Windows':
+            return {name: list(self.windows.values())}
+        if name == 'UrgentWindows':
+            return {name: [self.windows[id] for id in self.urgent]}
+        if name == 'FocusedWorkspace':
+            return {name: self.workspaces.get(self.focused_workspace_id)}
+        if name == 'Workspace':
+            return {name: self.workspaces.get(self.workspace_ids.get(arg))}
+        if name == 'Workspaces':
+            return {name: list(self.workspaces.values())}
+        if name == 'KeyboardLayouts' and self.keyboard_layouts is not None:
+            return {name: self.keyboard_layouts}
+        return None
+
+    def window(self, id):
+        return niri_ipc.Window.from_json(self.windows.get(id))
+
+    def focused_window(self):
+        return self.window(self.focused_window_id)
+
+    def workspace(self, name):
+        return niri_ipc.Workspace.from_json(self.workspaces.get(self.workspace_ids.get(name)))
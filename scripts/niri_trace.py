@@ -0,0 +1,132 @@
+"""Opt-in timing spans, written as Chrome trace-event JSON.
+
+Tracing is off unless $NIRI_TRACE names a file, or enable() is called
+before the instrumented modules are imported. Then every span is kept in
+memory and, at exit, written to that file (open it in ui.perfetto.dev or
+chrome://tracing) with a one-line summary on stderr. When off, traced()
+returns the function itself and span() a shared no-op context manager,
+so the instrumentation costs nothing:
+
+    @niri_trace.traced
+    def load_settings(self): ...
+
+    with niri_trace.span('import PyQt6'):
+        from PyQt6 import QtWidgets
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Timestamps are relative to this module's import, the start of the program
+START = time.perf_counter()
+
+_path = None
+_events = []        # (name, phase, start, duration) in seconds
+_NO_SPAN = contextlib.nullcontext()
+
+
+def enable(path):
+    """Record spans and write them to path when the program exits"""
+    global _path
+    if _path is None:
+        atexit.register(_write_at_exit)
+    _path = path
+
+
+def enabled():
+    return _path is not None
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _events.append((self.name, 'X', self.start, time.perf_counter() - self.start))
+
+
+def span(name):
+    """Return a context manager timing its block as name"""
+    return _Span(name) if _path is not None else _NO_SPAN
+
+
+def traced(function):
+    """Time every call of function, named by its qualified name"""
+    if _path is None:
+        return function
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with _Span(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def instant(name):
+    """Record a moment, e.g. the first paint"""
+    if _path is not None:
+        _events.append((name, 'i', time.perf_counter(), 0.0))
+
+
+def trace_events():
+    """Return the recorded events in Chrome's trace-event format"""
+    pid, tid = os.getpid(), threading.get_ident()
+    events = []
+    for name, phase, start, duration in _events:
+        event = {'name': name, 'ph': phase, 'ts': round((start - START) * 1e6, 1), 'pid': pid, 'tid': tid}
+        if phase == 'X':
+            event['dur'] = round(duration * 1e6, 1)
+        else:
+            event['s'] = 'p'
+        events.append(event)
+    return events
+
+
+def summary():
+    """Return one line with the total time per span name, in order of first use"""
+    totals = {}         # name -> (total seconds, count), or (seconds since START, 0) for instants
+    for name, phase, start, duration in _events:
+        if phase == 'i':
+            totals.setdefault(name, (start - START, 0))
+        else:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration, count + 1)
+    parts = []
+    for name, (total, count) in totals.items():
+        if count == 0:
+            parts.append(f"{name} at {total * 1000:.1f} ms")
+        else:
+            parts.append(f"{name} {total * 1000:.1f} ms" + (f" x{count}" if count > 1 else ''))
+    return 'trace: ' + ', '.join(parts)
+
+
+def write(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events(), 'displayTimeUnit': 'ms'}, f)
+        f.write('\n')
+
+
+def _write_at_exit():
+    try:
+        write(_path)
+    except OSError as e:
+        print(f"Cannot write trace: {e}", file=sys.stderr)
+        return
+    print(f"{summary()}; written to {_path}", file=sys.stderr)
+
+
+if os.environ.get('NIRI_TRACE'):
+    enable(os.environ['NIRI_TRACE'])
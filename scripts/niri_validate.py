@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Check whole niri configuration trees, many at once.
+
+    niri_validate.py [-j JOBS] [TREE...]
+
+A TREE is a directory with lxqt-niri.kdl in it, or the main KDL file
+itself; `-` reads more of them from stdin, one per line. Without TREE the
+configuration in $XDG_CONFIG_HOME/lxqt/wayland is checked.
+
+Every tree is loaded with its includes and checked for
+
+    parse         files that are not valid KDL
+    include       included files that are missing, include cycles
+    value         values of the wrong type, out of range or not one of the choices
+    bind          the same key combination bound twice, unknown modifiers
+    workspace     open-on-workspace names no `workspace` declares
+    unknown-node  nodes this checker does not know (a warning only)
+
+The trees are checked by a pool of JOBS processes (default: one per CPU)
+and one JSON line is printed per tree as soon as it is done, in the order
+they finish:
+
+    {"tree": "...", "files": 9, "errors": 1, "warnings": 0,
+     "findings": [{"level": "error", "code": "value", "file": "src/input.kdl",
+                   "line": 20, "message": "accel-speed must be between -1.0 and 1.0, not 1.5"}]}
+
+The exit status is 1 when any tree has an error.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import niri_binds
+import niri_config
+import niri_input
+import niri_kdl
+from niri_input import FLAG, FLOAT, INT, STRING
+
+ANY = 'any'
+ERROR, WARNING = 'error', 'warning'
+
+
+class Value:
+    """What a leaf node takes as its first argument"""
+
+    __slots__ = ('kind', 'low', 'high', 'choices')
+
+    def __init__(self, kind, low=None, high=None, choices=None):
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.choices = choices
+
+    def problem(self, node):
+        """Return what is wrong with node's value, or None"""
+        if self.kind == ANY:
+            return None
+        if self.kind == FLAG:
+            if node.args and (len(node.args) > 1 or not isinstance(node.args[0], bool)):
+                return f"{node.name} takes no value or true/false"
+            return None
+        if not node.args:
+            return None if node.props else f"{node.name} needs a value"
+        value = node.args[0]
+        if self.kind == STRING:
+            if not isinstance(value, str):
+                return f"{node.name} must be a string, not {value!r}"
+            if self.choices is not None and value not in self.choices:
+                return f"{node.name} must be one of {', '.join(self.choices)}, not {value!r}"
+            return None
+        number = (int,) if self.kind == INT else (int, float)
+        if not isinstance(value, number) or isinstance(value, bool):
+            return f"{node.name} must be {'an integer' if self.kind == INT else 'a number'}, not {value!r}"
+        if self.low is not None and value < self.low or self.high is not None and value > self.high:
+            if self.high is None:
+                return f"{node.name} must be at least {self.low}, not {value!r}"
+            return f"{node.name} must be between {self.low} and {self.high}, not {value!r}"
+        return None
+
+
+# Blocks are dicts of the nodes they may contain; '*' stands for any name
+_ANY = Value(ANY)
+_FLAG = Value(FLAG)
+_STRING = Value(STRING)
+_BINDS = {'*': _ANY}
+
+
+def _names(spec, *names):
+    return dict.fromkeys(names, spec)
+
+
+def _input_schema():
+    """The input block, with the settings of niri_input and the rest of niri's"""
+    schema = {
+        'keyboard': {
+            'xkb': _names(_STRING, 'layout', 'variant', 'options', 'model', 'rules', 'file'),
+        },
+        'touchpad': {
+            **_names(_FLAG, 'off', 'dwtp', 'drag', 'middle-emulation', 'scroll-button-lock'),
+            **_names(_ANY, 'scroll-button', 'tap-button-map', 'click-method', 'scroll-factor'),
+        },
+        'mouse': {
+            **_names(_FLAG, 'off', 'scroll-button-lock'),
+            **_names(_ANY, 'scroll-method', 'scroll-button'),
+        },
+        **_names(_ANY, 'trackpoint', 'trackball', 'tablet', 'touch'),
+        'mod-key-nested': _STRING,
+    }
+    for key, (kind, choices, _default) in niri_input.SETTINGS.items():
+        *parents, name = niri_input.node_path(key)[1:]
+        block = schema
+        for parent in parents:
+            block = block.setdefault(parent, {})
+        block[name] = Value(kind, *niri_input.RANGES.get(key, (None, None)), choices)
+    return schema
+
+
+SCHEMA = {
+    'input': _input_schema(),
+    'layout': {
+        'gaps': Value(FLOAT, 0),
+        **_names(_FLAG, 'always-center-single-column', 'empty-workspace-above-first'),
+        **_names(_ANY, 'center-focused-column', 'default-column-display', 'preset-column-widths',
+                 'default-column-width', 'preset-window-heights', 'focus-ring', 'border', 'shadow',
+                 'tab-indicator', 'insert-hint', 'struts', 'background-color'),
+    },
+    'workspace': {
+        'open-on-output': _STRING,
+        'layout': _ANY,
+    },
+    'window-rule': {
+        'open-on-workspace': _STRING,
+        'open-on-output': _STRING,
+        'opacity': Value(FLOAT, 0.0, 1.0),
+        **_names(_FLAG, 'open-floating', 'open-focused', 'open-maximized', 'open-maximized-to-edges',
+                 'open-fullscreen', 'draw-border-with-background', 'clip-to-geometry', 'baba-is-float',
+                 'tiled-state'),
+        **_names(_ANY, 'match', 'exclude', 'default-column-width', 'default-window-height',
+                 'default-column-display', 'default-floating-position', 'block-out-from',
+                 'variable-refresh-rate', 'scroll-factor', 'focus-ring', 'border', 'shadow',
+                 'tab-indicator', 'geometry-corner-radius', 'min-width', 'max-width', 'min-height',
+                 'max-height'),
+    },
+    'overview': {
+        'zoom': Value(FLOAT, 0.0, 0.75),
+        **_names(_ANY, 'backdrop-color', 'workspace-shadow'),
+    },
+    'recent-windows': {
+        'off': _FLAG,
+        'open-delay-ms': Value(INT, 0),
+        'binds': _BINDS,
+        **_names(_ANY, 'highlight', 'previews'),
+    },
+    'binds': _BINDS,
+    'prefer-no-csd': _FLAG,
+    'screenshot-path': _ANY,
+    'spawn-sh-at-startup': _STRING,
+    **_names(_ANY, 'output', 'environment', 'cursor', 'hotkey-overlay', 'animations', 'gestures',
+             'spawn-at-startup', 'layer-rule', 'switch-events', 'debug', 'clipboard',
+             'xwayland-satellite', 'config-notification'),
+}
+
+
+class _Report:
+    def __init__(self, tree):
+        self.tree = tree
+        self.findings = []
+
+    def add(self, level, code, message, config_file=None, node=None, path=None, line=None):
+        if config_file is not None:
+            path = config_file.path
+            line = config_file.line(node)
+        self.findings.append({
+            'level': level,
+            'code': code,
+            'file': os.path.relpath(path, self.tree) if path else None,
+            'line': line,
+            'message': message,
+        })
+
+
+def _check_block(report, config_file, nodes, schema):
+    for node in nodes:
+        spec = schema.get(node.name, schema.get('*'))
+        if spec is None:
+            report.add(WARNING, 'unknown-node', f"unknown node {node.name}", config_file, node)
+        elif isinstance(spec, dict):
+            _check_block(report, config_file, node.children, spec)
+        else:
+            problem = spec.problem(node)
+            if problem is not None:
+                report.add(ERROR, 'value', problem, config_file, node)
+
+
+def validate_tree(tree):
+    """Check the configuration tree at a directory or main file; return a result dict"""
+    main = os.path.join(tree, 'lxqt-niri.kdl') if os.path.isdir(tree) else tree
+    base = os.path.dirname(os.path.abspath(main))
+    report = _Report(base)
+    files = 0
+    try:
+        config = niri_config.load(main, None)
+    except niri_kdl.KdlError as e:
+        report.add(ERROR, 'parse', str(e).split(': ', 1)[-1], path=getattr(e, 'path', main), line=e.line)
+        config = None
+    except OSError as e:
+        report.add(ERROR, 'include', f"cannot read: {e.strerror}", path=e.filename or main)
+        config = None
+
+    if config is not None:
+        files = len(config.files)
+        for cycle in config.cycles:
+            report.add(ERROR, 'include', "include cycle: " + ' -> '.join(os.path.relpath(path, base)
+                                                                         for path in cycle), path=cycle[0])
+        for including, target in config.missing:
+            report.add(ERROR, 'include', f"included file {os.path.relpath(target, base)} does not exist",
+                       path=including)
+
+        nodes = list(config.nodes())
+        for config_file, node in nodes:
+            _check_block(report, config_file, (node,), SCHEMA)
+
+        binds = niri_binds.BindIndex(niri_binds.mod_key(node for _config_file, node in nodes))
+        for config_file, node in nodes:
+            binds.add_node(config_file, node)
+        for bind in binds.invalid:
+            report.add(ERROR, 'bind', f"{bind.name} is not a valid key combination", bind.config_file, bind.node)
+        for _kind, first, bind in binds.conflicts():
+            report.add(ERROR, 'bind', f"{bind.name} is already bound at {first.location}",
+                       bind.config_file, bind.node)
+
+        workspaces = {node.args[0].lower() for _config_file, node in nodes
+                      if node.name == 'workspace' and node.args and isinstance(node.args[0], str)}
+        for config_file, rule in nodes:
+            if rule.name != 'window-rule':
+                continue
+            for node in rule.all('open-on-workspace'):
+                name = node.args[0] if node.args else None
+                if isinstance(name, str) and name.lower() not in workspaces:
+                    report.add(ERROR, 'workspace', f"open-on-workspace {name!r}: no workspace has this name",
+                               config_file, node)
+
+    errors = sum(finding['level'] == ERROR for finding in report.findings)
+    return {
+        'tree': tree,
+        'files': files,
+        'errors': errors,
+        'warnings': len(report.findings) - errors,
+        'findings': report.findings,
+    }
+
+
+def validate(trees, jobs=None):
+    """Yield the result of every tree, as they are done, using jobs processes"""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        yield from map(validate_tree, trees)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(validate_tree, trees, chunksize=4)
+
+
+def _trees(args):
+    for tree in args or [os.path.dirname(niri_config.CONFIG_PATH)]:
+        if tree != '-':
+            yield tree
+            continue
+        for line in sys.stdin:
+            if line.strip():
+                yield line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-j', '--jobs', type=int, help="processes to use (default: one per CPU)")
+    parser.add_argument('trees', nargs='*', metavar='TREE', help="configuration directory or main file, - for stdin")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = failed = 0
+    for result in validate(_trees(args.trees), args.jobs):
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        count += 1
+        failed += result['errors'] > 0
+    elapsed = time.perf_counter() - start
+    print(f"{count} trees, {failed} with errors, {count / elapsed:.0f} trees/s", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()